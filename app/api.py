@@ -1,18 +1,150 @@
-from flask import Flask, request, jsonify
-from src.accounts_registry import AccountsRegistry
+import atexit
+import json
+import os
+import threading
+import time
+from functools import wraps
+from itertools import chain
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, g
 from src.personal_account import PersonalAccount
 from src.company_account import CompanyAccount
-from src.mongo_accounts_repository import MongoAccountsRepository
+from src.company_onboarding import onboard_companies, validate_nips
+from src.batch_transfers import execute_transfers, EXTERNAL_ACCOUNT
+from src.transfers import (
+    transfer as transfer_funds, debit, debit_once, credit_once, cancel_credit, refund_once,
+    TransferCancelledError,
+)
+from src.structured_logging import configure_from_env, route_log, stop_logging
+from src.account import Account
+from app.services import BankServices
 
-app = Flask(__name__)
-registry = AccountsRegistry()
-mongo_repo = MongoAccountsRepository()
+accounts_api = Blueprint("accounts_api", __name__)
+# Page size of GET /api/accounts when paginating without an explicit limit, and its cap
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_TRANSFER_BATCH = int(os.getenv('BANK_APP_MAX_TRANSFER_BATCH', '10000'))
+BATCH_VALIDATION_WORKERS = int(os.getenv('BANK_APP_MF_BATCH_WORKERS', '8'))
+LOAD_BATCH_SIZE = int(os.getenv('BANK_APP_MONGO_LOAD_BATCH_SIZE', '1000'))
 
 
-@app.route("/api/accounts", methods=['POST'])
+def services() -> BankServices:
+    """Services of the app handling the current request"""
+    return current_app.extensions["bank_app"]
+
+
+# The start time is kept in the WSGI environ and the request proxy resolved
+# once: each lookup through a Flask context proxy costs about a microsecond
+@accounts_api.before_request
+def start_timer():
+    if services().metrics.enabled:
+        request.environ["bank_app.start_ns"] = time.perf_counter_ns()
+
+
+@accounts_api.after_request
+def record_request(response):
+    current = request._get_current_object()
+    start_ns = current.environ.get("bank_app.start_ns")
+    if start_ns is not None:
+        services().metrics.observe_request(current.method, current.url_rule.rule, response.status_code,
+                                           time.perf_counter_ns() - start_ns)
+    return response
+
+
+@accounts_api.before_request
+def apply_backpressure():
+    """Turn mutations away while write-behind is behind, before any account is touched"""
+    write_behind = services().write_behind
+    if write_behind is not None and request.method in ("POST", "PATCH", "DELETE"):
+        if not write_behind.wait_for_capacity():
+            return jsonify({"error": "Too many unsaved changes, retry later"}), 503, {"Retry-After": "1"}
+    return None
+
+
+def journaled(view=None, *, prepare=None):
+    """
+    Run a mutating route under the journal lock and answer once its records are durable.
+
+    Slow work is kept out of the lock: `prepare`, given the view's
+    arguments, runs first (by default it loads the accounts the request
+    names in storage-backed mode) and a due snapshot is written in the
+    background.
+    """
+    if view is None:
+        return lambda view: journaled(view, prepare=prepare)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        journal = services().journal
+        if journal is None:
+            return view(*args, **kwargs)
+        (prepare or _load_named_accounts)(*args, **kwargs)
+        with journal.lock:
+            response = view(*args, **kwargs)
+        if journal.needs_snapshot:
+            journal.snapshot_in_background(services().registry)
+        # Waiting outside the lock lets concurrent requests share one fsync
+        if "journal_seq" in g:
+            journal.wait_durable(g.journal_seq)
+        return response
+    return wrapper
+
+
+def _load_named_accounts(pesel=None):
+    """Fault the accounts named in the path or a transfer body in from MongoDB"""
+    registry = services().registry
+    if not registry.storage_backed:
+        return
+    data = request.get_json(silent=True)
+    pesels = [pesel] if pesel is not None else []
+    if isinstance(data, dict):
+        pesels += [data[field] for field in ("from_account", "to_account") if isinstance(data.get(field), str)]
+    for key in pesels:
+        registry.find_account_by_pesel(key)
+
+
+def _validate_new_nips():
+    """MF lookups for the NIPs a request would create, kept in g.validated_nips for the view"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return
+    companies = data.get("companies") if isinstance(data.get("companies"), list) else [data]
+    nips = [company.get("nip") for company in companies
+            if isinstance(company, dict) and isinstance(company.get("name"), str)]
+    registry = services().registry
+    # Failed lookups are not cached, so the view must not repeat them under the lock
+    g.validated_nips = validate_nips(
+        [nip for nip in nips if isinstance(nip, str) and len(nip) == 10 and not registry.nip_exists(nip)],
+        max_workers=BATCH_VALIDATION_WORKERS,
+    )
+
+
+def _new_company_account(name, nip):
+    """CompanyAccount for a new NIP, using the prepare step's MF result when there is one"""
+    validated = g.get("validated_nips", {})
+    if nip not in validated:
+        return CompanyAccount(name, nip)
+    if not validated[nip]:
+        raise ValueError("Company not registered!!")
+    return CompanyAccount.from_dict({"company_name": name, "nip": nip, "balance": 0.0, "history": []})
+
+
+def _journal(record):
+    journal = services().journal
+    if journal is not None:
+        g.journal_seq = journal.append(record)
+
+
+def _journal_transfer(account, kind, amount):
+    _journal({"op": "transfer", "key": ["pesel", account.pesel], "kind": kind, "amount": amount})
+
+
+@accounts_api.route("/api/accounts", methods=['POST'])
+@journaled(prepare=_validate_new_nips)
 def create_account():
     data = request.get_json()
-    print(f"Create account request: {data}")
+    registry = services().registry
+    # Only the kind of account: the body holds personal data
+    route_log("create_account").info("Create account request", kind="company" if "nip" in data else "personal")
     
     is_company = "nip" in data
     
@@ -22,96 +154,307 @@ def create_account():
         if not nip or len(nip) != 10:
             return jsonify({"error": "Invalid NIP format. NIP must be exactly 10 digits."}), 400
         
-        if any(hasattr(acc, 'nip') and acc.nip == nip for acc in registry.get_all_accounts()):
+        if not isinstance(data.get("name"), str):
+            return jsonify({"error": "Company name must be a string"}), 400
+        
+        if registry.nip_exists(nip):
             return jsonify({"error": "Account with this NIP already exists"}), 409
         
         try:
-            account = CompanyAccount(data["name"], nip)
+            account = _new_company_account(data["name"], nip)
             registry.add_account(account)
+            _journal({"op": "create", "account": account.to_dict()})
             return jsonify({"message": "Account created"}), 201
         except ValueError as e:
             return jsonify({"error": str(e)}), 400
     else:
+        if not all(isinstance(data.get(field), str) for field in ("name", "surname")):
+            return jsonify({"error": "Name and surname must be strings"}), 400
         if registry.pesel_exists(data["pesel"]):
             return jsonify({"error": "Account with this PESEL already exists"}), 409
         
         account = PersonalAccount(data["name"], data["surname"], data["pesel"])
         registry.add_account(account)
+        _journal({"op": "create", "account": account.to_dict()})
         return jsonify({"message": "Account created"}), 201
 
 
-@app.route("/api/accounts", methods=['GET'])
+@accounts_api.route("/api/accounts/batch", methods=['POST'])
+@journaled(prepare=_validate_new_nips)
+def create_company_accounts_batch():
+    """Validate NIPs concurrently and create the company accounts in one registry operation"""
+    registry = services().registry
+    data = request.get_json()
+    companies = data.get("companies") if isinstance(data, dict) else None
+    route_log("create_company_accounts_batch").info("Batch company account request", companies=len(companies or []))
+
+    if not isinstance(companies, list) or not all(isinstance(company, dict) for company in companies):
+        return jsonify({"error": "Body must contain a 'companies' list of {name, nip} objects"}), 400
+
+    report = onboard_companies(companies, registry, max_workers=BATCH_VALIDATION_WORKERS,
+                               validated=g.get("validated_nips"))
+    for result in report["results"]:
+        if result["status"] == "created":
+            _journal({"op": "create", "account": registry.find_account_by_nip(result["nip"]).to_dict()})
+    return jsonify(report), 200
+
+
+@accounts_api.route("/api/accounts", methods=['GET'])
 def get_all_accounts():
-    print("Get all accounts request received")
-    accounts = registry.get_all_accounts()
-    accounts_data = [
-        {
-            "name": acc.first_name,
-            "surname": acc.last_name,
-            "pesel": acc.pesel,
-            "balance": acc.balance
-        } for acc in accounts
-    ]
-    return jsonify(accounts_data), 200
-
-
-@app.route("/api/accounts/count", methods=['GET'])
+    """List accounts.
+
+    Without parameters the whole list is returned at once. `limit` with
+    `offset` or `cursor` (the `next_cursor` of the previous page) returns
+    one page ordered by PESEL/NIP; `stream=json` or `stream=ndjson`
+    streams every account in chunks, in the same order. Accounts without
+    a valid PESEL/NIP are only in the whole list. A storage-backed
+    registry pages from storage and only supports `cursor`.
+    """
+    route_log("get_all_accounts").info("Get all accounts request", args=request.args.to_dict)
+    args = request.args
+    registry = services().registry
+    mongo_repo = services().mongo_repo
+    # The shared ledger's balances in shared-ledger mode, so every worker lists the same
+    balance_of = registry.locks.balance
+
+    stream = args.get("stream")
+    if stream is not None:
+        if stream not in ("json", "ndjson"):
+            return jsonify({"error": "stream must be 'json' or 'ndjson'"}), 400
+        try:
+            accounts = _listed_accounts()
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        if stream == "ndjson":
+            return Response(_ndjson_chunks(accounts, balance_of), mimetype="application/x-ndjson")
+        return Response(_json_array_chunks(accounts, balance_of), mimetype="application/json")
+
+    if not {"limit", "offset", "cursor"} & args.keys():
+        accounts = registry.get_all_accounts()
+        return jsonify([_account_summary(acc, balance_of) for acc in accounts]), 200
+
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+        offset = int(args.get("offset", 0))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    if not 1 <= limit <= MAX_PAGE_SIZE or offset < 0:
+        return jsonify({"error": f"limit must be 1-{MAX_PAGE_SIZE} and offset non-negative"}), 400
+    cursor = args.get("cursor")
+
+    if registry.storage_backed:
+        if "offset" in args:
+            return jsonify({"error": "Use cursor pagination with a storage-backed registry"}), 400
+        try:
+            registry.flush()
+            accounts, next_cursor = mongo_repo.load_page(limit, after=cursor)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    else:
+        # The cursor is the PESEL/NIP of the last account listed
+        with registry.lock:
+            accounts, next_cursor = registry.get_index("key").page(limit, offset=offset, after=cursor)
+
+    return jsonify({"accounts": [_account_summary(acc, balance_of) for acc in accounts],
+                    "next_cursor": next_cursor}), 200
+
+
+def _listed_accounts():
+    registry = services().registry
+    mongo_repo = services().mongo_repo
+    if registry.storage_backed:
+        registry.flush()
+        # Paged by key like the in-memory listing; the first page is read
+        # here so that a storage error still becomes a 500
+        accounts, cursor = mongo_repo.load_page(LOAD_BATCH_SIZE)
+        return chain(accounts, _stored_pages(mongo_repo, cursor))
+    # Only references are copied, so the response is safe from concurrent
+    # additions; the JSON itself is produced chunk by chunk
+    with registry.lock:
+        return registry.get_index("key").range()
+
+
+def _stored_pages(mongo_repo, cursor):
+    while cursor is not None:
+        accounts, cursor = mongo_repo.load_page(LOAD_BATCH_SIZE, after=cursor)
+        yield from accounts
+
+
+def _json_chunks(accounts, balance_of, chunk_size=1000):
+    chunk = []
+    for account in accounts:
+        chunk.append(json.dumps(_account_summary(account, balance_of)))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _ndjson_chunks(accounts, balance_of):
+    for chunk in _json_chunks(accounts, balance_of):
+        yield "\n".join(chunk) + "\n"
+
+
+def _json_array_chunks(accounts, balance_of):
+    yield "["
+    separator = ""
+    for chunk in _json_chunks(accounts, balance_of):
+        yield separator + ",".join(chunk)
+        separator = ","
+    yield "]"
+
+
+@accounts_api.route("/api/accounts/count", methods=['GET'])
 def get_account_count():
-    print("Get account count request received")
+    route_log("get_account_count").info("Get account count request")
+    registry = services().registry
     count = registry.get_accounts_count()
     return jsonify({"count": count}), 200
 
 
-@app.route("/api/accounts/<pesel>", methods=['GET'])
+def _account_summary(account, balance_of=None):
+    balance = account.balance if balance_of is None else balance_of(account)
+    if account.TYPE == CompanyAccount.TYPE:
+        return {
+            "type": account.TYPE,
+            "name": account.company_name,
+            "nip": account.nip,
+            "balance": balance
+        }
+    return {
+        "type": account.TYPE,
+        "name": account.first_name,
+        "surname": account.last_name,
+        "pesel": account.pesel,
+        "balance": balance
+    }
+
+
+@accounts_api.route("/api/accounts/search", methods=['GET'])
+def search_accounts():
+    """Query accounts through the registry's secondary indexes.
+
+    Supported filters (combined with AND): type, surname_prefix,
+    min_balance, max_balance. In shared-ledger mode balances are the
+    ledger's, which the balance index of this worker may lag behind, so
+    balance bounds are checked against the ledger instead.
+    """
+    route_log("search_accounts").info("Search accounts request", args=request.args.to_dict)
+    args = request.args
+    registry = services().registry
+    shared = services().shared_ledger is not None
+    balance_of = registry.locks.balance
+    results = []
+
+    try:
+        low = float(args["min_balance"]) if "min_balance" in args else None
+        high = float(args["max_balance"]) if "max_balance" in args else None
+    except ValueError:
+        return jsonify({"error": "Balance bounds must be numbers"}), 400
+
+    # Indexes change with every transfer; read them consistently
+    with registry.lock:
+        if "type" in args:
+            results.append(registry.get_index("type").lookup(args["type"]))
+        if "surname_prefix" in args:
+            results.append(registry.get_index("surname").prefix(args["surname_prefix"]))
+        if "min_balance" in args or "max_balance" in args:
+            if shared:
+                results.append(_ledger_balance_range(registry, low, high))
+            else:
+                results.append(registry.get_index("balance").range(low, high))
+
+    if not results:
+        return jsonify({"error": "Provide at least one of: type, surname_prefix, min_balance, max_balance"}), 400
+
+    matches = results[0]
+    for other in results[1:]:
+        allowed = set(other)
+        matches = [acc for acc in matches if acc in allowed]
+
+    return jsonify([_account_summary(acc, balance_of) for acc in matches]), 200
+
+
+def _ledger_balance_range(registry, low, high):
+    """Accounts with low <= ledger balance <= high, ordered by it; a scan, as the index has local balances"""
+    balances = [(registry.locks.balance(account), account) for account in registry.accounts]
+    balances.sort(key=lambda entry: entry[0])
+    return [account for balance, account in balances
+            if (low is None or balance >= low) and (high is None or balance <= high)]
+
+
+@accounts_api.route("/api/accounts/<pesel>", methods=['GET'])
 def get_account_by_pesel(pesel):
-    print(f"Get account by PESEL request: {pesel}")
-    account = registry.find_account_by_pesel(pesel)
+    route_log("get_account_by_pesel").info("Get account request", pesel=pesel)
+    registry = services().registry
+    if request.args.get("source") == "storage":
+        # Read the stored copy directly instead of loading the registry
+        try:
+            account = services().mongo_repo.find_by_pesel(pesel)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    else:
+        account = registry.find_account_by_pesel(pesel)
     
     if account is None:
         return jsonify({"error": "Account not found"}), 404
     
+    # Holding the account refreshes its balance from the shared ledger, if any
+    with registry.locks.hold(account):
+        balance = account.balance
     account_data = {
         "name": account.first_name,
         "surname": account.last_name,
         "pesel": account.pesel,
-        "balance": account.balance
+        "balance": balance
     }
     return jsonify(account_data), 200
 
 
-@app.route("/api/accounts/<pesel>", methods=['PATCH'])
+@accounts_api.route("/api/accounts/<pesel>", methods=['PATCH'])
+@journaled
 def update_account(pesel):
-    print(f"Update account request for PESEL: {pesel}")
+    route_log("update_account").info("Update account request", pesel=pesel)
+    registry = services().registry
     account = registry.find_account_by_pesel(pesel)
     
     if account is None:
         return jsonify({"error": "Account not found"}), 404
     
     data = request.get_json()
+    if not all(isinstance(data[field], str) for field in ("name", "surname") if field in data):
+        return jsonify({"error": "Name and surname must be strings"}), 400
     
     if "name" in data:
         account.first_name = data["name"]
     if "surname" in data:
         account.last_name = data["surname"]
+    _journal({"op": "patch", "key": ["pesel", pesel], "first_name": account.first_name, "last_name": account.last_name})
     
     return jsonify({"message": "Account updated"}), 200
 
 
-@app.route("/api/accounts/<pesel>", methods=['DELETE'])
+@accounts_api.route("/api/accounts/<pesel>", methods=['DELETE'])
+@journaled
 def delete_account(pesel):
-    print(f"Delete account request for PESEL: {pesel}")
+    route_log("delete_account").info("Delete account request", pesel=pesel)
+    registry = services().registry
     account = registry.find_account_by_pesel(pesel)
     
     if account is None:
         return jsonify({"error": "Account not found"}), 404
     
-    registry.accounts.remove(account)
+    registry.remove_account(account)
+    _journal({"op": "delete", "key": ["pesel", pesel]})
     return jsonify({"message": "Account deleted"}), 200
 
 
-@app.route("/api/accounts/<pesel>/transfer", methods=['POST'])
+@accounts_api.route("/api/accounts/<pesel>/transfer", methods=['POST'])
+@journaled
 def transfer(pesel):
-    print(f"Transfer request for PESEL: {pesel}")
+    route_log("transfer").info("Transfer request", pesel=pesel)
+    registry = services().registry
     account = registry.find_account_by_pesel(pesel)
     
     if account is None:
@@ -125,16 +468,18 @@ def transfer(pesel):
     if transfer_type not in valid_types:
         return jsonify({"error": f"Invalid transfer type. Must be one of: {', '.join(valid_types)}"}), 400
     
-    balance_before = account.balance
-    
-    if transfer_type == "incoming":
-        account.incoming_transfer(amount)
-    elif transfer_type == "outgoing":
-        account.outgoing_transfer(amount)
-    elif transfer_type == "express":
-        account.express_outgoing(amount)
-    
-    balance_after = account.balance
+    with registry.locks.hold(account):
+        balance_before = account.balance
+        
+        if transfer_type == "incoming":
+            account.incoming_transfer(amount)
+        elif transfer_type == "outgoing":
+            account.outgoing_transfer(amount)
+        elif transfer_type == "express":
+            account.express_outgoing(amount)
+        
+        balance_after = account.balance
+    _journal_transfer(account, transfer_type, amount)
     
     if transfer_type in ["outgoing", "express"]:
         if balance_before == balance_after:
@@ -143,10 +488,110 @@ def transfer(pesel):
     return jsonify({"message": "Zlecenie przyjęto do realizacji"}), 200
 
 
-@app.route("/api/transfer", methods=['POST'])
+@accounts_api.route("/api/accounts/<pesel>/debit", methods=['POST'])
+@journaled
+def debit_account(pesel):
+    """Sending side of a transfer to another shard, checked like /api/transfer; once per transfer_id if given"""
+    route_log("debit_account").info("Debit request", pesel=pesel)
+    registry = services().registry
+    account = registry.find_account_by_pesel(pesel)
+    
+    if account is None:
+        return jsonify({"error": "Account not found"}), 404
+    
+    data = request.get_json()
+    amount = data.get("amount")
+    express = bool(data.get("express", False))
+    transfer_id = data.get("transfer_id")
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        return jsonify({"error": "Amount must be a number"}), 400
+    
+    try:
+        if transfer_id is None:
+            debited, applied = debit(account, amount, registry.locks, express=express), True
+        else:
+            debited, applied = debit_once(account, amount, registry.locks, transfer_id, services().transfer_legs, express=express)
+    except TransferCancelledError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if applied:
+        _journal_transfer(account, "express" if express else "outgoing", amount)
+    return jsonify({"message": "Debited", "debited": debited}), 200
+
+
+@accounts_api.route("/api/accounts/<pesel>/credit", methods=['POST'])
+@journaled
+def credit_account(pesel):
+    """Receiving side of a transfer from another shard, applied once per transfer_id"""
+    route_log("credit_account").info("Credit request", pesel=pesel)
+    registry = services().registry
+    account = registry.find_account_by_pesel(pesel)
+    
+    if account is None:
+        return jsonify({"error": "Account not found"}), 404
+    
+    data = request.get_json()
+    amount = data.get("amount")
+    transfer_id = data.get("transfer_id")
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not isinstance(transfer_id, str):
+        return jsonify({"error": "Body must contain a numeric amount and a transfer_id"}), 400
+    
+    try:
+        applied = credit_once(account, amount, registry.locks, transfer_id, services().transfer_legs)
+    except TransferCancelledError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if applied:
+        _journal_transfer(account, "incoming", amount)
+    return jsonify({"message": "Credited"}), 200
+
+
+@accounts_api.route("/api/accounts/<pesel>/credit/cancel", methods=['POST'])
+def cancel_account_credit(pesel):
+    """Stop a credit that was not applied from ever being applied; 409 if it was"""
+    route_log("cancel_account_credit").info("Cancel credit request", pesel=pesel)
+    registry = services().registry
+    account = registry.find_account_by_pesel(pesel)
+    
+    if account is None:
+        return jsonify({"error": "Account not found"}), 404
+    
+    transfer_id = request.get_json().get("transfer_id")
+    if not isinstance(transfer_id, str):
+        return jsonify({"error": "Body must contain a transfer_id"}), 400
+    if not cancel_credit(account, registry.locks, transfer_id, services().transfer_legs):
+        return jsonify({"error": "Transfer was already credited"}), 409
+    return jsonify({"message": "Credit cancelled"}), 200
+
+
+@accounts_api.route("/api/accounts/<pesel>/refund", methods=['POST'])
+@journaled
+def refund_account(pesel):
+    """Give back the debit of a transfer that did not complete, once per transfer_id"""
+    route_log("refund_account").info("Refund request", pesel=pesel)
+    registry = services().registry
+    account = registry.find_account_by_pesel(pesel)
+    
+    if account is None:
+        return jsonify({"error": "Account not found"}), 404
+    
+    transfer_id = request.get_json().get("transfer_id")
+    if not isinstance(transfer_id, str):
+        return jsonify({"error": "Body must contain a transfer_id"}), 400
+    refunded, applied = refund_once(account, registry.locks, transfer_id, services().transfer_legs)
+    if refunded and applied:
+        _journal_transfer(account, "refund", refunded)
+    return jsonify({"message": "Refunded", "refunded": refunded}), 200
+
+
+@accounts_api.route("/api/transfer", methods=['POST'])
+@journaled
 def transfer_between_accounts():
-    print("Transfer between accounts request received")
+    route_log("transfer_between_accounts").info("Transfer between accounts request")
     data = request.get_json()
+    registry = services().registry
     
     from_account = data.get("from_account")
     to_account = data.get("to_account")
@@ -161,7 +606,9 @@ def transfer_between_accounts():
         recipient = registry.find_account_by_pesel(to_account)
         if recipient is None:
             return jsonify({"error": "Account not found"}), 404
-        recipient.incoming_transfer(amount)
+        with registry.locks.hold(recipient):
+            recipient.incoming_transfer(amount)
+        _journal_transfer(recipient, "incoming", amount)
         return jsonify({"message": "Transfer completed"}), 200
     
     # Regular transfer between accounts
@@ -171,56 +618,176 @@ def transfer_between_accounts():
     if sender is None or recipient is None:
         return jsonify({"error": "One or both accounts not found"}), 404
     
-    if amount <= 0:
-        return jsonify({"error": "Amount must be greater than 0"}), 400
-    
-    if express:
-        # Express transfer with fee
-        fee = 1.0
-        total_amount = amount + fee
-        if total_amount > sender.balance:
-            return jsonify({"error": "Insufficient funds"}), 400
-        sender.express_outgoing(amount)
-        recipient.incoming_transfer(amount)
-    else:
-        # Standard transfer
-        if amount > sender.balance:
-            return jsonify({"error": "Insufficient funds"}), 400
-        sender.outgoing_transfer(amount)
-        recipient.incoming_transfer(amount)
+    # Funds check and both updates happen under the accounts' locks;
+    # InsufficientFundsError and a non-positive amount are both ValueErrors
+    try:
+        transfer_funds(sender, recipient, amount, registry.locks, express=bool(express))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    _journal_transfer(sender, "express" if express else "outgoing", amount)
+    _journal_transfer(recipient, "incoming", amount)
     
     return jsonify({"message": "Transfer completed"}), 200
 
 
-@app.route("/api/accounts/save", methods=['POST'])
+@accounts_api.route("/api/transfers/batch", methods=['POST'])
+@journaled
+def transfer_batch():
+    """Validate a batch of transfers in one pass and apply it all-or-nothing or per item"""
+    data = request.get_json()
+    transfers = data.get("transfers") if isinstance(data, dict) else None
+    route_log("transfer_batch").info("Batch transfer request", transfers=len(transfers or []))
+    registry = services().registry
+
+    if not isinstance(transfers, list):
+        return jsonify({"error": "Body must contain a 'transfers' list"}), 400
+    if len(transfers) > MAX_TRANSFER_BATCH:
+        return jsonify({"error": f"At most {MAX_TRANSFER_BATCH} transfers per batch"}), 400
+
+    atomic = data.get("atomic", True)
+    report = execute_transfers(transfers, registry, atomic=atomic)
+    for transfer, result in zip(transfers, report["results"]):
+        if result["status"] == "ok":
+            if transfer["from_account"] != EXTERNAL_ACCOUNT:
+                sender = registry.find_account_by_pesel(transfer["from_account"])
+                _journal_transfer(sender, "express" if transfer.get("express") else "outgoing", transfer["amount"])
+            _journal_transfer(registry.find_account_by_pesel(transfer["to_account"]), "incoming", transfer["amount"])
+
+    status = 422 if atomic and report["failed"] else 200
+    return jsonify(report), status
+
+
+@accounts_api.route("/api/accounts/save", methods=['POST'])
 def save_accounts():
-    """Save all accounts from registry to MongoDB"""
-    print("Save accounts to database request received")
+    """Save accounts from registry to MongoDB; only changes once storage is in sync"""
+    route_log("save_accounts").info("Save accounts request")
+    registry = services().registry
+    mongo_repo = services().mongo_repo
+    full = request.args.get("full") == "true" or registry.needs_full_save
     try:
-        accounts = registry.get_all_accounts()
-        mongo_repo.save_all(accounts)
-        return jsonify({"message": f"Saved {len(accounts)} accounts to database"}), 200
+        if full:
+            accounts = registry.collect_all()
+            mongo_repo.save_all(accounts)
+            registry.mark_saved()
+            return jsonify({"message": f"Saved {len(accounts)} accounts to database"}), 200
+        
+        changed, removed = registry.collect_changes()
+        mongo_repo.save_changes(changed, removed)
+        return jsonify({
+            "message": f"Saved {len(changed)} changed and deleted {len(removed)} accounts in database"
+        }), 200
     except Exception as e:
+        # The collected changes may be partly unsaved; fall back to a full save next time
+        registry.needs_full_save = True
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/api/accounts/load", methods=['POST'])
+@accounts_api.route("/api/accounts/persistence", methods=['GET'])
+def get_persistence_stats():
+    """Queue depth and flush latency of the write-behind writer, and hot set usage"""
+    registry = services().registry
+    write_behind = services().write_behind
+    stats = {"write_behind": write_behind is not None}
+    if write_behind is not None:
+        stats.update(write_behind.stats())
+    if registry.storage_backed:
+        stats["hot_set"] = registry.stats()
+    return jsonify(stats), 200
+
+
+@accounts_api.route("/api/accounts/load", methods=['POST'])
+@journaled
 def load_accounts():
-    """Load all accounts from MongoDB to registry"""
-    print("Load accounts from database request received")
+    """Stream all accounts from MongoDB into the registry"""
+    route_log("load_accounts").info("Load accounts request")
+    bank = services()
+    registry = bank.registry
+    if registry.storage_backed:
+        # Accounts are faulted in on demand; start over with an empty hot set
+        registry.flush()
+        registry.clear()
+        return jsonify({"message": "Accounts are loaded from the database on demand"}), 200
     try:
         # Clear current registry
-        registry.accounts.clear()
+        registry.clear()
         
-        # Load accounts from database
-        accounts = mongo_repo.load_all()
-        for account in accounts:
-            registry.add_account(account)
+        # Load accounts from database, adding each one as it is decoded
+        start = time.perf_counter()
+        count = 0
+        for account in bank.mongo_repo.iter_all(batch_size=LOAD_BATCH_SIZE):
+            registry.add_account(account, stored=True)
+            count += 1
+        registry.mark_saved()
+        if bank.shared_ledger is not None:
+            registry.locks.publish(registry.get_all_accounts())
+        if bank.journal is not None:
+            # The journal tail describes the replaced state; start over from this one
+            bank.journal.write_snapshot(registry)
+        elapsed = time.perf_counter() - start
         
-        return jsonify({"message": f"Loaded {len(accounts)} accounts from database"}), 200
+        return jsonify({
+            "message": f"Loaded {count} accounts from database",
+            "elapsed": elapsed,
+            "accounts_per_second": count / elapsed if elapsed else None
+        }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@accounts_api.route("/metrics", methods=['GET'])
+def get_metrics():
+    """Metrics in the Prometheus text format"""
+    return Response(services().metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Write out queued request logs at exit; registered once however many apps are built
+atexit.register(stop_logging)
+
+
+def create_app(config=None, bank_services=None):
+    """
+    Application factory, e.g. `gunicorn 'app.api:create_app()'`.
+
+    Each app gets its own BankServices in app.extensions["bank_app"],
+    built from the BANK_APP_* environment unless given. The metrics hooks
+    of the MF and SMTP clients are class-wide and follow the app created
+    last.
+    """
+    flask_app = Flask(__name__)
+    if config:
+        flask_app.config.update(config)
+    bank = bank_services or BankServices.from_env()
+    flask_app.extensions["bank_app"] = bank
+    CompanyAccount.mf_metrics_hook = bank.metrics.mf_call
+    Account.email_metrics_hook = bank.metrics.email_sent
+    # JSON request logs written from a background thread; see src.structured_logging
+    configure_from_env()
+    flask_app.register_blueprint(accounts_api)
+    return flask_app
+
+
+_SERVICE_NAMES = frozenset({
+    "registry", "mongo_repo", "metrics", "write_behind", "shared_ledger", "journal", "transfer_legs",
+})
+_default_app = None
+_default_app_lock = threading.Lock()
+
+
+def __getattr__(name):
+    """
+    `app`, the default app built by create_app on first access (e.g. by
+    `flask --app app.api run`), and its services as module attributes.
+    """
+    global _default_app
+    if name != "app" and name not in _SERVICE_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _default_app_lock:
+        if _default_app is None:
+            _default_app = create_app()
+    if name == "app":
+        return _default_app
+    return getattr(_default_app.extensions["bank_app"], name)
+
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,243 @@
+"""
+ASGI entry point serving the routes and JSON of app.api, e.g.
+
+    uvicorn app.asgi:app
+
+Requests run on one event loop. The views themselves are the Flask ones,
+called in-process through WSGI, so both entry points answer alike; what
+changes is everything around them:
+
+- the MF lookup for new company accounts is awaited (AsyncMFClient)
+  before the view runs, which then finds the result in the NIP cache;
+- mutations of one account are serialized with per-account asyncio
+  locks, so queued requests wait as coroutines, not as threads;
+- every view that may wait on a lock (account and registry locks,
+  write-behind backpressure, journal fsync) or on I/O (MongoDB,
+  streaming) runs on a thread pool; only lock-free reads run directly
+  on the loop.
+"""
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from app import api
+from src.company_account import CompanyAccount
+
+# GET routes that take no lock, answered on the event loop unless the
+# registry is storage-backed; every other request runs on the thread pool
+LOCK_FREE_PATHS = frozenset({"/api/accounts/count", "/metrics"})
+MUTATING_METHODS = frozenset({"POST", "PATCH", "DELETE"})
+
+
+class KeyedLocks:
+    """asyncio locks created per key on demand and dropped once unused."""
+
+    def __init__(self):
+        # key -> [lock, number of requests holding or waiting for it]
+        self._locks = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, *keys):
+        # Sorted, like LockStripes.hold, so two keys are always taken in one order
+        keys = sorted(set(keys))
+        entries = []
+        for key in keys:
+            entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+            entry[1] += 1
+            entries.append(entry)
+        acquired = []
+        try:
+            for entry in entries:
+                await entry[0].acquire()
+                acquired.append(entry)
+            yield
+        finally:
+            for entry in reversed(acquired):
+                entry[0].release()
+            for key, entry in zip(keys, entries):
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+
+class BankASGI:
+    """ASGI application wrapping the Flask app; see the module docstring."""
+
+    def __init__(self, flask_app=None, blocking_workers: int = 32):
+        self.flask_app = flask_app or api.app
+        self.services = self.flask_app.extensions["bank_app"]
+        self.accounts = KeyedLocks()
+        self.executor = ThreadPoolExecutor(max_workers=blocking_workers, thread_name_prefix="asgi-blocking")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        body = await self._read_body(receive)
+        method, path = scope["method"], scope["path"]
+        data = _json_or_none(body)
+
+        keys = _account_keys(path, data) if method in MUTATING_METHODS else ()
+        async with self.accounts.hold(*keys):
+            rejected = await self._validate_nips(method, path, data)
+            if rejected is not None:
+                await _send_json(send, 400, rejected)
+                return
+            if self._blocks(method, path):
+                await self._respond_in_thread(scope, body, send)
+            else:
+                status, headers, chunks = self._call_view(scope, body)
+                await _send_response(send, status, headers, chunks)
+
+    async def _validate_nips(self, method, path, data):
+        """Await MF lookups for the NIPs a request will create; returns an error body to reject it."""
+        if method != "POST" or not isinstance(data, dict):
+            return None
+        registry = self.services.registry
+        if path == "/api/accounts" and _new_nip(registry, data.get("nip")):
+            if not await CompanyAccount._validate_nip_with_mf_async(data["nip"]):
+                return {"error": "Company not registered!!"}
+        elif path == "/api/accounts/batch" and isinstance(data.get("companies"), list):
+            nips = {company.get("nip") for company in data["companies"] if isinstance(company, dict)}
+            await asyncio.gather(*(
+                CompanyAccount._validate_nip_with_mf_async(nip) for nip in nips if _new_nip(registry, nip)
+            ))
+        return None
+
+    def _blocks(self, method, path) -> bool:
+        return method != "GET" or path not in LOCK_FREE_PATHS or self.services.registry.storage_backed
+
+    def _call_view(self, scope, body):
+        status_and_headers = []
+
+        def start_response(status, headers, exc_info=None):
+            status_and_headers[:] = [int(status.split(" ", 1)[0]), headers]
+
+        chunks = self.flask_app(_environ(scope, body), start_response)
+        return status_and_headers[0], status_and_headers[1], chunks
+
+    async def _respond_in_thread(self, scope, body, send):
+        loop = asyncio.get_running_loop()
+        status, headers, chunks = await loop.run_in_executor(self.executor, self._call_view, scope, body)
+        iterator = iter(chunks)
+        try:
+            await _start_response(send, status, headers)
+            # Pull one chunk at a time, so streamed listings stay streamed
+            while (chunk := await loop.run_in_executor(self.executor, next, iterator, None)) is not None:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(chunks, "close"):
+                await loop.run_in_executor(self.executor, chunks.close)
+
+    async def _read_body(self, receive) -> bytes:
+        parts = []
+        while True:
+            message = await receive()
+            parts.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(parts)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def _json_or_none(body: bytes):
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+def _new_nip(registry, nip) -> bool:
+    return isinstance(nip, str) and len(nip) == 10 and not registry.nip_exists(nip)
+
+
+def _account_keys(path: str, data) -> list:
+    """PESELs/NIPs a mutating request touches, to serialize it with others on the same accounts."""
+    parts = path.strip("/").split("/")
+    # /api/accounts/<pesel>[/transfer|/debit]
+    if len(parts) >= 3 and parts[:2] == ["api", "accounts"] and parts[2] not in ("batch", "save", "load"):
+        return [parts[2]]
+    if not isinstance(data, dict):
+        return []
+    if path == "/api/accounts":
+        key = data.get("nip", data.get("pesel"))
+        return [key] if isinstance(key, str) else []
+    if path == "/api/transfer":
+        transfers = [data]
+    elif path == "/api/transfers/batch" and isinstance(data.get("transfers"), list):
+        transfers = data["transfers"]
+    elif path == "/api/accounts/batch" and isinstance(data.get("companies"), list):
+        return [company["nip"] for company in data["companies"]
+                if isinstance(company, dict) and isinstance(company.get("nip"), str)]
+    else:
+        return []
+    return [transfer[field] for transfer in transfers if isinstance(transfer, dict)
+            for field in ("from_account", "to_account") if isinstance(transfer.get(field), str)]
+
+
+def _environ(scope, body: bytes) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", ()):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        if key == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value.decode("latin-1")
+        elif key != "CONTENT_LENGTH":
+            environ[f"HTTP_{key}"] = value.decode("latin-1")
+    return environ
+
+
+async def _start_response(send, status, headers):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+    })
+
+
+async def _send_response(send, status, headers, chunks):
+    body = b"".join(chunks)
+    if hasattr(chunks, "close"):
+        chunks.close()
+    await _start_response(send, status, headers)
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_json(send, status, data):
+    await _send_response(send, status, [("Content-Type", "application/json")], [json.dumps(data).encode()])
+
+
+app = BankASGI()
@@ -0,0 +1,260 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from flask import Flask, request, jsonify
+from src.sharding import shard_for
+from src.batch_transfers import EXTERNAL_ACCOUNT
+
+
+class ShardUnavailableError(Exception):
+    """Raised when a shard cannot be reached."""
+
+
+class HttpShard:
+    """One shard process running app.api, reached over a keep-alive session."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def request(self, method: str, path: str, json=None, params=None) -> tuple:
+        """Return (status code, decoded JSON body)."""
+        try:
+            response = self.session.request(
+                method, self.url + path, json=json, params=params, timeout=self.timeout
+            )
+            return response.status_code, response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise ShardUnavailableError(f"{self.url}: {e}") from e
+
+
+def create_router_app(shards) -> Flask:
+    """
+    Front end for accounts partitioned across shard processes by
+    shard_for(PESEL or NIP). Single-account routes are forwarded to the
+    owning shard, whole-registry routes are fanned out and merged.
+
+    A transfer between shards is a debit on the sender's shard followed
+    by a credit on the recipient's shard, both carrying one transfer id
+    so neither is applied twice. A failed or unanswered credit is
+    cancelled first; the cancel is refused if the credit did go through,
+    and only otherwise is the sender refunded. A refund gives back the
+    debit without counting as a deposit.
+    """
+    router = Flask(__name__)
+    pool = ThreadPoolExecutor(max_workers=max(1, len(shards)))
+
+    def owner(key):
+        return shards[shard_for(key, len(shards))]
+
+    def forward(shard, path, json=None):
+        status, body = shard.request(request.method, path, json=json, params=request.args)
+        return jsonify(body), status
+
+    def fan_out(method, path, json=None, params=None):
+        return list(pool.map(lambda shard: shard.request(method, path, json=json, params=params), shards))
+
+    @router.errorhandler(ShardUnavailableError)
+    def shard_unavailable(error):
+        return jsonify({"error": f"Shard unavailable: {error}"}), 502
+
+    @router.route("/api/accounts", methods=['POST'])
+    def create_account():
+        data = request.get_json()
+        key = data.get("nip") if "nip" in data else data.get("pesel")
+        if not isinstance(key, str):
+            return jsonify({"error": "Account needs a PESEL or NIP"}), 400
+        return forward(owner(key), "/api/accounts", data)
+
+    @router.route("/api/accounts/batch", methods=['POST'])
+    def create_company_accounts_batch():
+        data = request.get_json()
+        companies = data.get("companies") if isinstance(data, dict) else None
+        if not isinstance(companies, list) or not all(isinstance(company, dict) for company in companies):
+            return jsonify({"error": "Body must contain a 'companies' list of {name, nip} objects"}), 400
+
+        # Malformed NIPs go to the first shard, which reports them
+        positions = [[] for _ in shards]
+        for position, company in enumerate(companies):
+            nip = company.get("nip")
+            positions[shard_for(nip, len(shards)) if isinstance(nip, str) else 0].append(position)
+
+        def create_on(shard, shard_positions):
+            if not shard_positions:
+                return 200, {"results": [], "created": 0, "elapsed": 0.0}
+            return shard.request(
+                "POST", "/api/accounts/batch", json={"companies": [companies[p] for p in shard_positions]}
+            )
+
+        replies = list(pool.map(create_on, shards, positions))
+
+        results = [None] * len(companies)
+        for shard_positions, (status, body) in zip(positions, replies):
+            if status != 200:
+                return jsonify(body), status
+            for position, result in zip(shard_positions, body["results"]):
+                results[position] = result
+        return jsonify({
+            "results": results,
+            "created": sum(body["created"] for _, body in replies),
+            "elapsed": max(body["elapsed"] for _, body in replies),
+        }), 200
+
+    @router.route("/api/accounts", methods=['GET'])
+    def get_all_accounts():
+        if request.args:
+            return jsonify({"error": "Pagination and streaming are served by each shard"}), 400
+        accounts = []
+        for status, body in fan_out("GET", "/api/accounts"):
+            if status != 200:
+                return jsonify(body), status
+            accounts.extend(body)
+        return jsonify(accounts), 200
+
+    @router.route("/api/accounts/count", methods=['GET'])
+    def get_account_count():
+        replies = fan_out("GET", "/api/accounts/count")
+        for status, body in replies:
+            if status != 200 or not isinstance(body, dict) or not isinstance(body.get("count"), int):
+                return jsonify({"error": f"Shard could not count its accounts: {body}"}), 502
+        return jsonify({"count": sum(body["count"] for _, body in replies)}), 200
+
+    @router.route("/api/accounts/search", methods=['GET'])
+    def search_accounts():
+        matches = []
+        for status, body in fan_out("GET", "/api/accounts/search", params=request.args):
+            if status != 200:
+                return jsonify(body), status
+            matches.extend(body)
+        return jsonify(matches), 200
+
+    @router.route("/api/accounts/<pesel>", methods=['GET', 'PATCH', 'DELETE'])
+    def account(pesel):
+        return forward(owner(pesel), f"/api/accounts/{pesel}", request.get_json(silent=True))
+
+    @router.route("/api/accounts/<pesel>/transfer", methods=['POST'])
+    def transfer(pesel):
+        return forward(owner(pesel), f"/api/accounts/{pesel}/transfer", request.get_json())
+
+    @router.route("/api/accounts/<pesel>/debit", methods=['POST'])
+    def debit_account(pesel):
+        return forward(owner(pesel), f"/api/accounts/{pesel}/debit", request.get_json())
+
+    @router.route("/api/transfer", methods=['POST'])
+    def transfer_between_accounts():
+        status, body = route_transfer(request.get_json())
+        return jsonify(body), status
+
+    def route_transfer(data):
+        from_account = data.get("from_account")
+        to_account = data.get("to_account")
+        amount = data.get("amount")
+        if not isinstance(from_account, str) or not isinstance(to_account, str) or not amount:
+            return 400, {"error": "Missing required fields: from_account, to_account, amount"}
+
+        recipient_shard = owner(to_account)
+        if from_account == EXTERNAL_ACCOUNT or owner(from_account) is recipient_shard:
+            return recipient_shard.request("POST", "/api/transfer", json=data)
+        return cross_shard_transfer(owner(from_account), recipient_shard, from_account, to_account, amount,
+                                    bool(data.get("express", False)))
+
+    def cross_shard_transfer(sender_shard, recipient_shard, from_account, to_account, amount, express):
+        status, _ = recipient_shard.request("GET", f"/api/accounts/{to_account}")
+        if status == 404:
+            return 404, {"error": "One or both accounts not found"}
+
+        transfer_id = uuid.uuid4().hex
+        try:
+            status, body = sender_shard.request(
+                "POST", f"/api/accounts/{from_account}/debit",
+                json={"amount": amount, "express": express, "transfer_id": transfer_id},
+            )
+        except ShardUnavailableError:
+            # The debit may have been taken: the refund gives it back, or stops it from being taken
+            return refund(sender_shard, from_account, transfer_id, "Transfer failed on the sender's shard")
+        if status == 404:
+            return 404, {"error": "One or both accounts not found"}
+        if status != 200:
+            return status, body
+
+        if leg_succeeds(recipient_shard, f"/api/accounts/{to_account}/credit",
+                        {"amount": amount, "transfer_id": transfer_id}):
+            return 200, {"message": "Transfer completed"}
+        # The credit may still have been applied, e.g. if only its reply was lost
+        try:
+            status, _ = recipient_shard.request(
+                "POST", f"/api/accounts/{to_account}/credit/cancel", json={"transfer_id": transfer_id}
+            )
+        except ShardUnavailableError:
+            status = 502
+        if status == 409:
+            return 200, {"message": "Transfer completed"}
+        if status != 200:
+            return 502, {"error": "Transfer outcome unknown; the recipient's shard did not answer",
+                         "transfer_id": transfer_id, "debited": body["debited"]}
+        return refund(sender_shard, from_account, transfer_id, "Transfer failed on the recipient's shard")
+
+    def leg_succeeds(shard, path, json) -> bool:
+        try:
+            status, _ = shard.request("POST", path, json=json)
+        except ShardUnavailableError:
+            return False
+        return status == 200
+
+    def refund(sender_shard, from_account, transfer_id, error):
+        try:
+            status, body = sender_shard.request(
+                "POST", f"/api/accounts/{from_account}/refund", json={"transfer_id": transfer_id}
+            )
+        except ShardUnavailableError:
+            status = 502
+        if status != 200:
+            return 500, {"error": "Transfer failed and could not be reversed", "transfer_id": transfer_id}
+        return 502, {"error": f"{error} and was reversed", "refunded": body["refunded"]}
+
+    @router.route("/api/transfers/batch", methods=['POST'])
+    def transfer_batch():
+        data = request.get_json()
+        transfers = data.get("transfers") if isinstance(data, dict) else None
+        if not isinstance(transfers, list):
+            return jsonify({"error": "Body must contain a 'transfers' list"}), 400
+
+        keys = {
+            transfer.get(field)
+            for transfer in transfers if isinstance(transfer, dict)
+            for field in ("from_account", "to_account")
+            if isinstance(transfer.get(field), str) and transfer.get(field) != EXTERNAL_ACCOUNT
+        }
+        owners = {shard_for(key, len(shards)) for key in keys}
+        if len(owners) <= 1:
+            return forward(shards[owners.pop() if owners else 0], "/api/transfers/batch", data)
+        if data.get("atomic", True):
+            return jsonify({"error": "An atomic batch must stay within one shard; send atomic: false"}), 400
+
+        # Per item across shards: each transfer runs the single-transfer protocol
+        results = []
+        for transfer in transfers:
+            status, body = route_transfer(transfer) if isinstance(transfer, dict) else \
+                (400, {"error": "Transfer must be an object"})
+            results.append({"status": "ok"} if status == 200 else {"status": "failed", "error": body["error"]})
+        applied = sum(result["status"] == "ok" for result in results)
+        return jsonify({"results": results, "applied": applied, "failed": len(results) - applied}), 200
+
+    @router.route("/api/accounts/save", methods=['POST'])
+    def save_accounts():
+        return merged("POST", "/api/accounts/save")
+
+    @router.route("/api/accounts/load", methods=['POST'])
+    def load_accounts():
+        return merged("POST", "/api/accounts/load")
+
+    @router.route("/api/accounts/persistence", methods=['GET'])
+    def get_persistence_stats():
+        return merged("GET", "/api/accounts/persistence")
+
+    def merged(method, path):
+        replies = fan_out(method, path, params=request.args)
+        return jsonify({"shards": [body for _, body in replies]}), max(status for status, _ in replies)
+
+    return router
@@ -0,0 +1,100 @@
+import atexit
+import os
+from src.accounts_registry import AccountsRegistry
+from src.storage_backed_registry import StorageBackedRegistry
+from src.account_indexes import default_indexes
+from src.mongo_accounts_repository import MongoAccountsRepository
+from src.transfers import TransferLegs
+from src.write_behind import WriteBehindWriter
+from src.journal import Journal
+from src.metrics import Metrics
+
+
+class BankServices:
+    """
+    State of one app instance: the registry and everything around it.
+
+    create_app keeps one in `app.extensions["bank_app"]`, so two apps
+    never share accounts, journals or metrics.
+    """
+
+    def __init__(self, registry, mongo_repo, metrics=None, write_behind=None, shared_ledger=None,
+                 journal=None, transfer_legs=None):
+        self.registry = registry
+        self.mongo_repo = mongo_repo
+        self.metrics = metrics or Metrics()
+        self.write_behind = write_behind
+        self.shared_ledger = shared_ledger
+        self.journal = journal
+        # Outcomes of cross-shard transfer legs by transfer id, so retried legs apply once
+        self.transfer_legs = transfer_legs or TransferLegs()
+
+    @classmethod
+    def from_env(cls) -> "BankServices":
+        """Build the services configured by the BANK_APP_* environment variables."""
+        mongo_repo = MongoAccountsRepository(
+            os.getenv('BANK_APP_MONGO_URL', 'mongodb://localhost:27017/'),
+            collection_name=os.getenv('BANK_APP_MONGO_COLLECTION', 'accounts'),
+        )
+        # With BANK_APP_STORAGE_BACKED=1 MongoDB is the source of truth and only a
+        # bounded hot set of accounts is kept in memory
+        if os.getenv('BANK_APP_STORAGE_BACKED') == '1':
+            registry = StorageBackedRegistry(
+                mongo_repo,
+                capacity=int(os.getenv('BANK_APP_HOT_SET_SIZE', '10000')),
+                indexes=default_indexes(),
+            )
+        else:
+            registry = AccountsRegistry(indexes=default_indexes())
+
+        # Optional background persistence of every mutation, enabled with BANK_APP_WRITE_BEHIND=1
+        write_behind = None
+        if os.getenv('BANK_APP_WRITE_BEHIND') == '1':
+            write_behind = WriteBehindWriter(
+                mongo_repo,
+                flush_interval=float(os.getenv('BANK_APP_WRITE_BEHIND_INTERVAL', '1.0')),
+                max_batch=int(os.getenv('BANK_APP_WRITE_BEHIND_BATCH', '500')),
+                max_pending=int(os.getenv('BANK_APP_WRITE_BEHIND_MAX_PENDING', '10000')),
+            )
+            registry.add_observer(write_behind)
+            atexit.register(write_behind.close)
+
+        # With BANK_APP_SHARED_LEDGER=<name> balances and loan aggregates live in a
+        # shared memory block, so all workers on the host see the same ones
+        shared_ledger = None
+        if os.getenv('BANK_APP_SHARED_LEDGER'):
+            from src.shared_ledger import SharedLedger, SharedLedgerLocks
+            shared_ledger = SharedLedger(
+                os.environ['BANK_APP_SHARED_LEDGER'],
+                capacity=int(os.getenv('BANK_APP_SHARED_LEDGER_CAPACITY', '1000000')),
+            )
+            registry.locks = SharedLedgerLocks(shared_ledger)
+            registry.add_observer(registry.locks)
+            atexit.register(shared_ledger.close)
+
+        # Optional local journal of every mutation, enabled with BANK_APP_JOURNAL_DIR;
+        # the registry is restored from its snapshot and journal on startup
+        journal = None
+        if os.getenv('BANK_APP_JOURNAL_DIR'):
+            journal = Journal(
+                os.environ['BANK_APP_JOURNAL_DIR'],
+                commit_interval=float(os.getenv('BANK_APP_JOURNAL_COMMIT_INTERVAL', '0.005')),
+                snapshot_every=int(os.getenv('BANK_APP_JOURNAL_SNAPSHOT_EVERY', '100000')),
+            )
+            journal.recover(registry)
+            atexit.register(journal.close)
+
+        # Per-route latency histograms and dependency timings served at GET /metrics;
+        # BANK_APP_METRICS=0 stops recording
+        metrics = Metrics()
+        metrics.enabled = os.getenv('BANK_APP_METRICS', '1') != '0'
+        mongo_repo.metrics_hook = metrics.mongo_call
+        metrics.gauge("registry_accounts", "Accounts held in memory.", registry.in_memory_count)
+        if write_behind is not None:
+            metrics.gauge("write_behind_queue_depth", "Account writes waiting for a flush.",
+                          lambda: write_behind.queue_depth)
+
+        return cls(
+            registry, mongo_repo, metrics=metrics, write_behind=write_behind, shared_ledger=shared_ledger,
+            journal=journal, transfer_legs=TransferLegs(capacity=int(os.getenv('BANK_APP_TRANSFER_LEGS', '100000'))),
+        )
@@ -0,0 +1,72 @@
+"""
+Sharded deployment: N app.api processes, each owning the accounts whose
+PESEL/NIP maps to it (see src.sharding), behind the router from app.router.
+
+    python -m app.sharded --shards 4 --port 5000
+
+Shard i listens on port + 1 + i, stores its accounts in the MongoDB
+collection "<collection>_<i>" and, if BANK_APP_JOURNAL_DIR is set,
+journals to a "shard-<i>" subdirectory of it.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import requests
+from app.router import HttpShard, create_router_app
+
+
+def start_shards(count: int, first_port: int, host: str = "127.0.0.1") -> list:
+    """Start `count` shard processes on consecutive ports; returns the Popen objects."""
+    processes = []
+    for i in range(count):
+        env = dict(os.environ)
+        env["BANK_APP_MONGO_COLLECTION"] = f"{os.getenv('BANK_APP_MONGO_COLLECTION', 'accounts')}_{i}"
+        if os.getenv("BANK_APP_JOURNAL_DIR"):
+            env["BANK_APP_JOURNAL_DIR"] = os.path.join(os.environ["BANK_APP_JOURNAL_DIR"], f"shard-{i}")
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "flask", "--app", "app.api", "run",
+             "--host", host, "--port", str(first_port + i), "--with-threads"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        ))
+    return processes
+
+
+def wait_until_ready(urls, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    for url in urls:
+        while True:
+            try:
+                requests.get(f"{url}/api/accounts/count", timeout=1)
+                break
+            except requests.RequestException:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Shard at {url} did not start")
+                time.sleep(0.1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args(argv)
+
+    processes = start_shards(args.shards, args.port + 1, args.host)
+    urls = [f"http://{args.host}:{args.port + 1 + i}" for i in range(args.shards)]
+    try:
+        wait_until_ready(urls)
+        router = create_router_app([HttpShard(url) for url in urls])
+        router.run(host=args.host, port=args.port, threaded=True)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,72 @@
+import time
+from src.transaction_history import TransactionHistory
+
 
 class Account:
+    # No per-instance __dict__: the registry can hold millions of accounts;
+    # __weakref__ lets StorageBackedRegistry find evicted accounts still in use
+    __slots__ = ("_listener", "_balance", "_history", "__weakref__")
+    # History amount whose occurrences are counted incrementally, if any
+    TRACKED_AMOUNT = None
+    # Called with the seconds each history email took and whether it was
+    # sent, e.g. Metrics.email_sent; set on Account, shared by all types
+    email_metrics_hook = None
+
     def __init__(self):
-        self.balance = 0.0
-        self.history = []
+        self._listener = None
+        self._balance = 0.0
+        self._history = TransactionHistory(tracked_amount=self.TRACKED_AMOUNT)
+
+    @property
+    def balance(self) -> float:
+        return self._balance
+
+    @balance.setter
+    def balance(self, value: float) -> None:
+        old = self._balance
+        self._balance = value
+        if self._listener is not None:
+            self._listener(self, "balance", old, value)
+
+    @property
+    def history(self) -> TransactionHistory:
+        return self._history
+
+    @history.setter
+    def history(self, entries) -> None:
+        if not (isinstance(entries, TransactionHistory) and entries.tracked_amount == self.TRACKED_AMOUNT):
+            entries = TransactionHistory(entries, self.TRACKED_AMOUNT)
+        self._history = entries
 
     def outgoing_transfer(self, amount: float) -> None:
         if (amount < self.balance and amount > 0.0):
+            # History first, so the balance change notifies listeners with it in place
+            self.history.record(-amount)
             self.balance -= amount
-            self.history.append(f'-{amount}')
 
     def incoming_transfer(self, amount: float) -> None:
         if (amount > 0.0 ):
+            self.history.record(amount)
             self.balance += amount
-            self.history.append(f'{amount}')
 
     def express_incoming(self, amount: float) -> None:
         if (amount > 0.0 ):
             self.balance += amount
 
+    def refund(self, amount: float) -> None:
+        """
+        Give back money taken for a transfer that did not go through.
+        Only the balance changes: a refund is no deposit, so it does not
+        count toward the loan rules, and the history keeps the debit.
+        """
+        if amount > 0.0:
+            self.balance += amount
 
+    @staticmethod
+    def _send_email(smtp_client, subject: str, text: str, email_address: str) -> bool:
+        start = time.perf_counter()
+        sent = smtp_client.send(subject, text, email_address)
+        # Read through the class: a hook stored on it is not bound to self
+        if Account.email_metrics_hook is not None:
+            Account.email_metrics_hook(time.perf_counter() - start, sent)
+        return sent
@@ -0,0 +1,157 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
+
+# Sorts after every real character, used as the upper bound of prefix scans
+_MAX_CHAR = "\U0010ffff"
+
+
+class AccountIndex(ABC):
+    """
+    Base class for secondary indexes kept by AccountsRegistry.
+
+    Subclasses index accounts by the value returned from `key`; accounts
+    for which `key` returns None are not indexed. `fields` lists the
+    account attributes the key depends on, so the registry only
+    re-indexes an account when one of them changes.
+
+    The key is computed before anything is modified, so a key that
+    cannot be computed or ordered leaves the index unchanged.
+    """
+
+    def __init__(self, key, fields=()):
+        self.key = key
+        self.fields = frozenset(fields)
+        self._keys = {}
+
+    def add(self, account) -> None:
+        self.add_key(account, self.key(account))
+
+    def add_key(self, account, value) -> None:
+        """Index an account under a key already computed with `key`."""
+        if value is not None:
+            self._insert(account, value)
+            self._keys[account] = value
+
+    def remove(self, account) -> None:
+        value = self._keys.pop(account, None)
+        if value is not None:
+            self._delete(account, value)
+
+    def update(self, account) -> None:
+        value = self.key(account)
+        self.remove(account)
+        self.add_key(account, value)
+
+    def clear(self) -> None:
+        self._keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @abstractmethod
+    def _insert(self, account, value) -> None:
+        """Add an account under a key that is not None."""
+
+    @abstractmethod
+    def _delete(self, account, value) -> None:
+        """Remove an account previously inserted under this key."""
+
+
+class HashIndex(AccountIndex):
+    """Equality index, e.g. accounts by type."""
+
+    def __init__(self, key, fields=()):
+        super().__init__(key, fields)
+        self._buckets = {}
+
+    def _insert(self, account, value) -> None:
+        self._buckets.setdefault(value, {})[account] = None
+
+    def _delete(self, account, value) -> None:
+        bucket = self._buckets[value]
+        del bucket[account]
+        if not bucket:
+            del self._buckets[value]
+
+    def clear(self) -> None:
+        super().clear()
+        self._buckets.clear()
+
+    def lookup(self, value) -> list:
+        return list(self._buckets.get(value, ()))
+
+
+class SortedIndex(AccountIndex):
+    """Ordered index supporting range and prefix queries, e.g. by balance."""
+
+    def __init__(self, key, fields=()):
+        super().__init__(key, fields)
+        # (value, id(account)) pairs; the id breaks ties between equal values
+        self._entries = []
+        self._by_id = {}
+
+    def _insert(self, account, value) -> None:
+        insort(self._entries, (value, id(account)))
+        self._by_id[id(account)] = account
+
+    def _delete(self, account, value) -> None:
+        del self._entries[bisect_left(self._entries, (value, id(account)))]
+        del self._by_id[id(account)]
+
+    def clear(self) -> None:
+        super().clear()
+        self._entries.clear()
+        self._by_id.clear()
+
+    def range(self, low=None, high=None) -> list:
+        """Return accounts with low <= key <= high, ordered by key."""
+        start = 0 if low is None else bisect_left(self._entries, (low,))
+        if high is None:
+            end = len(self._entries)
+        else:
+            end = bisect_right(self._entries, (high, float('inf')))
+        return [self._by_id[account_id] for _, account_id in self._entries[start:end]]
+
+    def prefix(self, prefix: str) -> list:
+        """Return accounts whose string key starts with prefix."""
+        start = bisect_left(self._entries, (prefix,))
+        end = bisect_left(self._entries, (prefix + _MAX_CHAR,))
+        return [self._by_id[account_id] for _, account_id in self._entries[start:end]]
+
+    def page(self, limit: int, offset: int = 0, after=None) -> tuple:
+        """
+        Return up to `limit` accounts in key order, skipping `offset` of
+        them or, if given, resuming behind the key `after`. Resuming by
+        key only suits indexes whose keys are unique.
+
+        Returns:
+            Tuple (accounts, key of the last one to pass as `after`),
+            the key being None on the last page
+        """
+        start = offset if after is None else bisect_right(self._entries, (after, float('inf')))
+        entries = self._entries[start:start + limit]
+        last = entries[-1][0] if start + limit < len(self._entries) else None
+        return [self._by_id[account_id] for _, account_id in entries], last
+
+
+def default_indexes() -> dict:
+    """Secondary indexes used by the API: account type, balance, surname and PESEL/NIP."""
+    return {
+        "type": HashIndex(lambda account: account.TYPE),
+        "balance": SortedIndex(lambda account: account.balance, fields=("balance",)),
+        "surname": SortedIndex(_surname, fields=("last_name",)),
+        # Stable listing order for paginated GET /api/accounts
+        "key": SortedIndex(_listing_key),
+    }
+
+
+def _listing_key(account):
+    # "Invalid" is a placeholder shared by many accounts, so it cannot be a cursor
+    key = account.nip if account.TYPE == "company" else account.pesel
+    return None if key == "Invalid" else key
+
+
+def _surname(account):
+    # Always a string, so a surname set to another type cannot break the ordering
+    surname = getattr(account, "last_name", None)
+    return None if surname is None else str(surname)
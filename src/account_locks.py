@@ -0,0 +1,38 @@
+import threading
+from contextlib import contextmanager
+
+
+class LockStripes:
+    """
+    Fixed pool of locks shared by all accounts.
+
+    An account is guarded by the stripe its hash maps to, so memory does
+    not grow with the number of accounts. `hold` acquires the stripes of
+    several accounts in ascending stripe order; every caller uses the same
+    order, so two transfers in opposite directions cannot deadlock.
+    """
+
+    def __init__(self, stripes: int = 256):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def stripe(self, account) -> int:
+        return hash(account) % len(self._locks)
+
+    def balance(self, account) -> float:
+        """Current balance of an account; only this process changes it."""
+        return account.balance
+
+    @contextmanager
+    def hold(self, *accounts):
+        # Accounts sharing a stripe take it once; Lock is not reentrant
+        stripes = sorted({self.stripe(account) for account in accounts})
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
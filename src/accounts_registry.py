@@ -1,25 +1,214 @@
-from src.personal_account import PersonalAccount
+import threading
+from src.account import Account
+from src.account_indexes import AccountIndex
+from src.account_locks import LockStripes
+
+
+INVALID_KEY = "Invalid"
+
+
+def primary_key(account: Account) -> tuple:
+    """Storage key of an account: ("pesel", ...) or ("nip", ...)."""
+    pesel = getattr(account, 'pesel', None)
+    if pesel is not None:
+        return ("pesel", pesel)
+    return ("nip", account.nip)
 
 
 class AccountsRegistry:
-    
-    def __init__(self):
-        self.accounts = []
-    
-    def add_account(self, account: PersonalAccount) -> None:
-        self.accounts.append(account)
-    
-    def find_account_by_pesel(self, pesel: str) -> PersonalAccount | None:
-        for account in self.accounts:
-            if account.pesel == pesel:
-                return account
-        return None
-    
+    # Every account lives in memory; see StorageBackedRegistry for the alternative
+    storage_backed = False
+
+    def __init__(self, indexes: dict | None = None):
+        # Insertion-ordered dict used as an ordered set, so removal is O(1)
+        self._accounts = {}
+        self._by_pesel = {}
+        self._by_nip = {}
+        self._indexes = {}
+        # Changes since the last save, for incremental persistence
+        self._dirty = {}
+        self._removed = {}
+        # Until the first save (or after clear) storage may hold unrelated data
+        self.needs_full_save = True
+        # Notified of every created, modified and removed account
+        self._observers = []
+        # Bound once and shared by every account, instead of one per account
+        self._listener = self._on_account_change
+        # Guards the account set, lookups, indexes and change tracking;
+        # lookups by key are plain dict reads and need no lock
+        self.lock = threading.RLock()
+        # Per-account locks for balance updates, see src.transfers
+        self.locks = LockStripes()
+        for name, index in (indexes or {}).items():
+            self.add_index(name, index)
+
+    @property
+    def accounts(self) -> list:
+        with self.lock:
+            return list(self._accounts)
+
+    def add_account(self, account: Account, stored: bool = False) -> None:
+        """
+        Register an account. One read from storage (`stored`) is already
+        saved: it is not tracked as changed and observers are not told.
+        """
+        with self.lock:
+            # Every key first: a failure must not leave the account half-registered
+            keys = self._index_keys(account)
+            self._accounts[account] = None
+            self._index(account)
+            for index, value in keys:
+                index.add_key(account, value)
+            account._listener = self._listener
+            if stored:
+                return
+            self._dirty[account] = None
+            for observer in self._observers:
+                observer.account_changed(account)
+
+    def add_accounts(self, accounts) -> list:
+        """
+        Add accounts in one operation, skipping any whose PESEL or NIP is
+        already registered, including by an earlier account of the batch.
+
+        Returns:
+            The skipped accounts
+        """
+        skipped = []
+        with self.lock:
+            for account in accounts:
+                field, key = primary_key(account)
+                exists = self.pesel_exists(key) if field == "pesel" else self.nip_exists(key)
+                if exists:
+                    skipped.append(account)
+                else:
+                    self.add_account(account)
+        return skipped
+
+    def remove_account(self, account: Account) -> bool:
+        with self.lock:
+            if account not in self._accounts:
+                return False
+            del self._accounts[account]
+            self._unindex(account)
+            for index in self._indexes.values():
+                index.remove(account)
+            account._listener = None
+            self._dirty.pop(account, None)
+            self._removed[primary_key(account)] = None
+            for observer in self._observers:
+                observer.account_removed(account)
+            return True
+
+    def clear(self) -> None:
+        with self.lock:
+            for account in self._accounts:
+                account._listener = None
+            self._accounts.clear()
+            self._by_pesel.clear()
+            self._by_nip.clear()
+            for index in self._indexes.values():
+                index.clear()
+            self._dirty.clear()
+            self._removed.clear()
+            self.needs_full_save = True
+
+    def collect_changes(self) -> tuple:
+        """
+        Return and reset the changes made since the last save.
+
+        Returns:
+            Tuple of (accounts created or modified, primary keys of removed accounts)
+        """
+        with self.lock:
+            changes = (list(self._dirty), list(self._removed))
+            self._dirty.clear()
+            self._removed.clear()
+            return changes
+
+    def collect_all(self) -> list:
+        """
+        Return every account for a full save and reset the tracked
+        changes, so changes made during the save are kept for the next.
+        """
+        with self.lock:
+            self._dirty.clear()
+            self._removed.clear()
+            return list(self._accounts)
+
+    def mark_saved(self) -> None:
+        """Record that storage holds every account as of collect_all or a load."""
+        self.needs_full_save = False
+
+    def add_observer(self, observer) -> None:
+        """
+        Register an object with account_changed(account) and
+        account_removed(account) methods, called on every mutation.
+        """
+        self._observers.append(observer)
+
+    def remove_observer(self, observer) -> None:
+        self._observers.remove(observer)
+
+    def add_index(self, name: str, index: AccountIndex) -> None:
+        """Register a secondary index and build it from the current accounts."""
+        with self.lock:
+            index.clear()
+            for account in self._accounts:
+                index.add(account)
+            self._indexes[name] = index
+
+    def get_index(self, name: str) -> AccountIndex:
+        return self._indexes[name]
+
+    def find_account_by_pesel(self, pesel: str) -> Account | None:
+        return self._by_pesel.get(pesel)
+
+    def find_account_by_nip(self, nip: str) -> Account | None:
+        return self._by_nip.get(nip)
+
     def pesel_exists(self, pesel: str) -> bool:
-        return self.find_account_by_pesel(pesel) is not None
-    
+        return pesel in self._by_pesel
+
+    def nip_exists(self, nip: str) -> bool:
+        return nip in self._by_nip
+
     def get_all_accounts(self) -> list:
-        return self.accounts
-    
+        with self.lock:
+            return list(self._accounts)
+
     def get_accounts_count(self) -> int:
-        return len(self.accounts)
+        return len(self._accounts)
+
+    def in_memory_count(self) -> int:
+        """Accounts held in memory; the hot set of a storage-backed registry"""
+        return len(self._accounts)
+
+    def _on_account_change(self, account: Account, field: str, old, new) -> None:
+        with self.lock:
+            self._dirty[account] = None
+            for index in self._indexes.values():
+                if field in index.fields:
+                    index.update(account)
+            for observer in self._observers:
+                observer.account_changed(account)
+
+    def _index_keys(self, account: Account) -> list:
+        return [(index, index.key(account)) for index in self._indexes.values()]
+
+    def _index(self, account: Account) -> None:
+        # "Invalid" is a placeholder shared by many accounts, not a real key
+        pesel = getattr(account, 'pesel', None)
+        if pesel is not None and pesel != INVALID_KEY:
+            self._by_pesel[pesel] = account
+        nip = getattr(account, 'nip', None)
+        if nip is not None and nip != INVALID_KEY:
+            self._by_nip[nip] = account
+
+    def _unindex(self, account: Account) -> None:
+        pesel = getattr(account, 'pesel', None)
+        if self._by_pesel.get(pesel) is account:
+            del self._by_pesel[pesel]
+        nip = getattr(account, 'nip', None)
+        if self._by_nip.get(nip) is account:
+            del self._by_nip[nip]
@@ -9,7 +9,37 @@ class AccountsRepository(ABC):
         """Save all accounts to storage"""
         pass
     
+    @abstractmethod
+    def save_changes(self, changed, removed):
+        """Save created or modified accounts and delete removed ones"""
+        pass
+    
     @abstractmethod
     def load_all(self):
         """Load all accounts from storage"""
         pass
+    
+    @abstractmethod
+    def count_accounts(self):
+        """Number of accounts in storage"""
+        pass
+    
+    @abstractmethod
+    def find_by_pesel(self, pesel):
+        """Load one personal account from storage, or None"""
+        pass
+    
+    @abstractmethod
+    def find_by_nip(self, nip):
+        """Load one company account from storage, or None"""
+        pass
+    
+    @abstractmethod
+    def load_page(self, limit=100, after=None):
+        """Load one page of accounts; returns (accounts, cursor for the next page)"""
+        pass
+    
+    @abstractmethod
+    def forget(self, key):
+        """Drop what is remembered about a stored account, e.g. once it leaves a cache"""
+        pass
@@ -0,0 +1,114 @@
+import time
+
+# Sender of transfers that only credit the recipient, e.g. initial deposits
+EXTERNAL_ACCOUNT = "external"
+
+
+def execute_transfers(transfers, registry, atomic: bool = True) -> dict:
+    """
+    Validate and apply a batch of transfers between personal accounts.
+
+    Each transfer is a dict with "from_account" (a PESEL or "external"),
+    "to_account", "amount" and optional "express", as accepted by
+    POST /api/transfer. Every PESEL is looked up once, and the whole batch
+    is validated in one pass against running balances, so a transfer may
+    spend money received earlier in the batch. A standard transfer needs
+    an amount below the sender's balance, as Account.outgoing_transfer does.
+    The locks of every account in the batch are held from validation until
+    the last transfer is applied.
+
+    Args:
+        transfers: List of transfer dicts
+        registry: AccountsRegistry holding the accounts
+        atomic: Apply nothing unless every transfer is valid; otherwise
+            apply the valid transfers and report the rest
+
+    Returns:
+        Dict with per-transfer "results" (in input order), the numbers of
+        "applied" and "failed" transfers and the wall time in "elapsed" seconds
+    """
+    start = time.perf_counter()
+    pesels = {
+        transfer.get(field)
+        for transfer in transfers if isinstance(transfer, dict)
+        for field in ("from_account", "to_account")
+        if isinstance(transfer.get(field), str)
+    }
+    pesels.discard(EXTERNAL_ACCOUNT)
+    accounts = {pesel: registry.find_account_by_pesel(pesel) for pesel in pesels}
+    with registry.locks.hold(*(account for account in accounts.values() if account is not None)):
+        results, applied = _validate_and_apply(transfers, accounts.get, atomic)
+
+    return {
+        "results": results,
+        "applied": applied,
+        "failed": sum(result["status"] == "failed" for result in results),
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+def _validate_and_apply(transfers, resolve, atomic: bool) -> tuple:
+    balances = {}
+    results = []
+    planned = []
+    for transfer in transfers:
+        error, plan = _validate(transfer, resolve, balances)
+        if error is None:
+            sender, recipient, amount, express = plan
+            if sender is not None:
+                balances[sender] -= amount + (sender.EXPRESS_FEE if express else 0.0)
+            balances[recipient] += amount
+            planned.append((len(results), plan))
+            results.append({"status": "ok"})
+        else:
+            results.append({"status": "failed", "error": error})
+
+    if atomic and len(planned) < len(results):
+        for position, _ in planned:
+            results[position] = {"status": "not_applied"}
+        planned = []
+
+    for _, (sender, recipient, amount, express) in planned:
+        if sender is not None:
+            if express:
+                sender.express_outgoing(amount)
+            else:
+                sender.outgoing_transfer(amount)
+        recipient.incoming_transfer(amount)
+    return results, len(planned)
+
+
+def _validate(transfer, resolve, balances) -> tuple:
+    """Return (error, None) or (None, (sender or None, recipient, amount, express))."""
+    if not isinstance(transfer, dict):
+        return "Transfer must be an object", None
+    from_account = transfer.get("from_account")
+    to_account = transfer.get("to_account")
+    amount = transfer.get("amount")
+    express = bool(transfer.get("express", False))
+
+    if not from_account or not to_account or not amount:
+        return "Missing required fields: from_account, to_account, amount", None
+    if not isinstance(from_account, str) or not isinstance(to_account, str):
+        return "Accounts must be given as PESEL strings", None
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        return "Amount must be a number", None
+    if amount <= 0:
+        return "Amount must be greater than 0", None
+
+    recipient = resolve(to_account)
+    if from_account == EXTERNAL_ACCOUNT:
+        if recipient is None:
+            return "Account not found", None
+        balances.setdefault(recipient, recipient.balance)
+        return None, (None, recipient, amount, False)
+
+    sender = resolve(from_account)
+    if sender is None or recipient is None:
+        return "One or both accounts not found", None
+
+    available = balances.setdefault(sender, sender.balance)
+    balances.setdefault(recipient, recipient.balance)
+    if (amount + sender.EXPRESS_FEE > available) if express else (amount >= available):
+        return "Insufficient funds", None
+    return None, (sender, recipient, amount, express)
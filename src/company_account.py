@@ -1,12 +1,53 @@
+import logging
 import os
-import requests
 from datetime import datetime
 from src.account import Account
+from src.mf_snapshot import MFSnapshot
+from src.ttl_cache import TTLCache
 from smtp.smtp import SMTPClient
 
+logger = logging.getLogger("bank_app.mf")
+
+
+class _LazyMFClient:
+    """Creates an MF client on first access; importing requests is deferred until then."""
+
+    def __init__(self, client_class: str = "MFClient"):
+        self.client_class = client_class
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        from src import mf_client
+        client = getattr(mf_client, self.client_class).from_env()
+        client.metrics_hook = owner.mf_metrics_hook
+        # Replace the descriptor, so later lookups are plain attribute reads
+        setattr(owner, self.name, client)
+        return client
+
 
 class CompanyAccount(Account):
+    __slots__ = ("company_name", "nip")
+    TYPE = "company"
+    EXPRESS_FEE = 5.0
+    ZUS_PAYMENT = -1775.0
+    TRACKED_AMOUNT = ZUS_PAYMENT
     MF_API_URL = os.getenv('BANK_APP_MF_URL', 'https://wl-test.mf.gov.pl')
+    # Validation results keyed by (NIP, date), shared by all company accounts
+    nip_cache = TTLCache(
+        maxsize=int(os.getenv('BANK_APP_MF_CACHE_SIZE', '1024')),
+        ttl=float(os.getenv('BANK_APP_MF_CACHE_TTL', '3600')),
+    )
+    nip_cache_negative_ttl = float(os.getenv('BANK_APP_MF_CACHE_NEGATIVE_TTL', '300'))
+    # Pooled, timeout-bound client with retries and a circuit breaker
+    mf_client = _LazyMFClient()
+    # Its asyncio counterpart, used by the ASGI app (app.asgi)
+    async_mf_client = _LazyMFClient("AsyncMFClient")
+    # metrics_hook given to both clients when they are created, e.g. Metrics.mf_call
+    mf_metrics_hook = None
+    # Optional local whitelist snapshot consulted before the online check
+    mf_snapshot = MFSnapshot(os.environ['BANK_APP_MF_SNAPSHOT']) if os.getenv('BANK_APP_MF_SNAPSHOT') else None
     
     def __init__(self, company_name, nip):
         super().__init__()
@@ -19,45 +60,88 @@ class CompanyAccount(Account):
                 raise ValueError("Company not registered!!")
             self.nip = nip
     
-    def _validate_nip_with_mf(self, nip: str) -> bool:
-        try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            
-            url = f"{self.MF_API_URL}/api/search/nip/{nip}?date={today}"
-            
-            response = requests.get(url)
-            
-            print(f"MF API Response for NIP {nip}: {response.text}")
-            
-            if response.status_code != 200:
-                return False
-            
-            data = response.json()
-            
-            if 'result' in data and 'subject' in data['result']:
-                subject = data['result']['subject']
-                status_vat = subject.get('statusVat')
-                return status_vat == "Czynny"
-            
+    @classmethod
+    def _validate_nip_with_mf(cls, nip: str) -> bool:
+        today = datetime.now().strftime('%Y-%m-%d')
+        known = cls._known_nip_status(nip, today)
+        if known is not None:
+            return known
+        return cls._remember_nip_status(nip, today, cls._fetch_nip_status(nip, today))
+
+    @classmethod
+    async def _validate_nip_with_mf_async(cls, nip: str) -> bool:
+        """Same check as _validate_nip_with_mf, awaiting the MF API instead of blocking."""
+        today = datetime.now().strftime('%Y-%m-%d')
+        known = cls._known_nip_status(nip, today)
+        if known is not None:
+            return known
+        return cls._remember_nip_status(nip, today, await cls._fetch_nip_status_async(nip, today))
+
+    @classmethod
+    def _known_nip_status(cls, nip: str, today: str) -> bool | None:
+        if cls.mf_snapshot is not None and nip in cls.mf_snapshot:
+            return True
+        return cls.nip_cache.get((nip, today))
+
+    @classmethod
+    def _remember_nip_status(cls, nip: str, today: str, is_active: bool | None) -> bool:
+        if is_active is None:
+            # Network and API errors are not cached so the next attempt retries
             return False
-            
+
+        ttl = None if is_active else cls.nip_cache_negative_ttl
+        cls.nip_cache.put((nip, today), is_active, ttl=ttl)
+        return is_active
+
+    @classmethod
+    def _fetch_nip_status(cls, nip: str, today: str) -> bool | None:
+        """Return whether the subject is an active VAT payer, or None on API errors."""
+        try:
+            response = cls.mf_client.get(f"{cls.MF_API_URL}/api/search/nip/{nip}?date={today}")
+            return cls._parse_nip_status(nip, response)
         except Exception as e:
-            print(f"Error validating NIP with MF API: {e}")
-            return False
+            logger.warning("Error validating NIP %s with MF API: %s", nip, e)
+            return None
+
+    @classmethod
+    async def _fetch_nip_status_async(cls, nip: str, today: str) -> bool | None:
+        try:
+            response = await cls.async_mf_client.get(f"{cls.MF_API_URL}/api/search/nip/{nip}?date={today}")
+            return cls._parse_nip_status(nip, response)
+        except Exception as e:
+            logger.warning("Error validating NIP %s with MF API: %s", nip, e)
+            return None
+
+    @staticmethod
+    def _parse_nip_status(nip: str, response) -> bool | None:
+        # Status only; the response body is the whole whitelist entry
+        logger.debug("MF API response for NIP %s: HTTP %s", nip, response.status_code)
+        
+        if response.status_code != 200:
+            return None
+        
+        data = response.json()
+        
+        if 'result' in data and 'subject' in data['result']:
+            subject = data['result']['subject']
+            status_vat = subject.get('statusVat')
+            return status_vat == "Czynny"
+        
+        return False
     
     def express_outgoing(self, amount):
-        fee = 5.0
+        fee = self.EXPRESS_FEE
         total_amount = amount + fee
         if (amount > 0 and total_amount <= self.balance + fee):
+            self.history.record(-amount)
+            self.history.record(-int(fee))
             self.balance -= total_amount
-            self.history.append(f'-{amount}')
-            self.history.append(f"-{int(fee)}")
 
     def _balance_sufficient(self, amount):
         return self.balance >= amount * 2
 
     def _has_zus_transfer(self):
-        return "-1775.0" in self.history
+        return self.history.tracked_count > 0
 
     def take_loan(self, amount):
         approved = self._balance_sufficient(amount) and self._has_zus_transfer()
@@ -81,16 +165,15 @@ class CompanyAccount(Account):
         subject = f"Account Transfer History {today}"
         text = f"Company account history: {self.history}"
         
-        smtp_client = SMTPClient()
-        return smtp_client.send(subject, text, email_address)
+        return self._send_email(SMTPClient(), subject, text, email_address)
     
     def to_dict(self):
         return {
-            "type": "company",
+            "type": self.TYPE,
             "company_name": self.company_name,
             "nip": self.nip,
             "balance": self.balance,
-            "history": self.history
+            "history": list(self.history)
         }
     
     @staticmethod
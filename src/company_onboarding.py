@@ -0,0 +1,77 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.company_account import CompanyAccount
+
+
+def validate_nips(nips, validate=None, max_workers: int = 8) -> dict:
+    """
+    Validate NIPs concurrently, calling `validate` once per distinct NIP.
+    Defaults to the MF whitelist check.
+
+    Returns:
+        Dict mapping each distinct NIP to its validation result
+    """
+    validate = validate or CompanyAccount._validate_nip_with_mf
+    unique = list(dict.fromkeys(nips))
+    if not unique:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as pool:
+        return dict(zip(unique, pool.map(validate, unique)))
+
+
+def onboard_companies(companies, registry, validate=None, max_workers: int = 8, validated=None) -> dict:
+    """
+    Validate and create a batch of company accounts.
+
+    Args:
+        companies: List of dicts with "name" and "nip"
+        registry: AccountsRegistry receiving the created accounts
+        validate: NIP validation function, the MF whitelist check by default
+        max_workers: Maximum number of concurrent validations
+        validated: Results already known by NIP, e.g. from validate_nips;
+            only the other NIPs are validated
+
+    Returns:
+        Dict with per-company "results" (in input order), the number of
+        "created" accounts and the batch wall time in "elapsed" seconds
+    """
+    start = time.perf_counter()
+    results = [None] * len(companies)
+    pending = {}
+
+    for position, company in enumerate(companies):
+        nip = company.get("nip")
+        if not isinstance(nip, str) or len(nip) != 10:
+            results[position] = {"nip": nip, "status": "invalid", "error": "NIP must be exactly 10 digits"}
+        elif not isinstance(company.get("name"), str):
+            results[position] = {"nip": nip, "status": "invalid", "error": "Company name must be a string"}
+        elif registry.nip_exists(nip):
+            results[position] = {"nip": nip, "status": "exists", "error": "Account with this NIP already exists"}
+        elif nip in pending:
+            results[position] = {"nip": nip, "status": "duplicate", "error": "NIP repeated in batch"}
+        else:
+            pending[nip] = position
+
+    validated = dict(validated or {})
+    validated.update(validate_nips([nip for nip in pending if nip not in validated], validate, max_workers))
+
+    accounts = []
+    for nip, position in pending.items():
+        if validated[nip]:
+            accounts.append(CompanyAccount.from_dict({
+                "company_name": companies[position].get("name"),
+                "nip": nip,
+                "balance": 0.0,
+                "history": [],
+            }))
+            results[position] = {"nip": nip, "status": "created"}
+        else:
+            results[position] = {"nip": nip, "status": "rejected", "error": "Company not registered!!"}
+    # The check above ran before validation; a concurrent request may have
+    # created some of these NIPs since, so add_accounts checks again
+    skipped = registry.add_accounts(accounts)
+    for account in skipped:
+        results[pending[account.nip]] = {"nip": account.nip, "status": "exists",
+                                         "error": "Account with this NIP already exists"}
+
+    return {"results": results, "created": len(accounts) - len(skipped), "elapsed": time.perf_counter() - start}
@@ -0,0 +1,268 @@
+import json
+import os
+import shutil
+import threading
+from src.personal_account import PersonalAccount
+from src.company_account import CompanyAccount
+
+JOURNAL_FILE = "journal.log"
+# Journal moved aside by a snapshot in progress
+PREVIOUS_JOURNAL_FILE = "journal.log.1"
+SNAPSHOT_FILE = "snapshot.jsonl"
+
+
+class Journal:
+    """
+    Append-only write-ahead journal of registry mutations with snapshots.
+
+    Records are JSON lines carrying a sequence number. `append` only
+    buffers the record in memory; a background thread takes the buffer
+    every `commit_interval` seconds and writes and fsyncs it outside the
+    buffer's lock, so appends never wait for the disk and concurrent
+    writers share one fsync (group commit). `wait_durable` blocks until a
+    record is on disk.
+
+    `write_snapshot` stores the whole registry with the last sequence
+    number and starts a new journal; `snapshot_in_background` does so on
+    a separate thread. The old journal is moved aside and only deleted
+    once the snapshot is on disk, so commits carry on into the new one
+    while the snapshot is written. `recover` loads the latest snapshot
+    and replays the journal records written after it.
+
+    Callers must not mutate the registry while a snapshot is taken; hold
+    `lock` around each mutation and its append. The snapshot holds it
+    only while copying the registry, not while writing the file. A
+    storage-backed registry is flushed first and only its hot set is
+    copied, as everything else is in storage.
+    """
+
+    def __init__(self, directory: str, commit_interval: float = 0.005, snapshot_every: int = 100000):
+        os.makedirs(directory, exist_ok=True)
+        self.journal_path = os.path.join(directory, JOURNAL_FILE)
+        self.previous_journal_path = os.path.join(directory, PREVIOUS_JOURNAL_FILE)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.commit_interval = commit_interval
+        self.snapshot_every = snapshot_every
+        self.lock = threading.RLock()
+        # Guards the sequence numbers and the buffer
+        self._condition = threading.Condition()
+        # Guards the file; taken after `lock` and before `_condition`
+        self._io_lock = threading.Lock()
+        self._buffer = []
+        self._seq = max(_snapshot_seq(self.snapshot_path), _last_journal_seq(self.previous_journal_path),
+                        _last_journal_seq(self.journal_path))
+        self._durable_seq = self._seq
+        self._records_since_snapshot = 0
+        self._file = open(self.journal_path, "ab")
+        self._closed = False
+        self._snapshot_thread = None
+        self._thread = threading.Thread(target=self._run, name="journal-commit", daemon=True)
+        self._thread.start()
+
+    @property
+    def needs_snapshot(self) -> bool:
+        return self._records_since_snapshot >= self.snapshot_every
+
+    def append(self, record: dict) -> int:
+        """Buffer a record and return its sequence number."""
+        with self._condition:
+            self._seq += 1
+            line = json.dumps({"seq": self._seq, **record}, separators=(",", ":"))
+            self._buffer.append(line.encode("utf-8") + b"\n")
+            self._records_since_snapshot += 1
+            return self._seq
+
+    def wait_durable(self, seq: int, timeout: float | None = None) -> bool:
+        """Block until the record `seq` has been fsynced."""
+        with self._condition:
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: self._durable_seq >= seq, timeout)
+
+    def write_snapshot(self, registry) -> int:
+        """Persist the registry state and start a new, empty journal."""
+        if registry.storage_backed:
+            registry.flush()
+        with self.lock:
+            accounts = [account.to_dict() for account in registry.accounts]
+            with self._condition:
+                seq = self._seq
+                self._records_since_snapshot = 0
+            # Still under `lock`, so the new journal only gets records after seq,
+            # and records up to seq still buffered, which recovery skips
+            with self._io_lock:
+                self._start_new_journal()
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, "wb") as snapshot:
+            snapshot.write(json.dumps({"seq": seq}).encode("utf-8") + b"\n")
+            for account in accounts:
+                snapshot.write(json.dumps(account, separators=(",", ":")).encode("utf-8") + b"\n")
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        # Records up to seq are covered by the snapshot; a crash before the
+        # removal is harmless because recovery skips them
+        os.remove(self.previous_journal_path)
+        return seq
+
+    def snapshot_in_background(self, registry) -> bool:
+        """Start write_snapshot on a separate thread unless one is already running."""
+        with self._condition:
+            if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+                return False
+            self._snapshot_thread = threading.Thread(
+                target=self.write_snapshot, args=(registry,), name="journal-snapshot", daemon=True,
+            )
+            self._snapshot_thread.start()
+            return True
+
+    def recover(self, registry) -> int:
+        """
+        Restore `registry` from the snapshot and journal tail.
+
+        Returns:
+            Number of journal records replayed
+        """
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as snapshot:
+                snapshot_seq = json.loads(snapshot.readline())["seq"]
+                for line in snapshot:
+                    registry.add_account(account_from_dict(json.loads(line)), stored=True)
+
+        replayed = 0
+        if os.path.exists(self.previous_journal_path):
+            # Left by a snapshot that did not finish; its records precede the journal's
+            with open(self.previous_journal_path, "rb") as journal:
+                for line in journal:
+                    record = json.loads(line)
+                    if record["seq"] > snapshot_seq:
+                        apply_record(registry, record)
+                        replayed += 1
+        offset = 0
+        with open(self.journal_path, "rb") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final write from a crash; it was never acknowledged,
+                    # so cut it off before new records are appended after it
+                    with self._io_lock:
+                        self._file.truncate(offset)
+                    break
+                offset += len(line)
+                if record["seq"] > snapshot_seq:
+                    apply_record(registry, record)
+                    replayed += 1
+        self._records_since_snapshot = replayed
+        return replayed
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            snapshot_thread = self._snapshot_thread
+        if snapshot_thread is not None:
+            snapshot_thread.join()
+        self._thread.join()
+        self._file.close()
+
+    def _start_new_journal(self) -> None:
+        """Move the journal aside and open an empty one; the caller holds `_io_lock`."""
+        self._file.close()
+        if os.path.exists(self.previous_journal_path):
+            # An earlier snapshot failed: its records stay ahead of these
+            with open(self.previous_journal_path, "ab") as previous, open(self.journal_path, "rb") as journal:
+                shutil.copyfileobj(journal, previous)
+                previous.flush()
+                os.fsync(previous.fileno())
+        else:
+            os.replace(self.journal_path, self.previous_journal_path)
+        self._file = open(self.journal_path, "wb")
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or self._durable_seq < self._seq, self.commit_interval)
+                closed = self._closed
+            with self._io_lock:
+                # Swap the buffer under the lock; write and fsync outside it
+                with self._condition:
+                    pending, self._buffer = self._buffer, []
+                    seq = self._seq
+                if pending:
+                    self._file.write(b"".join(pending))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                with self._condition:
+                    if seq > self._durable_seq:
+                        self._durable_seq = seq
+                        self._condition.notify_all()
+            if closed:
+                return
+
+
+def account_from_dict(data: dict):
+    if data["type"] == CompanyAccount.TYPE:
+        return CompanyAccount.from_dict(data)
+    return PersonalAccount.from_dict(data)
+
+
+def apply_record(registry, record: dict) -> None:
+    """Re-apply one journal record to the registry."""
+    op = record["op"]
+    if op == "create":
+        registry.add_account(account_from_dict(record["account"]))
+        return
+
+    field, value = record["key"]
+    if field == "pesel":
+        account = registry.find_account_by_pesel(value)
+    else:
+        account = registry.find_account_by_nip(value)
+
+    if op == "transfer":
+        kind = record["kind"]
+        if kind == "incoming":
+            account.incoming_transfer(record["amount"])
+        elif kind == "outgoing":
+            account.outgoing_transfer(record["amount"])
+        elif kind == "refund":
+            account.refund(record["amount"])
+        else:
+            account.express_outgoing(record["amount"])
+    elif op == "patch":
+        if "first_name" in record:
+            account.first_name = record["first_name"]
+        if "last_name" in record:
+            account.last_name = record["last_name"]
+    elif op == "delete":
+        registry.remove_account(account)
+
+
+def _snapshot_seq(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as snapshot:
+        return json.loads(snapshot.readline())["seq"]
+
+
+def _last_journal_seq(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as journal:
+        journal.seek(0, os.SEEK_END)
+        # Read backwards just far enough to find the last complete record
+        end = journal.tell()
+        chunk = 4096
+        while True:
+            start = max(0, end - chunk)
+            journal.seek(start)
+            lines = journal.read(end - start).splitlines()
+            for line in reversed(lines):
+                try:
+                    return json.loads(line)["seq"]
+                except (ValueError, TypeError, KeyError):
+                    continue
+            if start == 0:
+                return 0
+            chunk *= 2
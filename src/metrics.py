@@ -0,0 +1,221 @@
+import math
+import threading
+
+
+class LatencyHistogram:
+    """
+    Log-linear (HDR-style) latency histogram over integer nanoseconds.
+
+    Every power of two from 2**MIN_BITS ns (~1µs) to 2**MAX_BITS ns
+    (~69s) is split into SUB_BUCKETS equal buckets, so a value is placed
+    within 25% of its size at any scale. Faster values share the first
+    bucket and slower ones the overflow bucket. Recording is a
+    bit_length, a shift and a list increment.
+    """
+
+    SUB_BITS = 2
+    SUB_BUCKETS = 1 << SUB_BITS
+    MIN_BITS = 10
+    MAX_BITS = 36
+    # First bucket, SUB_BUCKETS per power of two, overflow bucket
+    BUCKETS = 1 + (MAX_BITS - MIN_BITS) * SUB_BUCKETS + 1
+
+    __slots__ = ("counts", "sum_ns", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.sum_ns = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def bucket(cls, ns: int) -> int:
+        bits = ns.bit_length()
+        if bits <= cls.MIN_BITS:
+            return 0
+        if bits > cls.MAX_BITS:
+            return cls.BUCKETS - 1
+        sub = (ns >> (bits - 1 - cls.SUB_BITS)) & (cls.SUB_BUCKETS - 1)
+        return 1 + (bits - cls.MIN_BITS - 1) * cls.SUB_BUCKETS + sub
+
+    @classmethod
+    def upper_bound(cls, index: int) -> float:
+        """Exclusive upper bound of bucket `index` in ns; inf for the overflow bucket."""
+        if index == 0:
+            return float(1 << cls.MIN_BITS)
+        if index == cls.BUCKETS - 1:
+            return float("inf")
+        octave, sub = divmod(index - 1, cls.SUB_BUCKETS)
+        return (1 << (cls.MIN_BITS + octave)) * (1 + (sub + 1) / cls.SUB_BUCKETS)
+
+    def record(self, ns: int) -> None:
+        index = self.bucket(ns)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum_ns += ns
+
+    def snapshot(self) -> tuple[list, int, int]:
+        """(bucket counts, count, sum in ns), read consistently."""
+        with self._lock:
+            counts = list(self.counts)
+            sum_ns = self.sum_ns
+        return counts, sum(counts), sum_ns
+
+    def percentile(self, percent: float) -> float:
+        """Upper bound in ns of the bucket holding the given percentile; 0.0 when empty."""
+        counts, count, _ = self.snapshot()
+        if not count:
+            return 0.0
+        rank = min(count, max(1, math.ceil(percent / 100 * count)))
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.upper_bound(index)
+
+
+class RouteStats(LatencyHistogram):
+    """Latency histogram of one route that also counts its responses by status."""
+
+    __slots__ = ("statuses",)
+
+    def __init__(self):
+        super().__init__()
+        self.statuses = {}
+
+    def record_response(self, ns: int, status: int) -> None:
+        # One lock for both, as this runs on every request
+        index = self.bucket(ns)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum_ns += ns
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def status_counts(self) -> list:
+        with self._lock:
+            return sorted(self.statuses.items())
+
+
+class Metrics:
+    """
+    Request and dependency metrics of one process, rendered in the
+    Prometheus text format by `render`.
+
+    - observe_request: latency histogram and counts by status per
+      (method, route)
+    - observe_call: latency histogram per (service, operation) of
+      outgoing calls, e.g. ("mongo", "save_changes"), and an error count
+    - gauge: a value read when rendering, e.g. the registry size
+
+    `mf_call`, `mongo_call` and `email_sent` are shaped to be used as the
+    metrics hooks of MFClient, MongoAccountsRepository and Account.
+    """
+
+    def __init__(self, prefix: str = "bank_app"):
+        self.prefix = prefix
+        self.enabled = True
+        self._requests = {}
+        self._calls = {}
+        self._call_errors = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status: int, ns: int) -> None:
+        stats = self._requests.get((method, route))
+        if stats is None:
+            with self._lock:
+                stats = self._requests.setdefault((method, route), RouteStats())
+        stats.record_response(ns, status)
+
+    def observe_call(self, service: str, operation: str, seconds: float, error: bool = False) -> None:
+        key = (service, operation)
+        histogram = self._calls.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._calls.setdefault(key, LatencyHistogram())
+        histogram.record(int(seconds * 1e9))
+        if error:
+            with self._lock:
+                self._call_errors[key] = self._call_errors.get(key, 0) + 1
+
+    def mf_call(self, event: dict) -> None:
+        """MFClient metrics_hook: one histogram entry per attempt; errors include 5xx answers."""
+        failed = event["error"] is not None or (event["status"] or 0) >= 500
+        self.observe_call("mf", "search_nip", event["elapsed"], error=failed)
+
+    def mongo_call(self, operation: str, seconds: float) -> None:
+        """MongoAccountsRepository metrics_hook."""
+        self.observe_call("mongo", operation, seconds)
+
+    def email_sent(self, seconds: float, sent: bool) -> None:
+        """Account email_metrics_hook."""
+        self.observe_call("smtp", "send", seconds, error=not sent)
+
+    def gauge(self, name: str, description: str, read) -> None:
+        """Expose `read()` as the gauge <prefix>_<name>."""
+        self._gauges[name] = (description, read)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            requests = sorted(self._requests.items())
+            calls = sorted(self._calls.items())
+            call_errors = dict(self._call_errors)
+        prefix = self.prefix
+        lines = []
+
+        lines += _header(f"{prefix}_requests_total", "counter", "HTTP requests by method, route and status.")
+        for (method, route), stats in requests:
+            for status, count in stats.status_counts():
+                lines.append(f'{prefix}_requests_total{_labels(method=method, route=route, status=status)} {count}')
+
+        lines += _header(f"{prefix}_request_duration_seconds", "histogram", "HTTP request latency by method and route.")
+        for (method, route), histogram in requests:
+            lines += _histogram_lines(f"{prefix}_request_duration_seconds", histogram, method=method, route=route)
+
+        lines += _header(f"{prefix}_external_call_duration_seconds", "histogram",
+                         "Latency of calls to the MF API, SMTP and MongoDB.")
+        for (service, operation), histogram in calls:
+            lines += _histogram_lines(f"{prefix}_external_call_duration_seconds", histogram,
+                                      service=service, operation=operation)
+
+        lines += _header(f"{prefix}_external_call_errors_total", "counter",
+                         "Failed calls to the MF API, SMTP and MongoDB.")
+        for (service, operation), _ in calls:
+            errors = call_errors.get((service, operation), 0)
+            lines.append(f'{prefix}_external_call_errors_total{_labels(service=service, operation=operation)} {errors}')
+
+        for name, (description, read) in sorted(self._gauges.items()):
+            lines += _header(f"{prefix}_{name}", "gauge", description)
+            lines.append(f"{prefix}_{name} {_number(read())}")
+        return "\n".join(lines) + "\n"
+
+
+def _header(name: str, kind: str, description: str) -> list:
+    return [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+
+
+def _histogram_lines(name: str, histogram: LatencyHistogram, **labels) -> list:
+    counts, count, sum_ns = histogram.snapshot()
+    lines = []
+    cumulative = 0
+    for index, bucket_count in enumerate(counts):
+        cumulative += bucket_count
+        bound = histogram.upper_bound(index)
+        le = "+Inf" if bound == float("inf") else _number(bound / 1e9)
+        lines.append(f"{name}_bucket{_labels(**labels, le=le)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {_number(sum_ns / 1e9)}")
+    lines.append(f"{name}_count{_labels(**labels)} {count}")
+    return lines
+
+
+def _labels(**labels) -> str:
+    pairs = (f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
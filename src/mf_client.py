@@ -0,0 +1,274 @@
+import asyncio
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker rejects a call to a degraded upstream."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated upstream failures.
+
+    After `failure_threshold` consecutive failed calls the breaker opens and
+    rejects calls for `reset_timeout` seconds. It then lets a single trial
+    call through (half-open) and rejects the others until the trial reports
+    back; success closes it, failure opens it again. A trial that never
+    reports back, e.g. a cancelled coroutine, is replaced after another
+    `reset_timeout`. Safe to share between threads.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == self.HALF_OPEN:
+                now = self._clock()
+                if self._trial_started is not None and now - self._trial_started < self.reset_timeout:
+                    return False
+                # Only one trial call until it reports back
+                self._state = self.HALF_OPEN
+                self._trial_started = now
+                return True
+            return state == self.CLOSED
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+            self._trial_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+            self._trial_started = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = 0.0
+            self._trial_started = None
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+
+class MFClient:
+    """
+    HTTP client for the MF whitelist API.
+
+    Uses one keep-alive session with a bounded connection pool, connect and
+    read timeouts, retries with exponential backoff for network errors and
+    5xx/429 responses, and a circuit breaker. Every attempt is reported to
+    `metrics_hook`, if set, as a dict with url, status, error, attempt and
+    elapsed seconds.
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 max_retries: int = 2, backoff_factor: float = 0.1, breaker: CircuitBreaker | None = None,
+                 metrics_hook=None, sleep=time.sleep):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics_hook = metrics_hook
+        self._sleep = sleep
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_env(cls) -> "MFClient":
+        return cls(**_settings_from_env())
+
+    def get(self, url: str):
+        """
+        GET `url`, retrying transient failures.
+
+        Returns:
+            The last response received
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            Exception: The last network error if no response was received
+        """
+        if not self.breaker.allow_request():
+            self._report(url, None, "circuit open", 0, 0.0)
+            raise CircuitOpenError(f"MF API circuit is open, not calling {url}")
+
+        response = None
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._sleep(self.backoff_factor * (2 ** (attempt - 1)))
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                error = None
+            except Exception as e:
+                response = None
+                error = e
+            status = None if response is None else response.status_code
+            self._report(url, status, error, attempt, time.perf_counter() - start)
+            if response is not None and status not in self.RETRY_STATUSES:
+                self.breaker.record_success()
+                return response
+
+        self.breaker.record_failure()
+        if response is None:
+            raise error
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "pool_size": self.pool_size,
+            "timeout": self.timeout,
+            "max_retries": self.max_retries,
+            "breaker_state": self.breaker.state,
+        }
+
+    def close(self):
+        self.session.close()
+
+    def _report(self, url, status, error, attempt, elapsed) -> None:
+        _report(self.metrics_hook, url, status, error, attempt, elapsed)
+
+
+class AsyncMFClient:
+    """
+    asyncio counterpart of MFClient, for the ASGI app.
+
+    Same timeouts, retries, circuit breaker and metrics_hook, but a call
+    waiting on the MF API is a suspended coroutine rather than a blocked
+    thread, so thousands can be in flight at once. Requests go through one
+    httpx.AsyncClient, created on first use, that keeps at most
+    `pool_size` keep-alive connections. Further calls wait on a semaphore
+    rather than in httpx's pool, whose queue gets slow with thousands of
+    waiters.
+    """
+
+    RETRY_STATUSES = MFClient.RETRY_STATUSES
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 max_retries: int = 2, backoff_factor: float = 0.1, breaker: CircuitBreaker | None = None,
+                 metrics_hook=None, sleep=asyncio.sleep):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics_hook = metrics_hook
+        self._sleep = sleep
+        self._client = None
+        self._connections = asyncio.Semaphore(pool_size)
+
+    @classmethod
+    def from_env(cls) -> "AsyncMFClient":
+        return cls(**_settings_from_env())
+
+    async def get(self, url: str):
+        """
+        GET `url`, retrying transient failures; see MFClient.get.
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            Exception: The last network error if no response was received
+        """
+        client = self._client or self._open()
+        if not self.breaker.allow_request():
+            _report(self.metrics_hook, url, None, "circuit open", 0, 0.0)
+            raise CircuitOpenError(f"MF API circuit is open, not calling {url}")
+
+        response = None
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await self._sleep(self.backoff_factor * (2 ** (attempt - 1)))
+            start = time.perf_counter()
+            try:
+                async with self._connections:
+                    response = await client.get(url)
+                error = None
+            except Exception as e:
+                response = None
+                error = e
+            status = None if response is None else response.status_code
+            _report(self.metrics_hook, url, status, error, attempt, time.perf_counter() - start)
+            if response is not None and status not in self.RETRY_STATUSES:
+                self.breaker.record_success()
+                return response
+
+        self.breaker.record_failure()
+        if response is None:
+            raise error
+        return response
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _open(self):
+        # Imported here, so the synchronous client does not load httpx
+        import httpx
+        connect_timeout, read_timeout = self.timeout
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout, pool=None),
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            headers={"Accept": "application/json"},
+        )
+        return self._client
+
+
+def _settings_from_env() -> dict:
+    return {
+        "pool_size": int(os.getenv('BANK_APP_MF_POOL_SIZE', '10')),
+        "connect_timeout": float(os.getenv('BANK_APP_MF_CONNECT_TIMEOUT', '3.05')),
+        "read_timeout": float(os.getenv('BANK_APP_MF_READ_TIMEOUT', '10')),
+        "max_retries": int(os.getenv('BANK_APP_MF_RETRIES', '2')),
+        "backoff_factor": float(os.getenv('BANK_APP_MF_BACKOFF', '0.1')),
+        "breaker": CircuitBreaker(
+            failure_threshold=int(os.getenv('BANK_APP_MF_BREAKER_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('BANK_APP_MF_BREAKER_RESET', '30')),
+        ),
+    }
+
+
+def _report(metrics_hook, url, status, error, attempt, elapsed) -> None:
+    if metrics_hook is not None:
+        metrics_hook({
+            "url": url,
+            "status": status,
+            "error": None if error is None else str(error),
+            "attempt": attempt,
+            "elapsed": elapsed,
+        })
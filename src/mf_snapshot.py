@@ -0,0 +1,84 @@
+import mmap
+import os
+import re
+
+RECORD_SIZE = 10
+_NIP = re.compile(r"\d{10}")
+
+
+def build_snapshot(source_path: str, snapshot_path: str) -> int:
+    """
+    Convert a whitelist dump into a sorted file of fixed-width NIP records.
+
+    The dump is a text file with one active VAT payer per line; the NIP is
+    the first field (separated by comma, semicolon or whitespace). Lines
+    without a 10-digit NIP, such as headers, are skipped.
+
+    Returns:
+        Number of distinct NIPs written
+    """
+    nips = set()
+    with open(source_path, encoding="utf-8") as source:
+        for line in source:
+            fields = re.split(r"[,;\s]+", line.strip(), maxsplit=1)
+            if _NIP.fullmatch(fields[0]):
+                nips.add(fields[0].encode("ascii"))
+
+    # Write next to the target and rename, so readers never see a partial file
+    temp_path = f"{snapshot_path}.tmp"
+    with open(temp_path, "wb") as snapshot:
+        snapshot.write(b"".join(sorted(nips)))
+    os.replace(temp_path, snapshot_path)
+    return len(nips)
+
+
+class MFSnapshot:
+    """
+    Memory-mapped lookup over a snapshot written by build_snapshot.
+
+    Lookups are a binary search over the mapped records, so the file is
+    never read into the process heap and concurrent processes share the
+    page-cached copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size % RECORD_SIZE:
+            self._file.close()
+            raise ValueError(f"{path} is not a NIP snapshot: size {size} is not a multiple of {RECORD_SIZE}")
+        self._count = size // RECORD_SIZE
+        # mmap cannot map an empty file
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, nip: str) -> bool:
+        if len(nip) != RECORD_SIZE or not nip.isascii():
+            return False
+        key = nip.encode("ascii")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            offset = middle * RECORD_SIZE
+            record = self._map[offset:offset + RECORD_SIZE]
+            if record < key:
+                low = middle + 1
+            elif record > key:
+                high = middle
+            else:
+                return True
+        return False
+
+    def close(self):
+        if self._count:
+            self._map.close()
+        self._file.close()
+
+
+if __name__ == '__main__':
+    import sys
+    written = build_snapshot(sys.argv[1], sys.argv[2])
+    print(f"Wrote {written} NIPs to {sys.argv[2]}")
@@ -1,34 +1,225 @@
-from pymongo import MongoClient
+import time
+from contextlib import contextmanager
+from heapq import merge
+from operator import itemgetter
 from src.accounts_repository import AccountsRepository
+from src.accounts_registry import primary_key, INVALID_KEY
 from src.personal_account import PersonalAccount
 from src.company_account import CompanyAccount
 
 
 class MongoAccountsRepository(AccountsRepository):
-    def __init__(self, connection_string="mongodb://localhost:27017/", db_name="bank_app"):
-        self._client = MongoClient(connection_string)
-        self._db = self._client[db_name]
-        self._collection = self._db["accounts"]
+    # Fields read by from_dict; everything else, including _id, stays on the server
+    PROJECTION = {
+        "_id": 0, "type": 1, "balance": 1, "history": 1,
+        "first_name": 1, "last_name": 1, "pesel": 1, "promo_kod": 1,
+        "company_name": 1, "nip": 1,
+    }
+    # Account type owning each primary key field
+    KEY_TYPES = {"pesel": PersonalAccount.TYPE, "nip": CompanyAccount.TYPE}
+    # Number of history entries, stored next to them so appends can be conditional
+    HISTORY_LENGTH = "history_len"
+    
+    def __init__(self, connection_string="mongodb://localhost:27017/", db_name="bank_app",
+                 collection_name="accounts", batch_size=1000):
+        # pymongo is imported and the client created on first use, so
+        # processes that never touch storage skip both
+        self._connection_string = connection_string
+        self._db_name = db_name
+        self._client = None
+        self._database = None
+        self._collection_name = collection_name
+        self._accounts_collection = None
+        self.batch_size = batch_size
+        # Number of history entries stored per account key, as last written
+        # or read, so incremental saves only push new entries
+        self._saved_history_lengths = {}
+        # Called with an operation name and its duration in seconds, e.g. Metrics.mongo_call
+        self.metrics_hook = None
+    
+    @contextmanager
+    def _timed(self, operation):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.metrics_hook is not None:
+                self.metrics_hook(operation, time.perf_counter() - start)
+    
+    @property
+    def _db(self):
+        if self._database is None:
+            from pymongo import MongoClient
+            self._client = MongoClient(self._connection_string)
+            self._database = self._client[self._db_name]
+        return self._database
+    
+    @_db.setter
+    def _db(self, database):
+        self._database = database
+    
+    @property
+    def _collection(self):
+        if self._accounts_collection is None:
+            collection = self._db[self._collection_name]
+            self.ensure_indexes(collection)
+            self._accounts_collection = collection
+        return self._accounts_collection
+    
+    @_collection.setter
+    def _collection(self, collection):
+        self._accounts_collection = collection
+    
+    def ensure_indexes(self, collection=None):
+        """
+        Create unique indexes on pesel and nip, partial by account type.
+        Accounts with an "Invalid" placeholder key are left out of the
+        index, since several of them may exist.
+        """
+        from pymongo import IndexModel
+        collection = self._collection if collection is None else collection
+        collection.create_indexes([
+            IndexModel(
+                [(field, 1)], name=f"{field}_unique", unique=True,
+                # Digit-only keys sort before the placeholder
+                partialFilterExpression={"type": account_type, field: {"$lt": INVALID_KEY}},
+            )
+            for field, account_type in self.KEY_TYPES.items()
+        ])
     
     def save_all(self, accounts):
         """
-        Save all accounts to MongoDB.
-        Clears the collection before saving.
+        Replace all accounts in MongoDB.
+        Documents are bulk-inserted into a staging collection in unordered
+        batches of `batch_size`, which is then renamed over the accounts
+        collection, so readers see either the old or the new data set.
         
         Args:
             accounts: List of Account objects to save
         """
-        self._collection.delete_many({})
-        for account in accounts:
-            if hasattr(account, 'pesel'):
-                query = {"pesel": account.pesel}
+        from pymongo import InsertOne
+        history_lengths = {}
+        
+        def inserts():
+            for account in accounts:
+                document = account.to_dict()
+                history_lengths[primary_key(account)] = len(document["history"])
+                yield InsertOne({**document, self.HISTORY_LENGTH: len(document["history"])})
+        
+        with self._timed("save_all"):
+            staging = self._db[f"{self._collection_name}_staging"]
+            staging.drop()
+            written, _ = self._bulk_write(staging, inserts())
+            if written:
+                # Built once over the loaded data; a duplicate key aborts before the swap
+                self.ensure_indexes(staging)
+                staging.rename(self._collection_name, dropTarget=True)
             else:
-                query = {"nip": account.nip}
-            self._collection.update_one(
-                query,
-                {"$set": account.to_dict()},
-                upsert=True,
-            )
+                # Renaming requires an existing staging collection
+                self._collection.delete_many({})
+        self._saved_history_lengths = history_lengths
+    
+    def save_changes(self, changed, removed):
+        """
+        Save only what changed since the last save or load.
+        Removed accounts are deleted first. Changed accounts get their
+        scalar fields updated and only new history entries appended with
+        $push/$each, on condition that the stored history_len is the one
+        this repository last wrote or read. Accounts not stored before,
+        and those whose stored history turns out to be another one, are
+        written whole. History lengths are only remembered once the write
+        succeeded, so a failed save is retried in full.
+        
+        Args:
+            changed: Accounts created or modified since the last save
+            removed: Primary keys, e.g. ("pesel", "90010112345"), of removed accounts
+        """
+        from pymongo import DeleteOne
+        with self._timed("save_changes"):
+            # Deletes go first so a removed and re-created key ends up with the new document
+            self._bulk_write(self._collection, (DeleteOne(self._key_filter(field, value)) for field, value in removed))
+            for key in removed:
+                self._saved_history_lengths.pop(key, None)
+            
+            documents = {primary_key(account): account.to_dict() for account in changed}
+            appends = {}
+            operations = []
+            for key, document in documents.items():
+                operation = self._append_operation(key, document)
+                if operation is None:
+                    operation = self._replace_operation(key, document)
+                else:
+                    appends[key] = document
+                operations.append(operation)
+            written, applied = self._bulk_write(self._collection, operations)
+            if applied < written:
+                # An append matched no document: the stored history is not the one it extends
+                stale = self._stale_keys(appends)
+                self._bulk_write(self._collection, (self._replace_operation(key, appends[key]) for key in stale))
+        
+        for key, document in documents.items():
+            self._saved_history_lengths[key] = len(document["history"])
+    
+    def _append_operation(self, key, document):
+        """Update pushing only new history entries, or None if it has to be written whole"""
+        from pymongo import UpdateOne
+        history = document["history"]
+        saved = self._saved_history_lengths.get(key)
+        if saved is None or saved > len(history):
+            return None
+        fields = {name: value for name, value in document.items() if name != "history"}
+        update = {"$set": {**fields, self.HISTORY_LENGTH: len(history)}}
+        if len(history) > saved:
+            update["$push"] = {"history": {"$each": history[saved:]}}
+        return UpdateOne({**self._key_filter(*key), self.HISTORY_LENGTH: saved}, update)
+    
+    def _replace_operation(self, key, document):
+        from pymongo import UpdateOne
+        return UpdateOne(
+            self._key_filter(*key), {"$set": {**document, self.HISTORY_LENGTH: len(document["history"])}}, upsert=True
+        )
+    
+    def _stale_keys(self, appends):
+        """Keys of `appends` whose stored history_len is not the one they wrote"""
+        fields = {account_type: field for field, account_type in self.KEY_TYPES.items()}
+        stored = self._collection.find(
+            {"$or": [self._key_filter(*key) for key in appends]},
+            {"_id": 0, "type": 1, "pesel": 1, "nip": 1, self.HISTORY_LENGTH: 1},
+        )
+        applied = set()
+        for doc in stored:
+            key = (fields[doc["type"]], doc[fields[doc["type"]]])
+            if key in appends and doc.get(self.HISTORY_LENGTH) == len(appends[key]["history"]):
+                applied.add(key)
+        return [key for key in appends if key not in applied]
+    
+    def _key_filter(self, field, value):
+        """Query on a primary key that the partial unique index can serve"""
+        return {"type": self.KEY_TYPES[field], field: value}
+    
+    def _bulk_write(self, collection, operations):
+        """
+        Run operations as unordered bulk writes of at most batch_size.
+        
+        Returns:
+            Tuple (operations sent, documents they inserted, matched or upserted)
+        """
+        written = applied = 0
+        batch = []
+        for operation in operations:
+            batch.append(operation)
+            if len(batch) >= self.batch_size:
+                applied += self._applied(collection.bulk_write(batch, ordered=False))
+                written += len(batch)
+                batch = []
+        if batch:
+            applied += self._applied(collection.bulk_write(batch, ordered=False))
+            written += len(batch)
+        return written, applied
+    
+    @staticmethod
+    def _applied(result):
+        return result.inserted_count + result.matched_count + result.upserted_count
     
     def load_all(self):
         """
@@ -37,14 +228,91 @@ class MongoAccountsRepository(AccountsRepository):
         Returns:
             List of Account objects (PersonalAccount or CompanyAccount)
         """
-        accounts = []
-        for doc in self._collection.find():
-            if doc.get("type") == "personal":
-                accounts.append(PersonalAccount.from_dict(doc))
-            elif doc.get("type") == "company":
-                accounts.append(CompanyAccount.from_dict(doc))
-        return accounts
+        return list(self.iter_all())
+    
+    def iter_all(self, batch_size=None):
+        """
+        Stream all accounts from MongoDB.
+        Documents are fetched in cursor batches of `batch_size` (defaults to
+        the repository batch size) with a projection limited to account
+        fields. The time reported to `metrics_hook` spans the whole stream,
+        consumer included.
+        
+        Yields:
+            Account objects (PersonalAccount or CompanyAccount)
+        """
+        batch_size = batch_size or self.batch_size
+        self._saved_history_lengths = {}
+        documents = self._collection.find({}, self.PROJECTION, batch_size=batch_size)
+        
+        with self._timed("iter_all"):
+            for doc in documents:
+                account = self._from_document(doc)
+                if account is not None:
+                    yield account
+    
+    def count_accounts(self):
+        with self._timed("count_accounts"):
+            return self._collection.count_documents({})
+    
+    def find_by_pesel(self, pesel):
+        """Fetch one personal account from storage, or None"""
+        return self._find_one("pesel", pesel)
+    
+    def find_by_nip(self, nip):
+        """Fetch one company account from storage, or None"""
+        return self._find_one("nip", nip)
+    
+    def load_page(self, limit=100, after=None):
+        """
+        Load one page of accounts ordered by PESEL/NIP, as the in-memory
+        listing pages them. Personal and company accounts are read through
+        their key indexes and merged; accounts with an "Invalid" placeholder
+        key are not paged. The cursor is a key rather than a document id,
+        so it stays valid across a full save.
+        
+        Args:
+            limit: Maximum number of accounts on the page
+            after: Cursor returned with the previous page, None for the first
+        
+        Returns:
+            Tuple (accounts, cursor); cursor is None after the last page
+        """
+        keys = {"$lt": INVALID_KEY} if after is None else {"$gt": after, "$lt": INVALID_KEY}
+        pages = []
+        with self._timed("load_page"):
+            for field, account_type in self.KEY_TYPES.items():
+                # One extra document tells whether another page follows
+                documents = self._collection.find(
+                    {"type": account_type, field: keys}, self.PROJECTION
+                ).sort(field, 1).limit(limit + 1)
+                pages.append([(document[field], document) for document in documents])
+        # PESELs and NIPs differ in length, so keys never collide across types
+        entries = list(merge(*pages, key=itemgetter(0)))
+        accounts = [self._from_document(document) for _, document in entries[:limit]]
+        cursor = entries[limit - 1][0] if len(entries) > limit else None
+        return accounts, cursor
+    
+    def forget(self, key):
+        """Drop the remembered history length of `key`; its next save writes it whole"""
+        self._saved_history_lengths.pop(key, None)
+    
+    def _find_one(self, field, value):
+        with self._timed("find_one"):
+            document = self._collection.find_one(self._key_filter(field, value), self.PROJECTION)
+        return None if document is None else self._from_document(document)
+    
+    def _from_document(self, doc):
+        if doc.get("type") == "personal":
+            account = PersonalAccount.from_dict(doc)
+        elif doc.get("type") == "company":
+            account = CompanyAccount.from_dict(doc)
+        else:
+            return None
+        self._saved_history_lengths[primary_key(account)] = len(account.history)
+        return account
     
     def close(self):
-        """Close MongoDB connection"""
-        self._client.close()
+        """Close MongoDB connection, if one was opened"""
+        if self._client is not None:
+            self._client.close()
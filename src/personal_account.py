@@ -4,10 +4,14 @@ from smtp.smtp import SMTPClient
 
 
 class PersonalAccount(Account):
+    __slots__ = ("_first_name", "_last_name", "pesel", "promo_kod")
+    TYPE = "personal"
+    EXPRESS_FEE = 1.0
+
     def __init__(self, first_name, last_name, pesel, promo_kod=None):
         super().__init__()
-        self.first_name = first_name
-        self.last_name = last_name
+        self._first_name = first_name
+        self._last_name = last_name
         if pesel and len(pesel) == 11:
             self.pesel = pesel
         else:
@@ -16,8 +20,28 @@ class PersonalAccount(Account):
         
         self.valid_promo()
 
-                
-                
+    @property
+    def first_name(self):
+        return self._first_name
+
+    @first_name.setter
+    def first_name(self, value):
+        old = self._first_name
+        self._first_name = value
+        if self._listener is not None:
+            self._listener(self, "first_name", old, value)
+
+    @property
+    def last_name(self):
+        return self._last_name
+
+    @last_name.setter
+    def last_name(self, value):
+        old = self._last_name
+        self._last_name = value
+        if self._listener is not None:
+            self._listener(self, "last_name", old, value)
+
     def valid_promo(self):
             if self.pesel == "Invalid":
                 return 
@@ -32,18 +56,19 @@ class PersonalAccount(Account):
                     self.balance += 50.0
 
     def express_outgoing(self, amount):
-        fee = 1.0
+        fee = self.EXPRESS_FEE
         total_amount = amount + fee
         if amount > 0:
+            self.history.record(-amount)
+            self.history.record(-int(fee))
             self.balance -= total_amount
-            self.history.append(f'-{amount}')
-            self.history.append(f"-{int(fee)}")
 
     def _last_three_are_deposits(self):
-        return len(self.history) >= 3 and all(float(x) > 0 for x in self.history[-3:])
+        return self.history.deposit_run >= 3
 
     def _sum_of_last_five_exceeds_amount(self, amount):
-        return len(self.history) >= 5 and sum(float(x) for x in self.history[-5:]) > amount
+        # Fixed five-element window, so this is O(1) regardless of history length
+        return len(self.history) >= 5 and sum(self.history.amounts(5)) > amount
 
     def submit_for_loan(self, amount):
         approved = self._last_three_are_deposits() or self._sum_of_last_five_exceeds_amount(amount)
@@ -67,24 +92,30 @@ class PersonalAccount(Account):
         subject = f"Account Transfer History {today}"
         text = f"Personal account history: {self.history}"
         
-        smtp_client = SMTPClient()
-        return smtp_client.send(subject, text, email_address)
+        return self._send_email(SMTPClient(), subject, text, email_address)
     
     def to_dict(self):
         return {
-            "type": "personal",
+            "type": self.TYPE,
             "first_name": self.first_name,
             "last_name": self.last_name,
             "pesel": self.pesel,
             "balance": self.balance,
-            "history": self.history,
+            "history": list(self.history),
             "promo_kod": self.promo_kod
         }
     
     @staticmethod
     def from_dict(data):
-        account = PersonalAccount(data["first_name"], data["last_name"], data["pesel"], data.get("promo_kod"))
-        account.balance = data["balance"]
+        # Skip PESEL and promo code handling: the stored balance already
+        # includes any promo bonus and the PESEL was validated on creation
+        account = object.__new__(PersonalAccount)
+        Account.__init__(account)
+        account._first_name = data["first_name"]
+        account._last_name = data["last_name"]
+        account.pesel = data["pesel"]
+        account.promo_kod = data.get("promo_kod")
+        account._balance = data["balance"]
         account.history = data["history"]
         return account
 
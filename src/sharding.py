@@ -0,0 +1,11 @@
+import zlib
+
+
+def shard_for(key: str, shard_count: int) -> int:
+    """
+    Shard owning the account with this PESEL or NIP.
+
+    CRC32 rather than hash(), which is randomized per process and would
+    route the same key differently in the router and in clients.
+    """
+    return zlib.crc32(key.encode("utf-8")) % shard_count
@@ -0,0 +1,245 @@
+import fcntl
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from src.accounts_registry import INVALID_KEY, primary_key
+
+# capacity, number of used slots
+_HEADER = struct.Struct("<QQ")
+# used flag, key, balance, deposit run, tracked amount count
+_SLOT = struct.Struct("<B23sdqq")
+_VALUES = struct.Struct("<dqq")
+_VALUES_OFFSET = 24
+# Used flag: the key is written, then its values
+_ALLOCATED = 1
+_SET = 2
+
+
+class LedgerFullError(Exception):
+    """Raised when every slot of the shared ledger is taken."""
+
+
+class SharedLedger:
+    """
+    Balance table in a named shared memory block, shared by every worker
+    process on a host.
+
+    Each slot holds the balance and loan aggregates (deposit run, tracked
+    amount count) of one account, found by its PESEL/NIP through an open
+    addressing hash table in the same block. Slots are never freed, so
+    lookups can run without a lock: a slot's key is written before its
+    used flag, and the flag is a single byte. A slot allocated but not
+    yet set holds no values, so the first worker to use an account
+    publishes its own copy instead of reading zeros.
+
+    Updates are serialized per stripe of keys. A stripe is a thread lock
+    for the threads of one process plus a byte-range lock on a lock file
+    (fcntl.lockf) for the other processes; the extra byte past the last
+    stripe guards slot allocation.
+    """
+
+    def __init__(self, name: str, capacity: int = 1_000_000, stripes: int = 256):
+        self.name = name
+        self.capacity = capacity
+        self.stripes = stripes
+        size = _HEADER.size + capacity * _SLOT.size
+        try:
+            self._memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+            _HEADER.pack_into(self._memory.buf, 0, capacity, 0)
+        except FileExistsError:
+            self._memory = shared_memory.SharedMemory(name=name)
+            if self._memory.size < size:
+                raise ValueError(f"Shared ledger {name} is smaller than {capacity} slots")
+        # Outlive whichever worker created the block; see unlink()
+        resource_tracker.unregister(self._memory._name, "shared_memory")
+        self._buffer = self._memory.buf
+        self._lock_file = os.open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), os.O_RDWR | os.O_CREAT)
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._allocation = threading.Lock()
+
+    def __len__(self) -> int:
+        return _HEADER.unpack_from(self._buffer, 0)[1]
+
+    def stripe(self, key: str) -> int:
+        # crc32, not hash(): every process must map a key to the same stripe
+        return zlib.crc32(key.encode("utf-8")) % self.stripes
+
+    @contextmanager
+    def hold(self, *keys):
+        """Lock the stripes of `keys`, in ascending order, in every process."""
+        stripes = sorted({self.stripe(key) for key in keys})
+        for stripe in stripes:
+            self._acquire(self._locks[stripe], stripe)
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._release(self._locks[stripe], stripe)
+
+    def slot(self, key: str, create: bool = False) -> int | None:
+        """Return the slot of `key`, allocating one if `create` is set."""
+        encoded = key.encode("utf-8")
+        if len(encoded) > 23:
+            raise ValueError(f"Key too long for the shared ledger: {key}")
+        slot = self._probe(encoded)
+        if slot is not None or not create:
+            return slot
+        self._acquire(self._allocation, self.stripes)
+        try:
+            return self._probe(encoded, allocate=True)
+        finally:
+            self._release(self._allocation, self.stripes)
+
+    def get(self, slot: int) -> tuple | None:
+        """Return (balance, deposit run, tracked count) stored in `slot`, or None if never set."""
+        offset = self._offset(slot)
+        if self._buffer[offset] != _SET:
+            return None
+        return _VALUES.unpack_from(self._buffer, offset + _VALUES_OFFSET)
+
+    def set(self, slot: int, balance: float, deposit_run: int = 0, tracked_count: int = 0) -> None:
+        """Overwrite `slot`; the caller holds its key's stripe."""
+        offset = self._offset(slot)
+        _VALUES.pack_into(self._buffer, offset + _VALUES_OFFSET, balance, deposit_run, tracked_count)
+        self._buffer[offset] = _SET
+
+    def unset(self, slot: int) -> None:
+        """Mark `slot` as allocated but not set again; a single byte write, so no stripe is needed."""
+        self._buffer[self._offset(slot)] = _ALLOCATED
+
+    def add(self, key: str, amount: float) -> float:
+        """Atomically add `amount` to the balance of `key`; returns the new balance."""
+        slot = self.slot(key, create=True)
+        with self.hold(key):
+            balance, deposit_run, tracked_count = self.get(slot) or (0.0, 0, 0)
+            self.set(slot, balance + amount, deposit_run, tracked_count)
+            return balance + amount
+
+    def close(self) -> None:
+        self._buffer = None
+        self._memory.close()
+        os.close(self._lock_file)
+
+    def unlink(self) -> None:
+        """Remove the shared block; call once, when no worker uses it any more."""
+        # unlink() unregisters the block from the resource tracker again
+        resource_tracker.register(self._memory._name, "shared_memory")
+        self._memory.unlink()
+
+    def _probe(self, encoded: bytes, allocate: bool = False) -> int | None:
+        start = zlib.crc32(encoded) % self.capacity
+        for i in range(self.capacity):
+            slot = (start + i) % self.capacity
+            offset = self._offset(slot)
+            if not self._buffer[offset]:
+                if not allocate:
+                    return None
+                self._buffer[offset + 1:offset + 24] = encoded.ljust(23, b"\0")
+                self._buffer[offset] = _ALLOCATED
+                _HEADER.pack_into(self._buffer, 0, self.capacity, len(self) + 1)
+                return slot
+            if self._buffer[offset + 1:offset + 24] == encoded.ljust(23, b"\0"):
+                return slot
+        if allocate:
+            raise LedgerFullError(f"Shared ledger {self.name} has no free slot")
+        return None
+
+    def _offset(self, slot: int) -> int:
+        return _HEADER.size + slot * _SLOT.size
+
+    def _acquire(self, lock, byte: int) -> None:
+        lock.acquire()
+        fcntl.lockf(self._lock_file, fcntl.LOCK_EX, 1, byte)
+
+    def _release(self, lock, byte: int) -> None:
+        fcntl.lockf(self._lock_file, fcntl.LOCK_UN, 1, byte)
+        lock.release()
+
+
+def ledger_key(account) -> str | None:
+    """Ledger key of an account, e.g. "pesel:89092909825"; None for placeholder keys."""
+    field, value = primary_key(account)
+    if not isinstance(value, str) or value == INVALID_KEY:
+        return None
+    return f"{field}:{value}"
+
+
+class SharedLedgerLocks:
+    """
+    Drop-in replacement for AccountsRegistry.locks backed by a SharedLedger.
+
+    `hold` locks the accounts in every process, loads their balance and
+    loan aggregates from the ledger into the local Account objects, and
+    publishes them back when released, so every balance update made
+    under `hold` (see src.transfers) acts on the host-wide value.
+
+    Also a registry observer: a removed account's slot goes back to not
+    set, so an account re-created with the same key publishes its own
+    values instead of loading the removed one's.
+    """
+
+    def __init__(self, ledger: SharedLedger):
+        self.ledger = ledger
+
+    def __len__(self) -> int:
+        return self.ledger.stripes
+
+    def stripe(self, account) -> int:
+        return self.ledger.stripe(ledger_key(account) or INVALID_KEY)
+
+    @contextmanager
+    def hold(self, *accounts):
+        keyed = [(account, ledger_key(account)) for account in accounts]
+        shared = [(account, self.ledger.slot(key, create=True)) for account, key in keyed if key is not None]
+        with self.ledger.hold(*(key or INVALID_KEY for _, key in keyed)):
+            for account, slot in shared:
+                self._load(account, slot)
+            try:
+                yield
+            finally:
+                for account, slot in shared:
+                    self._store(account, slot)
+
+    def balance(self, account) -> float:
+        """Balance of an account in the ledger, read without a lock; its own until published."""
+        key = ledger_key(account)
+        slot = self.ledger.slot(key) if key is not None else None
+        values = self.ledger.get(slot) if slot is not None else None
+        return account.balance if values is None else values[0]
+
+    def publish(self, accounts) -> None:
+        """Overwrite the ledger with these accounts, e.g. after loading them from storage."""
+        for account in accounts:
+            key = ledger_key(account)
+            if key is not None:
+                slot = self.ledger.slot(key, create=True)
+                with self.ledger.hold(key):
+                    self._store(account, slot)
+
+    def account_changed(self, account) -> None:
+        pass
+
+    def account_removed(self, account) -> None:
+        key = ledger_key(account)
+        slot = self.ledger.slot(key) if key is not None else None
+        # Called under registry.lock, which a transfer holding the stripe may be
+        # waiting for, so the stripe is not taken here
+        if slot is not None:
+            self.ledger.unset(slot)
+
+    def _store(self, account, slot: int) -> None:
+        history = account.history
+        self.ledger.set(slot, account.balance, history.deposit_run, history.tracked_count)
+
+    def _load(self, account, slot: int) -> None:
+        values = self.ledger.get(slot)
+        if values is None:
+            return
+        balance, deposit_run, tracked_count = values
+        if balance != account.balance:
+            account.balance = balance
+        account.history.adopt_aggregates(deposit_run, tracked_count)
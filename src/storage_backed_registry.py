@@ -0,0 +1,184 @@
+import weakref
+from src.account import Account
+from src.accounts_registry import AccountsRegistry, primary_key, INVALID_KEY
+
+
+class StorageBackedRegistry(AccountsRegistry):
+    """
+    Registry that treats the repository as the source of truth and keeps
+    only a hot set of at most `capacity` accounts in memory.
+
+    Lookups that miss the hot set load the account from the repository.
+    Once the hot set is full the least recently used account is evicted,
+    after writing back its pending changes. An evicted account that is
+    still changed by a caller holding it is written through at once, and
+    is the one a later lookup brings back, so there is never a second
+    live copy with a balance of its own.
+
+    Count and listing flush pending changes and read the repository;
+    secondary indexes only cover the hot set. Misses load from the
+    repository without holding the registry lock; a miss that raced with
+    an account being added or removed is looked up again.
+    """
+
+    storage_backed = True
+
+    def __init__(self, repository, capacity: int = 10000, indexes: dict | None = None):
+        super().__init__(indexes)
+        self.repository = repository
+        self.capacity = capacity
+        # Storage is authoritative, so there is never a reason to rewrite it
+        self.needs_full_save = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # [loads, version] by primary key while misses load it from storage;
+        # the version changes when the key is added, evicted or removed meanwhile
+        self._loading = {}
+        # Evicted accounts by primary key, for as long as a caller holds them
+        self._evicted = weakref.WeakValueDictionary()
+
+    def add_account(self, account: Account, stored: bool = False) -> None:
+        with self.lock:
+            super().add_account(account, stored)
+            self._changed_key(primary_key(account))
+            self._evict()
+
+    def remove_account(self, account: Account) -> bool:
+        with self.lock:
+            self._changed_key(primary_key(account))
+            return super().remove_account(account)
+
+    def clear(self) -> None:
+        """Drop the hot set, discarding changes not yet flushed."""
+        with self.lock:
+            super().clear()
+            self._evicted.clear()
+            for loading in self._loading.values():
+                loading[1] += 1
+            self.needs_full_save = False
+
+    def flush(self) -> None:
+        """Write pending changes and removals to the repository."""
+        with self.lock:
+            changed, removed = list(self._dirty), list(self._removed)
+            self._dirty.clear()
+        if not (changed or removed):
+            return
+        try:
+            self.repository.save_changes(changed, removed)
+        except BaseException:
+            with self.lock:
+                for account in changed:
+                    if account in self._accounts:
+                        self._dirty[account] = None
+            raise
+        # Only now: until the documents are deleted, lookups must not fault them back in
+        with self.lock:
+            for key in removed:
+                self._removed.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._accounts),
+            "capacity": self.capacity,
+        }
+
+    def find_account_by_pesel(self, pesel: str) -> Account | None:
+        return self._lookup(self._by_pesel, "pesel", pesel, self.repository.find_by_pesel)
+
+    def find_account_by_nip(self, nip: str) -> Account | None:
+        return self._lookup(self._by_nip, "nip", nip, self.repository.find_by_nip)
+
+    def pesel_exists(self, pesel: str) -> bool:
+        return self.find_account_by_pesel(pesel) is not None
+
+    def nip_exists(self, nip: str) -> bool:
+        return self.find_account_by_nip(nip) is not None
+
+    def get_all_accounts(self) -> list:
+        self.flush()
+        with self.lock:
+            live = dict(self._evicted)
+            live.update((primary_key(account), account) for account in self._accounts)
+        # Live accounts replace their stored copies, so callers see the objects in use
+        return [live.get(primary_key(account), account) for account in self.repository.load_all()]
+
+    def get_accounts_count(self) -> int:
+        self.flush()
+        return self.repository.count_accounts()
+
+    def _lookup(self, hot, field: str, key: str, load) -> Account | None:
+        while True:
+            with self.lock:
+                account = hot.get(key)
+                if account is not None:
+                    self.hits += 1
+                    # Move to the most recently used end
+                    del self._accounts[account]
+                    self._accounts[account] = None
+                    return account
+                # Removed accounts stay in storage until the next flush
+                if key == INVALID_KEY or (field, key) in self._removed:
+                    return None
+                account = self._evicted.pop((field, key), None)
+                if account is not None:
+                    # Still held by a caller: bring that object back, not a second copy
+                    self.hits += 1
+                    self.add_account(account, stored=True)
+                    return account
+                self.misses += 1
+                loading = self._loading.setdefault((field, key), [0, 0])
+                loading[0] += 1
+                version = loading[1]
+            try:
+                account = load(key)
+            except BaseException:
+                with self.lock:
+                    self._done_loading((field, key), loading)
+                raise
+            with self.lock:
+                self._done_loading((field, key), loading)
+                # Otherwise the key was added, evicted or removed meanwhile: look again
+                if loading[1] == version and key not in hot:
+                    if account is not None:
+                        self.add_account(account, stored=True)
+                    return account
+
+    def _done_loading(self, key: tuple, loading: list) -> None:
+        loading[0] -= 1
+        if not loading[0]:
+            del self._loading[key]
+
+    def _changed_key(self, key: tuple) -> None:
+        loading = self._loading.get(key)
+        if loading is not None:
+            loading[1] += 1
+
+    def _evict(self) -> None:
+        while len(self._accounts) > self.capacity:
+            account = next(iter(self._accounts))
+            if account in self._dirty:
+                # Removals go along, so a later lookup cannot fault in a deleted copy
+                self.repository.save_changes([account], list(self._removed))
+                self._removed.clear()
+                del self._dirty[account]
+            del self._accounts[account]
+            self._evicted[primary_key(account)] = account
+            self._changed_key(primary_key(account))
+            self.repository.forget(primary_key(account))
+            self._unindex(account)
+            for index in self._indexes.values():
+                index.remove(account)
+            self.evictions += 1
+
+    def _on_account_change(self, account: Account, field: str, old, new) -> None:
+        with self.lock:
+            if account not in self._accounts:
+                self.repository.save_changes([account], [])
+                self.repository.forget(primary_key(account))
+                return
+            super()._on_account_change(account, field, old, new)
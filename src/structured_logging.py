@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+LOGGER_NAME = "bank_app"
+# Level name accepted by configure_logging to silence the logger entirely
+OFF = "OFF"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and the record's fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock prepare() formats the message in the calling thread; here
+    the record is queued as it is, so a request thread only pays for
+    creating it. The queue is in-process, so args need not be pickled.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class RouteLog:
+    """
+    Logger of one API route, named "bank_app.api.<route>" so its level
+    can be set on its own, with a sampling rate for records below
+    WARNING. Nothing is created, let alone formatted, for a record that
+    is filtered out by level or sampling; a field given as a callable,
+    e.g. `args=request.args.to_dict`, is only called for kept records.
+    """
+
+    __slots__ = ("route", "logger", "sample_rate")
+
+    def __init__(self, route: str, sample_rate: float = 1.0):
+        self.route = route
+        self.logger = logging.getLogger(f"{LOGGER_NAME}.api.{route}")
+        self.sample_rate = sample_rate
+
+    def debug(self, msg: str, *args, **fields) -> None:
+        self._log(logging.DEBUG, msg, args, fields)
+
+    def info(self, msg: str, *args, **fields) -> None:
+        self._log(logging.INFO, msg, args, fields)
+
+    def warning(self, msg: str, *args, **fields) -> None:
+        self._log(logging.WARNING, msg, args, fields)
+
+    def _log(self, level: int, msg: str, args: tuple, fields: dict) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        fields = {name: value() if callable(value) else value for name, value in fields.items()}
+        fields["route"] = self.route
+        # stacklevel 3 attributes the record to the caller of debug/info/warning
+        self.logger.log(level, msg, *args, extra={"fields": fields}, stacklevel=3)
+
+
+_route_logs = {}
+_sample_rates = {}
+_listener = None
+
+
+def route_log(route: str) -> RouteLog:
+    """The RouteLog of `route`, created on first use."""
+    log = _route_logs.get(route)
+    if log is None:
+        log = _route_logs[route] = RouteLog(route, _sample_rate(route))
+    return log
+
+
+def configure_logging(level: str = "INFO", route_levels: dict | None = None, sample_rates: dict | None = None,
+                      stream=None) -> QueueListener | None:
+    """
+    Send "bank_app" records through a queue to a JSON-lines handler on
+    a background thread.
+
+    Args:
+        level: Level name for all routes, or "OFF"
+        route_levels: Level names by route, e.g. {"transfer": "WARNING"}
+        sample_rates: Fraction of sub-WARNING records kept, by route,
+            with "default" applying to the other routes
+        stream: Where the JSON lines go, stderr by default
+
+    Returns:
+        The started listener, or None when logging is off
+    """
+    global _listener
+    stop_logging()
+
+    root = logging.getLogger(LOGGER_NAME)
+    root.handlers.clear()
+    root.propagate = False
+    _sample_rates.clear()
+    _sample_rates.update(sample_rates or {})
+    for log in _route_logs.values():
+        log.sample_rate = _sample_rate(log.route)
+    off = level.upper() == OFF
+    route_levels = {} if off else route_levels or {}
+    for route in set(route_levels) | set(_route_logs):
+        logging.getLogger(f"{LOGGER_NAME}.api.{route}").setLevel(route_levels.get(route, logging.NOTSET))
+
+    if off:
+        root.setLevel(logging.CRITICAL + 1)
+        return None
+    root.setLevel(level.upper())
+
+    records = queue.SimpleQueue()
+    root.addHandler(DeferredQueueHandler(records))
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Write out queued records and stop the listener thread, if running."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_from_env() -> QueueListener | None:
+    """
+    configure_logging from BANK_APP_LOG_LEVEL (default INFO, or OFF),
+    BANK_APP_LOG_ROUTE_LEVELS ("transfer=WARNING,create_account=DEBUG")
+    and BANK_APP_LOG_SAMPLE ("default=0.1,get_account_by_pesel=0.01").
+    """
+    return configure_logging(
+        level=os.getenv('BANK_APP_LOG_LEVEL', 'INFO'),
+        route_levels=_parse_pairs(os.getenv('BANK_APP_LOG_ROUTE_LEVELS', ''), str.upper),
+        sample_rates=_parse_pairs(os.getenv('BANK_APP_LOG_SAMPLE', ''), float),
+    )
+
+
+def _sample_rate(route: str) -> float:
+    return _sample_rates.get(route, _sample_rates.get("default", 1.0))
+
+
+def _parse_pairs(text: str, convert) -> dict:
+    pairs = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, value = item.partition("=")
+        pairs[name.strip()] = convert(value.strip())
+    return pairs
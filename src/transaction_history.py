@@ -0,0 +1,109 @@
+from array import array
+
+
+class TransactionHistory:
+    """
+    Transfer history stored as typed columns instead of formatted strings.
+
+    Amounts are kept in an array of doubles next to a flag column telling
+    whether the amount was recorded as an int (e.g. the "-1" express fee)
+    or a float (e.g. "-100.0"). Iterating, indexing and printing yield the
+    same strings the history used to hold, so to_dict and the email text
+    are unchanged, while loan rules read the numeric columns directly.
+
+    Loan aggregates are maintained in O(1) on every append: the number of
+    consecutive deposits at the end of the history and how many times
+    `tracked_amount` (e.g. the ZUS payment) occurs. Like the original
+    `"-1775.0" in history` rule, only float entries count: an int entry
+    of the same value prints as "-1775" and does not match.
+    """
+
+    __slots__ = ("_amounts", "_integral", "tracked_amount", "_deposit_run", "_tracked_count")
+
+    def __init__(self, entries=(), tracked_amount=None):
+        self._amounts = array('d')
+        self._integral = array('b')
+        self.tracked_amount = tracked_amount
+        self._deposit_run = 0
+        self._tracked_count = 0
+        self.extend(entries)
+
+    def record(self, amount) -> None:
+        """Append a numeric amount; negative amounts are outgoing."""
+        self._amounts.append(amount)
+        self._integral.append(type(amount) is int)
+        self._deposit_run = self._deposit_run + 1 if amount > 0 else 0
+        if amount == self.tracked_amount and type(amount) is not int:
+            self._tracked_count += 1
+
+    def append(self, entry) -> None:
+        """Append an entry given either as a number or in the legacy string form."""
+        self.record(_parse(entry) if isinstance(entry, str) else entry)
+
+    def extend(self, entries) -> None:
+        for entry in entries:
+            self.append(entry)
+
+    def clear(self) -> None:
+        del self._amounts[:]
+        del self._integral[:]
+        self._deposit_run = 0
+        self._tracked_count = 0
+
+    def adopt_aggregates(self, deposit_run: int, tracked_count: int) -> None:
+        """Take over loan aggregates kept elsewhere, e.g. in a SharedLedger."""
+        self._deposit_run = deposit_run
+        self._tracked_count = tracked_count
+
+    @property
+    def deposit_run(self) -> int:
+        """Number of consecutive deposits at the end of the history."""
+        return self._deposit_run
+
+    @property
+    def tracked_count(self) -> int:
+        """Number of float entries equal to tracked_amount."""
+        return self._tracked_count
+
+    def amounts(self, last: int) -> array:
+        """Return the numeric amounts of the last `last` entries."""
+        return self._amounts[-last:]
+
+    def contains_amount(self, amount: float) -> bool:
+        return amount in self._amounts
+
+    def __len__(self) -> int:
+        return len(self._amounts)
+
+    def __iter__(self):
+        for amount, integral in zip(self._amounts, self._integral):
+            yield _format(amount, integral)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        return _format(self._amounts[index], self._integral[index])
+
+    def __contains__(self, entry) -> bool:
+        return entry in list(self)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, TransactionHistory):
+            return self._amounts == other._amounts and self._integral == other._integral
+        return list(self) == other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+def _parse(entry: str):
+    try:
+        return int(entry)
+    except ValueError:
+        return float(entry)
+
+
+def _format(amount: float, integral: bool) -> str:
+    return str(int(amount)) if integral else str(amount)
@@ -0,0 +1,188 @@
+import threading
+from collections import OrderedDict
+from src.account import Account
+from src.account_locks import LockStripes
+
+# Outcome of a credit leg
+CREDITED = "credited"
+CANCELLED = "cancelled"
+
+
+class InsufficientFundsError(ValueError):
+    """Raised when a sender cannot cover a transfer."""
+
+
+class TransferCancelledError(ValueError):
+    """Raised for a leg of a transfer that was already cancelled or refunded."""
+
+
+class TransferLegs:
+    """
+    Outcomes of the legs of transfers between processes (e.g. shards),
+    by transfer id and leg: "debit", "credit" or "refund". A leg sent
+    again, e.g. retried after a timeout, is answered from its first
+    outcome instead of being applied twice. Only the `capacity` most
+    recent entries are kept, in memory.
+
+    Callers read and record a leg while holding its account's lock, so
+    checking and applying it is one step.
+    """
+
+    def __init__(self, capacity: int = 100000):
+        self.capacity = capacity
+        self._outcomes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._outcomes)
+
+    def outcome(self, transfer_id: str, leg: str):
+        with self._lock:
+            return self._outcomes.get((transfer_id, leg))
+
+    def record(self, transfer_id: str, leg: str, outcome) -> None:
+        with self._lock:
+            self._outcomes[(transfer_id, leg)] = outcome
+            while len(self._outcomes) > self.capacity:
+                self._outcomes.popitem(last=False)
+
+
+def transfer(sender: Account, recipient: Account, amount: float, locks: LockStripes, express: bool = False) -> None:
+    """
+    Move `amount` from `sender` to `recipient` atomically.
+
+    Both accounts are locked for the funds check and both updates, so
+    concurrent transfers can neither overdraw the sender nor lose an
+    update. A standard transfer must leave the sender with a positive
+    balance, as Account.outgoing_transfer requires; an express transfer
+    also pays the sender's EXPRESS_FEE.
+
+    Raises:
+        ValueError: If amount is not positive
+        InsufficientFundsError: If the sender cannot cover the transfer
+    """
+    _check_amount(amount)
+    with locks.hold(sender, recipient):
+        _debit(sender, amount, express)
+        recipient.incoming_transfer(amount)
+
+
+def debit(account: Account, amount: float, locks: LockStripes, express: bool = False) -> float:
+    """
+    Take the sending side of a transfer whose recipient lives elsewhere,
+    e.g. on another shard, with the same checks as `transfer`.
+
+    Returns:
+        The total taken from the account, including the express fee
+
+    Raises:
+        ValueError: If amount is not positive
+        InsufficientFundsError: If the account cannot cover the transfer
+    """
+    _check_amount(amount)
+    with locks.hold(account):
+        _debit(account, amount, express)
+    return amount + (account.EXPRESS_FEE if express else 0.0)
+
+
+def debit_once(account: Account, amount: float, locks: LockStripes, transfer_id: str, legs: TransferLegs,
+               express: bool = False) -> tuple[float, bool]:
+    """
+    `debit`, taken at most once per `transfer_id`.
+
+    Returns:
+        Tuple (total taken, whether this call took it)
+
+    Raises:
+        ValueError: If amount is not positive
+        InsufficientFundsError: If the account cannot cover the transfer
+        TransferCancelledError: If the transfer was refunded before its debit arrived
+    """
+    _check_amount(amount)
+    with locks.hold(account):
+        taken = legs.outcome(transfer_id, "debit")
+        if taken == CANCELLED:
+            raise TransferCancelledError("Transfer was cancelled")
+        if taken is not None:
+            return taken, False
+        _debit(account, amount, express)
+        taken = amount + (account.EXPRESS_FEE if express else 0.0)
+        legs.record(transfer_id, "debit", taken)
+    return taken, True
+
+
+def credit_once(account: Account, amount: float, locks: LockStripes, transfer_id: str, legs: TransferLegs) -> bool:
+    """
+    Take the receiving side of a transfer from elsewhere, at most once per `transfer_id`.
+
+    Returns:
+        Whether this call applied the credit
+
+    Raises:
+        ValueError: If amount is not positive
+        TransferCancelledError: If the credit was cancelled with `cancel_credit`
+    """
+    _check_amount(amount)
+    with locks.hold(account):
+        outcome = legs.outcome(transfer_id, "credit")
+        if outcome == CANCELLED:
+            raise TransferCancelledError("Transfer was cancelled")
+        if outcome is not None:
+            return False
+        account.incoming_transfer(amount)
+        legs.record(transfer_id, "credit", CREDITED)
+    return True
+
+
+def cancel_credit(account: Account, locks: LockStripes, transfer_id: str, legs: TransferLegs) -> bool:
+    """
+    Make sure the credit of `transfer_id` is never applied, unless it already was.
+
+    Returns:
+        False if the credit had already been applied, True if it now never will be
+    """
+    with locks.hold(account):
+        outcome = legs.outcome(transfer_id, "credit")
+        if outcome is None:
+            legs.record(transfer_id, "credit", CANCELLED)
+        return outcome != CREDITED
+
+
+def refund_once(account: Account, locks: LockStripes, transfer_id: str, legs: TransferLegs) -> tuple[float, bool]:
+    """
+    Give back what the debit of `transfer_id` took, at most once, with
+    Account.refund: a reversal, not a deposit. A debit that has not
+    arrived yet is cancelled, so it will not be taken later.
+
+    Returns:
+        Tuple (amount given back, 0.0 if nothing was debited; whether this call gave it back)
+    """
+    with locks.hold(account):
+        refunded = legs.outcome(transfer_id, "refund")
+        if refunded is not None:
+            return refunded, False
+        taken = legs.outcome(transfer_id, "debit")
+        if taken is None:
+            legs.record(transfer_id, "debit", CANCELLED)
+            refunded = 0.0
+        else:
+            account.refund(taken)
+            refunded = taken
+        legs.record(transfer_id, "refund", refunded)
+    return refunded, True
+
+
+def _check_amount(amount: float) -> None:
+    if amount <= 0:
+        raise ValueError("Amount must be greater than 0")
+
+
+def _debit(account: Account, amount: float, express: bool) -> None:
+    if express:
+        if amount + account.EXPRESS_FEE > account.balance:
+            raise InsufficientFundsError("Insufficient funds")
+        account.express_outgoing(amount)
+    else:
+        if amount >= account.balance:
+            raise InsufficientFundsError("Insufficient funds")
+        account.outgoing_transfer(amount)
@@ -0,0 +1,140 @@
+import threading
+import time
+from src.accounts_registry import primary_key
+
+
+class WriteBehindWriter:
+    """
+    Persists account mutations in the background.
+
+    Changed and removed accounts are collected per account, so several
+    mutations of one account within a flush window cost one write. A
+    daemon thread flushes them with `repository.save_changes` every
+    `flush_interval` seconds, or sooner once `max_batch` accounts are
+    pending. `close` drains what is left before returning.
+
+    Implements the registry observer interface (account_changed and
+    account_removed), so it can be attached with AccountsRegistry.add_observer.
+    Observers run inside a mutation, under the account's locks, so these
+    never block or raise: a mutation is always queued. Backpressure is
+    applied before a request mutates anything, with `wait_for_capacity`,
+    which waits up to `submit_timeout` seconds for the queue to drop below
+    `max_pending` accounts.
+    """
+
+    def __init__(self, repository, flush_interval: float = 1.0, max_batch: int = 500,
+                 max_pending: int = 10000, submit_timeout: float | None = 5.0):
+        self.repository = repository
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.submit_timeout = submit_timeout
+        self._changed = {}
+        self._removed = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._stats = {
+            "flushes": 0,
+            "flushed_accounts": 0,
+            "errors": 0,
+            "last_flush_seconds": 0.0,
+            "max_flush_seconds": 0.0,
+            "dropped": 0,
+        }
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def account_changed(self, account) -> None:
+        with self._condition:
+            if self._accepts():
+                self._changed[account] = None
+                self._wake_if_full()
+
+    def account_removed(self, account) -> None:
+        with self._condition:
+            if self._accepts():
+                self._changed.pop(account, None)
+                self._removed[primary_key(account)] = None
+                self._wake_if_full()
+
+    def wait_for_capacity(self, timeout: float | None = None) -> bool:
+        """
+        Wait until fewer than `max_pending` accounts are queued.
+
+        Args:
+            timeout: Seconds to wait, `submit_timeout` by default
+
+        Returns:
+            False if the queue is still full, or the writer is closed
+        """
+        timeout = self.submit_timeout if timeout is None else timeout
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._closed or self.queue_depth < self.max_pending, timeout
+            ) and not self._closed
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._changed) + len(self._removed)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {**self._stats, "queue_depth": self.queue_depth}
+
+    def close(self, timeout: float | None = None) -> None:
+        """Stop accepting mutations, flush pending ones and stop the thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def _accepts(self) -> bool:
+        # After close nothing is flushed any more; count what is lost
+        if self._closed:
+            self._stats["dropped"] += 1
+        return not self._closed
+
+    def _wake_if_full(self) -> None:
+        if self.queue_depth >= self.max_batch:
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or self.queue_depth >= self.max_batch, self.flush_interval
+                )
+                closed = self._closed
+                changed, removed = list(self._changed), list(self._removed)
+                self._changed.clear()
+                self._removed.clear()
+                # Producers blocked on backpressure can continue
+                self._condition.notify_all()
+
+            if changed or removed:
+                self._flush(changed, removed, requeue=not closed)
+            if closed:
+                return
+
+    def _flush(self, changed, removed, requeue: bool) -> None:
+        start = time.perf_counter()
+        try:
+            self.repository.save_changes(changed, removed)
+        except Exception:
+            with self._condition:
+                self._stats["errors"] += 1
+                if requeue:
+                    # Accounts removed while the flush was running stay removed
+                    for account in changed:
+                        if primary_key(account) not in self._removed:
+                            self._changed.setdefault(account, None)
+                    for key in removed:
+                        self._removed.setdefault(key, None)
+            return
+
+        elapsed = time.perf_counter() - start
+        with self._condition:
+            self._stats["flushes"] += 1
+            self._stats["flushed_accounts"] += len(changed) + len(removed)
+            self._stats["last_flush_seconds"] = elapsed
+            self._stats["max_flush_seconds"] = max(self._stats["max_flush_seconds"], elapsed)
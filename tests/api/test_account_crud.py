@@ -1,13 +1,14 @@
 import pytest
 import requests
-from app.api import app, registry
+from app.api import app, registry, mongo_repo
+from src.personal_account import PersonalAccount
 
 
 @pytest.fixture(autouse=True)
 def clear_registry():
-    registry.accounts.clear()
+    registry.clear()
     yield
-    registry.accounts.clear()
+    registry.clear()
 
 
 @pytest.fixture
@@ -50,6 +51,13 @@ class TestAccountCreation:
             response = client.post(base_url, json=account_data)
             assert response.status_code == 201
 
+    
+    def test_create_account_with_non_string_surname_returns_400(self, client, base_url):
+        response = client.post(base_url, json={"name": "john", "surname": 7, "pesel": "12345678901"})
+        
+        assert response.status_code == 400
+        assert client.get(f"{base_url}/12345678901").status_code == 404
+
 
 class TestPeselUniqueness:
     def test_create_account_with_duplicate_pesel_returns_409(self, client, base_url, sample_account_data):
@@ -167,6 +175,27 @@ class TestGetAccountByPesel:
         assert response.status_code == 404
         data = response.get_json()
         assert "error" in data
+    
+    def test_get_account_from_storage_skips_registry(self, client, base_url, mocker):
+        stored = PersonalAccount("lars", "ulrich", "63122612345")
+        stored.incoming_transfer(100.0)
+        find = mocker.patch.object(mongo_repo, "find_by_pesel", return_value=stored)
+        
+        response = client.get(f"{base_url}/63122612345?source=storage")
+        
+        find.assert_called_once_with("63122612345")
+        assert response.status_code == 200
+        assert response.get_json()["balance"] == 100.0
+        assert registry.get_accounts_count() == 0
+    
+    def test_get_account_from_storage_missing_or_failing(self, client, base_url, mocker):
+        mocker.patch.object(mongo_repo, "find_by_pesel", return_value=None)
+        assert client.get(f"{base_url}/63122612345?source=storage").status_code == 404
+        
+        mocker.patch.object(mongo_repo, "find_by_pesel", side_effect=RuntimeError("mongo down"))
+        response = client.get(f"{base_url}/63122612345?source=storage")
+        assert response.status_code == 500
+        assert response.get_json()["error"] == "mongo down"
 
 
 class TestUpdateAccount:
@@ -215,6 +244,15 @@ class TestUpdateAccount:
         assert account["name"] == "kirk"
         assert account["surname"] == "hammett"
     
+    def test_update_with_non_string_surname_returns_400(self, client, base_url, sample_account_data):
+        client.post(base_url, json=sample_account_data)
+        pesel = sample_account_data["pesel"]
+        
+        response = client.patch(f"{base_url}/{pesel}", json={"surname": 42})
+        
+        assert response.status_code == 400
+        assert client.get(f"{base_url}/{pesel}").get_json()["surname"] == sample_account_data["surname"]
+    
     def test_update_nonexistent_account_returns_404(self, client, base_url):
         update_data = {"name": "test"}
         response = client.patch(f"{base_url}/99999999999", json=update_data)
@@ -0,0 +1,148 @@
+import json
+import pytest
+from unittest.mock import patch, Mock
+import app.api as api
+from app.api import app, registry, mongo_repo
+from src.personal_account import PersonalAccount
+from src.storage_backed_registry import StorageBackedRegistry
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def accounts(client):
+    pesels = ["92031512345", "85051298765", "77010112345", "66020212345", "99123112345"]
+    for pesel in pesels:
+        client.post('/api/accounts', json={"name": "Test", "surname": "User", "pesel": pesel})
+    return sorted(pesels)
+
+
+@pytest.fixture
+def company(client):
+    mock_response = Mock(status_code=200, text="")
+    mock_response.json.return_value = {"result": {"subject": {"statusVat": "Czynny"}}}
+    with patch('src.mf_client.requests.Session.get', return_value=mock_response):
+        client.post('/api/accounts', json={"name": "TechCorp", "nip": "8461627563"})
+
+
+class TestPagination:
+    def test_offset_pages_are_ordered_by_key(self, client, accounts):
+        first = client.get('/api/accounts?limit=2').get_json()
+        second = client.get('/api/accounts?limit=2&offset=2').get_json()
+        last = client.get('/api/accounts?limit=2&offset=4').get_json()
+
+        listed = [acc["pesel"] for page in (first, second, last) for acc in page["accounts"]]
+        assert listed == accounts
+        assert last["next_cursor"] is None
+
+    def test_cursor_pages_survive_concurrent_inserts(self, client, accounts):
+        page = client.get('/api/accounts?limit=2').get_json()
+        client.post('/api/accounts', json={"name": "New", "surname": "User", "pesel": "00010112345"})
+
+        listed = [acc["pesel"] for acc in page["accounts"]]
+        while page["next_cursor"] is not None:
+            page = client.get(f'/api/accounts?limit=2&cursor={page["next_cursor"]}').get_json()
+            listed += [acc["pesel"] for acc in page["accounts"]]
+
+        assert listed == accounts
+
+    def test_company_accounts_are_listed(self, client, accounts, company):
+        data = client.get('/api/accounts').get_json()
+
+        companies = [acc for acc in data if acc["type"] == "company"]
+        assert companies == [{"type": "company", "name": "TechCorp", "nip": "8461627563", "balance": 0.0}]
+        page = client.get('/api/accounts?limit=1&offset=2').get_json()
+        assert page["accounts"][0]["nip"] == "8461627563"
+
+    def test_cursor_is_the_last_key_listed(self, client, accounts):
+        client.post('/api/accounts', json={"name": "No", "surname": "Pesel", "pesel": "123"})
+
+        page = client.get('/api/accounts?limit=2').get_json()
+        rest = client.get('/api/accounts?limit=10&cursor=80000000000').get_json()
+
+        assert page["next_cursor"] == accounts[1]
+        # The placeholder "Invalid" key is never paged
+        assert [acc["pesel"] for acc in rest["accounts"]] == accounts[2:]
+        assert rest["next_cursor"] is None
+
+    @pytest.mark.parametrize("query", [
+        "limit=0", "limit=abc", "limit=5000", "offset=-1", "stream=xml",
+    ])
+    def test_invalid_parameters(self, client, query):
+        response = client.get(f'/api/accounts?{query}')
+
+        assert response.status_code == 400
+        assert "error" in response.get_json()
+
+
+class TestStreaming:
+    def test_json_array_stream(self, client, accounts, company):
+        response = client.get('/api/accounts?stream=json')
+
+        assert response.is_streamed
+        data = json.loads(response.get_data())
+        assert [acc.get("pesel", acc.get("nip")) for acc in data] == sorted(accounts + ["8461627563"])
+
+    def test_ndjson_stream_in_small_chunks(self, client, accounts, mocker):
+        chunks = api._json_chunks
+        mocker.patch.object(api, "_json_chunks", lambda accs, balance_of: chunks(accs, balance_of, chunk_size=2))
+
+        response = client.get('/api/accounts?stream=ndjson')
+
+        assert response.mimetype == "application/x-ndjson"
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)["pesel"] for line in lines] == accounts
+
+    def test_empty_stream(self, client):
+        assert client.get('/api/accounts?stream=json').get_json() == []
+
+
+class TestStorageBackedListing:
+    @pytest.fixture
+    def storage_registry(self, mocker):
+        registry = StorageBackedRegistry(mongo_repo, capacity=10)
+        mocker.patch.object(api.app.extensions["bank_app"], "registry", registry)
+        mocker.patch.object(mongo_repo, "save_changes")
+        return registry
+
+    def test_pages_come_from_storage(self, client, storage_registry, mocker):
+        stored = PersonalAccount("Alice", "Wonder", "92031512345")
+        load_page = mocker.patch.object(mongo_repo, "load_page", return_value=([stored], "abc"))
+
+        data = client.get('/api/accounts?limit=1&cursor=000').get_json()
+
+        load_page.assert_called_once_with(1, after="000")
+        assert data == {"accounts": [api._account_summary(stored)], "next_cursor": "abc"}
+
+    def test_storage_pagination_errors(self, client, storage_registry, mocker):
+        assert client.get('/api/accounts?offset=1').status_code == 400
+        mocker.patch.object(mongo_repo, "load_page", side_effect=RuntimeError("mongo down"))
+        assert client.get('/api/accounts?limit=1').status_code == 500
+
+    def test_stream_pages_through_storage(self, client, storage_registry, mocker):
+        first = PersonalAccount("Alice", "Wonder", "92031512345")
+        second = PersonalAccount("Bob", "Wonder", "93031512345")
+        load_page = mocker.patch.object(
+            mongo_repo, "load_page", side_effect=[([first], "92031512345"), ([second], None)]
+        )
+
+        data = json.loads(client.get('/api/accounts?stream=json').get_data())
+
+        assert data == [api._account_summary(first), api._account_summary(second)]
+        assert load_page.call_args_list == [
+            mocker.call(api.LOAD_BATCH_SIZE), mocker.call(api.LOAD_BATCH_SIZE, after="92031512345")
+        ]
+        mocker.patch.object(mongo_repo, "load_page", side_effect=RuntimeError("mongo down"))
+        assert client.get('/api/accounts?stream=ndjson').status_code == 500
@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from app.api import app, registry
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def accounts(client):
+    client.post("/api/accounts", json={"name": "john", "surname": "Kowalski", "pesel": "12345678901"})
+    client.post("/api/accounts", json={"name": "jane", "surname": "Kowalczyk", "pesel": "98765432109"})
+    client.post("/api/accounts", json={"name": "bob", "surname": "Nowak", "pesel": "55555555555"})
+    client.post("/api/accounts/12345678901/transfer", json={"amount": 500.0, "type": "incoming"})
+    client.post("/api/accounts/98765432109/transfer", json={"amount": 10.0, "type": "express"})
+
+
+class TestAccountSearch:
+    def test_search_by_surname_prefix(self, client, accounts):
+        response = client.get("/api/accounts/search?surname_prefix=Kowal")
+
+        assert response.status_code == 200
+        assert [acc["pesel"] for acc in response.get_json()] == ["98765432109", "12345678901"]
+
+    def test_search_negative_balances(self, client, accounts):
+        response = client.get("/api/accounts/search?max_balance=-0.01")
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert len(data) == 1
+        assert data[0]["pesel"] == "98765432109"
+        assert data[0]["balance"] == -11.0
+
+    def test_search_combines_filters(self, client, accounts):
+        response = client.get("/api/accounts/search?surname_prefix=Kowal&min_balance=0")
+
+        assert [acc["pesel"] for acc in response.get_json()] == ["12345678901"]
+
+    def test_search_reflects_patch(self, client, accounts):
+        client.patch("/api/accounts/55555555555", json={"surname": "Kowalewski"})
+
+        response = client.get("/api/accounts/search?surname_prefix=Kowalew")
+
+        assert [acc["pesel"] for acc in response.get_json()] == ["55555555555"]
+
+    def test_search_by_type(self, client, accounts):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
+        with patch('src.mf_client.requests.Session.get', return_value=mock_response):
+            client.post("/api/accounts", json={"name": "TechCorp", "nip": "1234567890"})
+
+        response = client.get("/api/accounts/search?type=company")
+
+        assert response.get_json() == [
+            {"type": "company", "name": "TechCorp", "nip": "1234567890", "balance": 0.0}
+        ]
+        assert len(client.get("/api/accounts/search?type=personal").get_json()) == 3
+
+    def test_search_without_filters_returns_400(self, client):
+        response = client.get("/api/accounts/search")
+
+        assert response.status_code == 400
+
+    def test_search_with_invalid_balance_returns_400(self, client):
+        response = client.get("/api/accounts/search?min_balance=abc")
+
+        assert response.status_code == 400
@@ -12,9 +12,9 @@ def client():
 
 @pytest.fixture(autouse=True)
 def clear_registry():
-    registry.accounts.clear()
+    registry.clear()
     yield
-    registry.accounts.clear()
+    registry.clear()
 
 
 @pytest.fixture(autouse=True)
@@ -77,7 +77,7 @@ class TestAccountsSaveLoad:
         client.post('/api/accounts/save')
         
         # Clear registry
-        registry.accounts.clear()
+        registry.clear()
         response = client.get('/api/accounts')
         assert len(response.get_json()) == 0
         
@@ -118,7 +118,7 @@ class TestAccountsSaveLoad:
         
         # Save, clear, and load
         client.post('/api/accounts/save')
-        registry.accounts.clear()
+        registry.clear()
         client.post('/api/accounts/load')
         
         # Verify history is preserved
@@ -178,7 +178,7 @@ class TestAccountsSaveLoad:
         client.post('/api/accounts/save')
         
         # Clear and create different account
-        registry.accounts.clear()
+        registry.clear()
         client.post('/api/accounts', json={
             "name": "Isaac",
             "surname": "Newton",
@@ -187,7 +187,7 @@ class TestAccountsSaveLoad:
         client.post('/api/accounts/save')
         
         # Load and verify only second account exists
-        registry.accounts.clear()
+        registry.clear()
         client.post('/api/accounts/load')
         
         response = client.get('/api/accounts')
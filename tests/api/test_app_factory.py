@@ -0,0 +1,41 @@
+import subprocess
+import sys
+from pathlib import Path
+from app.api import create_app
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+class TestAppFactory:
+    def test_apps_do_not_share_accounts_or_metrics(self):
+        first = create_app({"TESTING": True})
+        second = create_app({"TESTING": True})
+
+        with first.test_client() as client:
+            client.post('/api/accounts', json={"name": "Jan", "surname": "Kowalski", "pesel": "89092909825"})
+            assert client.get('/api/accounts/89092909825').status_code == 200
+        with second.test_client() as client:
+            assert client.get('/api/accounts/89092909825').status_code == 404
+            assert client.get('/api/accounts/count').get_json() == {"count": 0}
+            metrics = client.get('/metrics').get_data(as_text=True)
+
+        assert 'route="/api/accounts",status="201"' not in metrics
+        assert first.extensions["bank_app"].registry is not second.extensions["bank_app"].registry
+
+    def test_import_builds_nothing(self):
+        code = (
+            "import threading, app.api as api; "
+            "assert api._default_app is None; "
+            "assert threading.active_count() == 1; "
+            "assert api.app is api.app"
+        )
+
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+
+    def test_apps_do_not_add_exit_hooks(self, mocker):
+        register = mocker.patch("atexit.register")
+
+        create_app({"TESTING": True})
+        create_app({"TESTING": True})
+
+        register.assert_not_called()
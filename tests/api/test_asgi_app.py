@@ -0,0 +1,226 @@
+import asyncio
+import json
+import pytest
+from app.api import registry
+from app.asgi import BankASGI, KeyedLocks
+from src.company_account import CompanyAccount
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    registry.clear()
+    CompanyAccount.nip_cache.clear()
+    yield
+    registry.clear()
+    CompanyAccount.nip_cache.clear()
+
+
+@pytest.fixture
+def asgi_app():
+    return BankASGI(blocking_workers=4)
+
+
+async def call(app, method, path, body=None, query=b""):
+    """Send one request through the ASGI interface; returns (status, headers, body bytes)."""
+    payload = b"" if body is None else json.dumps(body).encode()
+    # Deliver the body in two parts, like a server reading it off the socket
+    messages = [
+        {"type": "http.request", "body": payload[:5], "more_body": True},
+        {"type": "http.request", "body": payload[5:]},
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode()),
+                    (b"x-request-id", b"abc")],
+    }
+    await app(scope, receive, send)
+    headers = dict(sent[0]["headers"])
+    return sent[0]["status"], headers, b"".join(message.get("body", b"") for message in sent[1:])
+
+
+def run(app, method, path, body=None, query=b""):
+    status, headers, content = asyncio.run(call(app, method, path, body, query))
+    return status, json.loads(content) if content else None
+
+
+class TestASGIRoutes:
+    def test_personal_account_lifecycle(self, asgi_app):
+        assert run(asgi_app, "POST", "/api/accounts", {"name": "Jan", "surname": "Kowalski", "pesel": "89092909825"}) \
+            == (201, {"message": "Account created"})
+        assert run(asgi_app, "POST", "/api/accounts/89092909825/transfer", {"amount": 100, "type": "incoming"})[0] == 200
+        assert run(asgi_app, "GET", "/api/accounts/89092909825") == (200, {
+            "name": "Jan", "surname": "Kowalski", "pesel": "89092909825", "balance": 100.0,
+        })
+        assert run(asgi_app, "DELETE", "/api/accounts/89092909825")[0] == 200
+        assert run(asgi_app, "GET", "/api/accounts/89092909825")[0] == 404
+
+    def test_errors_match_the_flask_api(self, asgi_app):
+        assert run(asgi_app, "POST", "/api/accounts", {"name": "X", "nip": "123"}) == (
+            400, {"error": "Invalid NIP format. NIP must be exactly 10 digits."}
+        )
+        assert run(asgi_app, "POST", "/api/transfer", {"from_account": "1"})[0] == 400
+
+    def test_company_creation_awaits_mf(self, asgi_app, mocker):
+        validate = mocker.patch.object(CompanyAccount, "_fetch_nip_status_async", return_value=True)
+        sync_fetch = mocker.patch.object(CompanyAccount, "_fetch_nip_status")
+
+        assert run(asgi_app, "POST", "/api/accounts", {"name": "Firma", "nip": "5261040828"})[0] == 201
+
+        assert validate.await_count == 1
+        sync_fetch.assert_not_called()
+        assert registry.nip_exists("5261040828")
+
+    def test_unregistered_company_is_rejected(self, asgi_app, mocker):
+        mocker.patch.object(CompanyAccount, "_fetch_nip_status_async", return_value=False)
+
+        assert run(asgi_app, "POST", "/api/accounts", {"name": "Firma", "nip": "5261040828"}) == (
+            400, {"error": "Company not registered!!"}
+        )
+
+    def test_batch_creation_validates_concurrently(self, asgi_app, mocker):
+        async def active(nip, today):
+            await asyncio.sleep(0)
+            return nip != "8461627563"
+
+        mocker.patch.object(CompanyAccount, "_fetch_nip_status_async", side_effect=active)
+        sync_fetch = mocker.patch.object(CompanyAccount, "_fetch_nip_status")
+
+        status, data = run(asgi_app, "POST", "/api/accounts/batch", {"companies": [
+            {"name": "A", "nip": "5261040828"}, {"name": "B", "nip": "8461627563"}, "bad",
+        ]})
+
+        assert status == 400
+        status, data = run(asgi_app, "POST", "/api/accounts/batch", {"companies": [
+            {"name": "A", "nip": "5261040828"}, {"name": "B", "nip": "8461627563"},
+        ]})
+        assert [result["status"] for result in data["results"]] == ["created", "rejected"]
+        sync_fetch.assert_not_called()
+
+    def test_streamed_listing(self, asgi_app):
+        for pesel in ("89092909825", "85051298765"):
+            run(asgi_app, "POST", "/api/accounts", {"name": "Test", "surname": "User", "pesel": pesel})
+
+        status, headers, content = asyncio.run(call(asgi_app, "GET", "/api/accounts", query=b"stream=ndjson"))
+
+        assert status == 200
+        assert headers[b"content-type"] == b"application/x-ndjson"
+        assert [json.loads(line)["pesel"] for line in content.splitlines()] == ["85051298765", "89092909825"]
+
+    def test_batch_transfers_run_in_thread(self, asgi_app):
+        for pesel in ("89092909825", "85051298765"):
+            run(asgi_app, "POST", "/api/accounts", {"name": "Test", "surname": "User", "pesel": pesel})
+
+        status, data = run(asgi_app, "POST", "/api/transfers/batch", {"atomic": False, "transfers": [
+            {"from_account": "external", "to_account": "89092909825", "amount": 10},
+            "bad",
+        ]})
+
+        assert status == 200
+        assert (data["applied"], data["failed"]) == (1, 1)
+
+    def test_storage_backed_registry_runs_views_in_thread(self, asgi_app, mocker):
+        blocking = mocker.spy(asgi_app, "_respond_in_thread")
+        mocker.patch.object(registry, "storage_backed", True)
+
+        run(asgi_app, "GET", "/api/accounts/count")
+
+        assert blocking.call_count == 1
+
+    @pytest.mark.parametrize("method, path", [
+        ("POST", "/api/accounts/89092909825/transfer"),
+        ("GET", "/api/accounts/89092909825"),
+        ("GET", "/api/accounts"),
+    ])
+    def test_views_taking_locks_run_in_thread(self, asgi_app, mocker, method, path):
+        run(asgi_app, "POST", "/api/accounts", {"name": "Test", "surname": "User", "pesel": "89092909825"})
+        blocking = mocker.spy(asgi_app, "_respond_in_thread")
+
+        run(asgi_app, method, path, {"amount": 1, "type": "incoming"} if method == "POST" else None)
+
+        assert blocking.call_count == 1
+
+    def test_lock_free_reads_run_on_the_loop(self, asgi_app, mocker):
+        blocking = mocker.spy(asgi_app, "_respond_in_thread")
+
+        assert run(asgi_app, "GET", "/api/accounts/count") == (200, {"count": 0})
+
+        assert blocking.call_count == 0
+
+    def test_concurrent_transfers_on_one_account_are_serialized(self, asgi_app):
+        run(asgi_app, "POST", "/api/accounts", {"name": "Test", "surname": "User", "pesel": "89092909825"})
+
+        async def many():
+            return await asyncio.gather(*(
+                call(asgi_app, "POST", "/api/accounts/89092909825/transfer", {"amount": 1, "type": "incoming"})
+                for _ in range(200)
+            ))
+
+        assert {status for status, _, _ in asyncio.run(many())} == {200}
+        assert registry.find_account_by_pesel("89092909825").balance == 200.0
+        assert len(asgi_app.accounts) == 0
+
+    def test_lifespan_and_other_scopes(self, asgi_app):
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        async def main():
+            await asgi_app({"type": "websocket"}, receive, send)
+            await asgi_app({"type": "lifespan"}, receive, send)
+
+        asyncio.run(main())
+
+        assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+
+
+class TestKeyedLocks:
+    def test_same_key_is_exclusive_and_locks_are_dropped(self):
+        locks = KeyedLocks()
+        order = []
+
+        async def worker(name, keys):
+            async with locks.hold(*keys):
+                order.append(f"{name} in")
+                await asyncio.sleep(0.01)
+                order.append(f"{name} out")
+
+        async def main():
+            await asyncio.gather(worker("a", ["1", "2"]), worker("b", ["2", "1"]), worker("c", ["3"]))
+
+        asyncio.run(main())
+
+        assert order.index("a out") < order.index("b in")
+        assert order.index("c in") < order.index("a out")
+        assert len(locks) == 0
+
+    def test_cancelled_waiter_releases_its_reference(self):
+        locks = KeyedLocks()
+
+        async def main():
+            async with locks.hold("1"):
+                waiter = asyncio.ensure_future(_enter(locks, "1"))
+                await asyncio.sleep(0)
+                waiter.cancel()
+                await asyncio.sleep(0)
+            return waiter.cancelled()
+
+        assert asyncio.run(main())
+        assert len(locks) == 0
+
+
+async def _enter(locks, key):
+    async with locks.hold(key):
+        pass
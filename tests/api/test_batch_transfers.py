@@ -0,0 +1,94 @@
+import pytest
+import app.api as api
+from app.api import app, registry
+from src.accounts_registry import AccountsRegistry
+from src.journal import Journal
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def accounts(client):
+    for pesel in ("92031512345", "85051298765"):
+        client.post('/api/accounts', json={"name": "Test", "surname": "User", "pesel": pesel})
+    client.post('/api/transfer', json={"from_account": "external", "to_account": "92031512345", "amount": 100})
+
+
+def balance(client, pesel):
+    return client.get(f'/api/accounts/{pesel}').get_json()["balance"]
+
+
+class TestBatchTransfers:
+    def test_batch_is_applied(self, client, accounts):
+        response = client.post('/api/transfers/batch', json={"transfers": [
+            {"from_account": "92031512345", "to_account": "85051298765", "amount": 30},
+            {"from_account": "85051298765", "to_account": "92031512345", "amount": 10, "express": True},
+        ]})
+
+        assert response.status_code == 200
+        assert response.get_json()["applied"] == 2
+        assert balance(client, "92031512345") == 80
+        assert balance(client, "85051298765") == 19
+
+    def test_atomic_batch_failure_returns_422(self, client, accounts):
+        response = client.post('/api/transfers/batch', json={"transfers": [
+            {"from_account": "92031512345", "to_account": "85051298765", "amount": 30},
+            {"from_account": "92031512345", "to_account": "85051298765", "amount": 500},
+        ]})
+
+        assert response.status_code == 422
+        assert [r["status"] for r in response.get_json()["results"]] == ["not_applied", "failed"]
+        assert balance(client, "92031512345") == 100
+
+    def test_per_item_batch_applies_valid_transfers(self, client, accounts):
+        response = client.post('/api/transfers/batch', json={"atomic": False, "transfers": [
+            {"from_account": "92031512345", "to_account": "85051298765", "amount": 30},
+            {"from_account": "92031512345", "to_account": "85051298765", "amount": 500},
+        ]})
+
+        assert response.status_code == 200
+        assert response.get_json()["failed"] == 1
+        assert balance(client, "85051298765") == 30
+
+    @pytest.mark.parametrize("body", [{}, {"transfers": "all"}, [1, 2]])
+    def test_body_must_contain_transfer_list(self, client, body):
+        assert client.post('/api/transfers/batch', json=body).status_code == 400
+
+    def test_batch_size_is_limited(self, client, mocker):
+        mocker.patch.object(api, "MAX_TRANSFER_BATCH", 1)
+        transfer = {"from_account": "external", "to_account": "92031512345", "amount": 1}
+
+        response = client.post('/api/transfers/batch', json={"transfers": [transfer, transfer]})
+
+        assert response.status_code == 400
+
+    def test_applied_transfers_are_journaled(self, client, accounts, tmp_path, mocker):
+        journal = Journal(str(tmp_path), commit_interval=0.001)
+        journal.write_snapshot(registry)
+        mocker.patch.object(api.app.extensions["bank_app"], "journal", journal)
+
+        client.post('/api/transfers/batch', json={"atomic": False, "transfers": [
+            {"from_account": "external", "to_account": "85051298765", "amount": 5},
+            {"from_account": "92031512345", "to_account": "85051298765", "amount": 30, "express": True},
+            {"from_account": "92031512345", "to_account": "85051298765", "amount": 500},
+        ]})
+        journal.close()
+        restored = AccountsRegistry()
+        recovered = Journal(str(tmp_path))
+        recovered.recover(restored)
+        recovered.close()
+
+        for pesel in ("92031512345", "85051298765"):
+            assert restored.find_account_by_pesel(pesel).to_dict() == registry.find_account_by_pesel(pesel).to_dict()
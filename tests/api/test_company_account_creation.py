@@ -5,9 +5,9 @@ from app.api import app, registry
 
 @pytest.fixture(autouse=True)
 def clear_registry():
-    registry.accounts.clear()
+    registry.clear()
     yield
-    registry.accounts.clear()
+    registry.clear()
 
 
 @pytest.fixture
@@ -58,7 +58,7 @@ class TestCompanyAccountCreationAPI:
             "nip": "1234567890"
         }
         
-        with patch('src.company_account.requests.get', return_value=mock_mf_active_response):
+        with patch('src.mf_client.requests.Session.get', return_value=mock_mf_active_response):
             response = client.post(base_url, json=company_data)
         
         assert response.status_code == 201
@@ -72,7 +72,7 @@ class TestCompanyAccountCreationAPI:
             "nip": "9999999999"
         }
         
-        with patch('src.company_account.requests.get', return_value=mock_mf_inactive_response):
+        with patch('src.mf_client.requests.Session.get', return_value=mock_mf_inactive_response):
             response = client.post(base_url, json=company_data)
         
         assert response.status_code == 400
@@ -92,13 +92,20 @@ class TestCompanyAccountCreationAPI:
         data = response.get_json()
         assert "error" in data
     
+    def test_create_company_account_without_name_returns_400(self, client, base_url, mock_mf_active_response):
+        response = client.post(base_url, json={"nip": "1234567890"})
+        
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Company name must be a string"}
+        assert client.get("/api/accounts/count").get_json()["count"] == 0
+    
     def test_create_company_account_api_error_returns_400(self, client, base_url):
         company_data = {
             "name": "TechCorp",
             "nip": "1234567890"
         }
         
-        with patch('src.company_account.requests.get', side_effect=ConnectionError("Network error")):
+        with patch('src.mf_client.requests.Session.get', side_effect=ConnectionError("Network error")):
             response = client.post(base_url, json=company_data)
         
         assert response.status_code == 400
@@ -112,7 +119,7 @@ class TestCompanyAccountCreationAPI:
             {"name": "TradeInc", "nip": "3333333333"}
         ]
         
-        with patch('src.company_account.requests.get', return_value=mock_mf_active_response):
+        with patch('src.mf_client.requests.Session.get', return_value=mock_mf_active_response):
             for company in companies:
                 response = client.post(base_url, json=company)
                 assert response.status_code == 201
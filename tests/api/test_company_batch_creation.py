@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from app.api import app, registry
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def mf_response(status_vat):
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {'result': {'subject': {'statusVat': status_vat}}}
+    return mock_response
+
+
+class TestCompanyBatchCreation:
+    def test_batch_creates_valid_companies(self, client):
+        companies = [
+            {"name": "TechCorp", "nip": "1111111111"},
+            {"name": "BuildCorp", "nip": "2222222222"},
+            {"name": "TechCorp again", "nip": "1111111111"},
+        ]
+
+        with patch('src.mf_client.requests.Session.get', return_value=mf_response('Czynny')) as mock_get:
+            response = client.post("/api/accounts/batch", json={"companies": companies})
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [result["status"] for result in data["results"]] == ["created", "created", "duplicate"]
+        assert data["created"] == 2
+        assert "elapsed" in data
+        assert mock_get.call_count == 2
+        assert client.get("/api/accounts/count").get_json()["count"] == 2
+
+    def test_batch_reports_rejected_nips(self, client):
+        with patch('src.mf_client.requests.Session.get', return_value=mf_response('Zwolniony')):
+            response = client.post("/api/accounts/batch", json={"companies": [{"name": "Fake", "nip": "9999999999"}]})
+
+        assert response.get_json()["results"] == [
+            {"nip": "9999999999", "status": "rejected", "error": "Company not registered!!"}
+        ]
+        assert client.get("/api/accounts/count").get_json()["count"] == 0
+
+    def test_batch_reports_missing_names_without_mf_lookups(self, client):
+        with patch('src.mf_client.requests.Session.get', return_value=mf_response('Czynny')) as mock_get:
+            response = client.post("/api/accounts/batch", json={"companies": [{"nip": "1111111111"}]})
+
+        assert response.get_json()["results"] == [
+            {"nip": "1111111111", "status": "invalid", "error": "Company name must be a string"}
+        ]
+        mock_get.assert_not_called()
+        assert client.get("/api/accounts/count").get_json()["count"] == 0
+
+    @pytest.mark.parametrize("body", [{}, {"companies": "1111111111"}, {"companies": ["1111111111"]}])
+    def test_batch_with_invalid_body_returns_400(self, client, body):
+        response = client.post("/api/accounts/batch", json=body)
+
+        assert response.status_code == 400
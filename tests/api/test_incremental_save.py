@@ -0,0 +1,80 @@
+import pytest
+from app.api import app, registry, mongo_repo
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def repo(mocker):
+    mocker.patch.object(mongo_repo, "save_all")
+    mocker.patch.object(mongo_repo, "save_changes")
+    return mongo_repo
+
+
+class TestIncrementalSave:
+    def test_first_save_is_full(self, client, repo):
+        client.post('/api/accounts', json={"name": "Alice", "surname": "Wonder", "pesel": "92031512345"})
+
+        response = client.post('/api/accounts/save')
+
+        assert response.status_code == 200
+        assert "Saved 1 accounts" in response.get_json()["message"]
+        repo.save_all.assert_called_once()
+        repo.save_changes.assert_not_called()
+
+    def test_later_saves_only_write_changes(self, client, repo):
+        client.post('/api/accounts', json={"name": "Alice", "surname": "Wonder", "pesel": "92031512345"})
+        client.post('/api/accounts', json={"name": "Bob", "surname": "Builder", "pesel": "88102298765"})
+        client.post('/api/accounts/save')
+
+        client.post('/api/accounts/92031512345/transfer', json={"amount": 100.0, "type": "incoming"})
+        client.delete('/api/accounts/88102298765')
+        response = client.post('/api/accounts/save')
+
+        assert response.status_code == 200
+        changed, removed = repo.save_changes.call_args[0]
+        assert [account.pesel for account in changed] == ["92031512345"]
+        assert removed == [("pesel", "88102298765")]
+
+    def test_full_save_can_be_forced(self, client, repo):
+        client.post('/api/accounts/save')
+
+        client.post('/api/accounts/save?full=true')
+
+        assert repo.save_all.call_count == 2
+        repo.save_changes.assert_not_called()
+
+    def test_failed_save_falls_back_to_full_save(self, client, repo):
+        client.post('/api/accounts/save')
+        repo.save_changes.side_effect = RuntimeError("connection lost")
+
+        response = client.post('/api/accounts/save')
+        assert response.status_code == 500
+
+        client.post('/api/accounts/save')
+        assert repo.save_all.call_count == 2
+
+    def test_changes_made_during_a_full_save_are_saved_next(self, client, repo):
+        client.post('/api/accounts', json={"name": "Alice", "surname": "Wonder", "pesel": "92031512345"})
+        client.post('/api/accounts', json={"name": "Bob", "surname": "Builder", "pesel": "88102298765"})
+        # A concurrent transfer lands while the full save is writing
+        alice = registry.find_account_by_pesel("92031512345")
+        repo.save_all.side_effect = lambda accounts: alice.incoming_transfer(5.0)
+        client.post('/api/accounts/save')
+
+        client.post('/api/accounts/save')
+
+        changed = repo.save_changes.call_args[0][0]
+        assert [account.pesel for account in changed] == ["92031512345"]
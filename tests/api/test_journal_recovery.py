@@ -0,0 +1,133 @@
+import threading
+import pytest
+import app.api as api
+from app.api import app, registry
+from src.accounts_registry import AccountsRegistry
+from src.journal import Journal
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def journal(tmp_path, mocker):
+    journal = Journal(str(tmp_path), commit_interval=0.001)
+    mocker.patch.object(api.app.extensions["bank_app"], "journal", journal)
+    yield journal
+    journal.close()
+
+
+def recover(tmp_path):
+    restored = AccountsRegistry()
+    journal = Journal(str(tmp_path))
+    journal.recover(restored)
+    journal.close()
+    return restored
+
+
+class TestJournalRecovery:
+    def test_mutations_survive_restart(self, client, journal, tmp_path):
+        client.post('/api/accounts', json={"name": "Alice", "surname": "Wonder", "pesel": "92031512345"})
+        client.post('/api/accounts', json={"name": "Bob", "surname": "Builder", "pesel": "85051298765"})
+        client.post('/api/accounts', json={"name": "Carl", "surname": "Temp", "pesel": "77010112345"})
+        client.post('/api/transfer', json={"from_account": "external", "to_account": "92031512345", "amount": 1000})
+        client.post('/api/transfer', json={"from_account": "92031512345", "to_account": "85051298765", "amount": 200})
+        client.post('/api/transfer', json={
+            "from_account": "92031512345", "to_account": "85051298765", "amount": 100, "express": True
+        })
+        client.post('/api/accounts/85051298765/transfer', json={"amount": 50, "type": "outgoing"})
+        client.patch('/api/accounts/92031512345', json={"surname": "Land"})
+        client.delete('/api/accounts/77010112345')
+        journal.close()
+
+        restored = recover(tmp_path)
+
+        assert restored.get_accounts_count() == 2
+        for pesel in ("92031512345", "85051298765"):
+            original = registry.find_account_by_pesel(pesel)
+            account = restored.find_account_by_pesel(pesel)
+            assert account.to_dict() == original.to_dict()
+        assert restored.find_account_by_pesel("92031512345").last_name == "Land"
+
+    def test_rejected_requests_are_not_journaled(self, client, journal):
+        client.post('/api/accounts', json={"name": "Alice", "surname": "Wonder", "pesel": "92031512345"})
+
+        client.post('/api/accounts', json={"name": "Alice", "surname": "Wonder", "pesel": "92031512345"})
+        client.delete('/api/accounts/00000000000')
+
+        assert journal.append({"op": "noop"}) == 2
+
+    def test_periodic_snapshot(self, client, journal, tmp_path):
+        journal.snapshot_every = 2
+        client.post('/api/accounts', json={"name": "Alice", "surname": "Wonder", "pesel": "92031512345"})
+        client.post('/api/transfer', json={"from_account": "external", "to_account": "92031512345", "amount": 10})
+        journal.close()
+
+        # Records still buffered when the snapshot started may follow it, but it covers them
+        reopened = Journal(str(tmp_path))
+        assert reopened.recover(AccountsRegistry()) == 0
+        reopened.close()
+        assert recover(tmp_path).find_account_by_pesel("92031512345").balance == 10
+
+    def test_mf_lookup_runs_outside_the_journal_lock(self, client, journal, mocker):
+        held = []
+
+        def probe():
+            # Another thread can take the lock only if no request holds it
+            acquired = journal.lock.acquire(timeout=0.5)
+            held.append(not acquired)
+            if acquired:
+                journal.lock.release()
+
+        def fetch(nip, today):
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+            return True
+        mocker.patch.object(api.CompanyAccount, "_fetch_nip_status", side_effect=fetch)
+        api.CompanyAccount.nip_cache.clear()
+
+        response = client.post('/api/accounts', json={"name": "TechCorp", "nip": "8461627563"})
+
+        assert response.status_code == 201
+        assert held == [False]
+        api.CompanyAccount.nip_cache.clear()
+
+    @pytest.mark.parametrize("path, body", [
+        ("/api/accounts", {"name": "TechCorp", "nip": "8461627563"}),
+        ("/api/accounts/batch", {"companies": [{"name": "TechCorp", "nip": "8461627563"}]}),
+    ])
+    def test_failed_mf_lookup_is_not_repeated_under_the_lock(self, client, journal, mocker, path, body):
+        # MF is down: the result is not cached, so a second lookup would call MF again
+        fetch = mocker.patch.object(api.CompanyAccount, "_fetch_nip_status", return_value=None)
+        api.CompanyAccount.nip_cache.clear()
+
+        response = client.post(path, json=body)
+
+        assert fetch.call_count == 1
+        assert "Company not registered!!" in response.get_data(as_text=True)
+        assert registry.get_accounts_count() == 0
+
+    def test_snapshot_does_not_delay_the_response(self, client, journal, mocker):
+        release = threading.Event()
+        write_snapshot = journal.write_snapshot
+        mocker.patch.object(journal, "write_snapshot", side_effect=lambda registry: release.wait(5)
+                            and write_snapshot(registry))
+        journal.snapshot_every = 1
+
+        response = client.post('/api/accounts', json={"name": "Alice", "surname": "Wonder", "pesel": "92031512345"})
+
+        assert response.status_code == 201
+        assert journal._snapshot_thread.is_alive()
+        release.set()
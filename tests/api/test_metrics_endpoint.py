@@ -0,0 +1,53 @@
+import pytest
+from app import api
+from app.api import app, registry
+from src.metrics import Metrics
+
+
+@pytest.fixture(autouse=True)
+def metrics(mocker):
+    registry.clear()
+    metrics = Metrics()
+    metrics.gauge("registry_accounts", "Accounts held in memory.", registry.in_memory_count)
+    mocker.patch.object(api.app.extensions["bank_app"], "metrics", metrics)
+    yield metrics
+    registry.clear()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+class TestMetricsEndpoint:
+    def test_requests_are_recorded_by_route_template_and_status(self, client):
+        client.post("/api/accounts", json={"name": "Jan", "surname": "Kowalski", "pesel": "89092909825"})
+        client.get("/api/accounts/89092909825")
+        client.get("/api/accounts/85051298765")
+
+        response = client.get("/metrics")
+        text = response.get_data(as_text=True)
+
+        assert response.status_code == 200
+        assert response.content_type.startswith("text/plain; version=0.0.4")
+        assert 'bank_app_requests_total{method="POST",route="/api/accounts",status="201"} 1' in text
+        assert 'bank_app_requests_total{method="GET",route="/api/accounts/<pesel>",status="200"} 1' in text
+        assert 'bank_app_requests_total{method="GET",route="/api/accounts/<pesel>",status="404"} 1' in text
+        assert 'bank_app_request_duration_seconds_count{method="GET",route="/api/accounts/<pesel>"} 2' in text
+        assert "bank_app_registry_accounts 1\n" in text
+
+    def test_metrics_endpoint_times_itself_from_the_next_scrape(self, client):
+        client.get("/metrics")
+
+        text = client.get("/metrics").get_data(as_text=True)
+
+        assert 'bank_app_requests_total{method="GET",route="/metrics",status="200"} 1' in text
+
+    def test_disabled_metrics_record_nothing(self, client, metrics):
+        metrics.enabled = False
+
+        client.get("/api/accounts/89092909825")
+
+        assert "bank_app_requests_total{" not in client.get("/metrics").get_data(as_text=True)
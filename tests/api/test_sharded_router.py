@@ -0,0 +1,308 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from app.api import create_app
+from app.services import BankServices
+from app.router import create_router_app, HttpShard, ShardUnavailableError
+from src.accounts_registry import AccountsRegistry
+from src.account_indexes import default_indexes
+from src.transfers import TransferLegs
+
+# Owning shard out of two, see src.sharding.shard_for
+SHARD_0 = ("85051298765", "89092909825")
+SHARD_1 = ("92031512345", "11111111111")
+
+
+class FakeShard:
+    """Runs an app.api app of its own in-process."""
+
+    def __init__(self):
+        self.registry = AccountsRegistry(indexes=default_indexes())
+        self.legs = TransferLegs()
+        self.app = create_app({"TESTING": True}, BankServices(self.registry, None, transfer_legs=self.legs))
+        # Path suffixes of requests that fail, before or after being handled
+        self.fail_on = None
+        self.lose_reply_on = None
+        self.requests = []
+
+    def request(self, method, path, json=None, params=None):
+        self.requests.append((method, path))
+        if self.fail_on and path.endswith(self.fail_on):
+            raise ShardUnavailableError("connection refused")
+        with self.app.test_client() as client:
+            response = client.open(path, method=method, json=json, query_string=params)
+        if self.lose_reply_on and path.endswith(self.lose_reply_on):
+            raise ShardUnavailableError("read timed out")
+        return response.status_code, response.get_json()
+
+
+@pytest.fixture
+def shards():
+    return [FakeShard(), FakeShard()]
+
+
+@pytest.fixture
+def client(shards):
+    router = create_router_app(shards)
+    router.config['TESTING'] = True
+    with router.test_client() as client:
+        yield client
+
+
+def open_account(client, pesel, balance=0):
+    client.post('/api/accounts', json={"name": "Test", "surname": "User", "pesel": pesel})
+    if balance:
+        client.post(f'/api/accounts/{pesel}/transfer', json={"amount": balance, "type": "incoming"})
+
+
+def balance(client, pesel):
+    return client.get(f'/api/accounts/{pesel}').get_json()["balance"]
+
+
+def mf_response(status_vat):
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {'result': {'subject': {'statusVat': status_vat}}}
+    return mock_response
+
+
+class TestRouting:
+    def test_accounts_live_on_their_shard(self, client, shards):
+        for pesel in SHARD_0 + SHARD_1:
+            open_account(client, pesel)
+
+        assert [shard.registry.get_accounts_count() for shard in shards] == [2, 2]
+        assert shards[1].registry.pesel_exists(SHARD_1[0])
+        assert client.get(f'/api/accounts/{SHARD_1[0]}').status_code == 200
+        assert client.get('/api/accounts/count').get_json() == {"count": 4}
+        assert sorted(acc["pesel"] for acc in client.get('/api/accounts').get_json()) == sorted(SHARD_0 + SHARD_1)
+
+    def test_update_and_delete_are_forwarded(self, client, shards):
+        open_account(client, SHARD_1[0])
+
+        assert client.patch(f'/api/accounts/{SHARD_1[0]}', json={"name": "Anna"}).status_code == 200
+        assert client.get(f'/api/accounts/{SHARD_1[0]}').get_json()["name"] == "Anna"
+        assert client.delete(f'/api/accounts/{SHARD_1[0]}').status_code == 200
+        assert client.get(f'/api/accounts/{SHARD_1[0]}').status_code == 404
+
+    def test_create_without_key_returns_400(self, client):
+        assert client.post('/api/accounts', json={"name": "Test"}).status_code == 400
+
+    def test_search_merges_shards(self, client):
+        open_account(client, SHARD_0[0], balance=100)
+        open_account(client, SHARD_1[0], balance=100)
+        open_account(client, SHARD_1[1])
+
+        matches = client.get('/api/accounts/search?min_balance=50').get_json()
+
+        assert sorted(acc["pesel"] for acc in matches) == sorted([SHARD_0[0], SHARD_1[0]])
+        assert client.get('/api/accounts/search').status_code == 400
+
+    def test_pagination_is_not_routed(self, client):
+        assert client.get('/api/accounts?limit=10').status_code == 400
+
+    def test_batch_company_creation_keeps_input_order(self, client, shards):
+        companies = [{"name": "A", "nip": "5261040828"}, {"name": "B", "nip": "8461627563"}, {"name": "C", "nip": 5}]
+
+        with patch('src.mf_client.requests.Session.get', return_value=mf_response('Czynny')):
+            response = client.post('/api/accounts/batch', json={"companies": companies})
+
+        data = response.get_json()
+        assert [result["nip"] for result in data["results"][:2]] == ["5261040828", "8461627563"]
+        assert [result["status"] for result in data["results"]] == ["created", "created", "invalid"]
+        assert data["created"] == 2
+        assert shards[1].registry.nip_exists("5261040828") and shards[0].registry.nip_exists("8461627563")
+
+    def test_batch_company_creation_with_invalid_body_returns_400(self, client):
+        assert client.post('/api/accounts/batch', json={"companies": "5261040828"}).status_code == 400
+
+    def test_unreachable_shard_returns_502(self, client, shards):
+        shards[1].fail_on = f"/api/accounts/{SHARD_1[0]}"
+
+        assert client.get(f'/api/accounts/{SHARD_1[0]}').status_code == 502
+
+    @pytest.mark.parametrize("reply", [(500, {"error": "boom"}), (200, {"total": 3})])
+    def test_count_with_a_failing_shard_returns_502(self, client, shards, mocker, reply):
+        mocker.patch.object(shards[1], "request", return_value=reply)
+
+        response = client.get('/api/accounts/count')
+
+        assert response.status_code == 502
+        assert "error" in response.get_json()
+
+    def test_persistence_is_fanned_out(self, client):
+        response = client.get('/api/accounts/persistence')
+
+        assert response.get_json() == {"shards": [{"write_behind": False}, {"write_behind": False}]}
+
+
+class TestCrossShardTransfer:
+    def test_transfer_between_shards(self, client, shards):
+        open_account(client, SHARD_0[0], balance=100)
+        open_account(client, SHARD_1[0])
+
+        response = client.post('/api/transfer', json={
+            "from_account": SHARD_0[0], "to_account": SHARD_1[0], "amount": 40, "express": True,
+        })
+
+        assert response.status_code == 200
+        assert (balance(client, SHARD_0[0]), balance(client, SHARD_1[0])) == (59.0, 40.0)
+
+    def test_transfer_within_a_shard_is_forwarded(self, client, shards):
+        open_account(client, SHARD_1[0], balance=100)
+        open_account(client, SHARD_1[1])
+
+        response = client.post('/api/transfer', json={"from_account": SHARD_1[0], "to_account": SHARD_1[1], "amount": 40})
+
+        assert response.status_code == 200
+        assert ("POST", "/api/transfer") in shards[1].requests
+        assert balance(client, SHARD_1[1]) == 40.0
+
+    def test_unknown_recipient_takes_nothing(self, client, shards):
+        open_account(client, SHARD_0[0], balance=100)
+
+        response = client.post('/api/transfer', json={"from_account": SHARD_0[0], "to_account": SHARD_1[0], "amount": 40})
+
+        assert response.status_code == 404
+        assert balance(client, SHARD_0[0]) == 100.0
+
+    def test_unknown_sender_returns_404(self, client):
+        open_account(client, SHARD_1[0])
+
+        response = client.post('/api/transfer', json={"from_account": SHARD_0[0], "to_account": SHARD_1[0], "amount": 40})
+
+        assert response.status_code == 404
+
+    def test_insufficient_funds_returns_400(self, client):
+        open_account(client, SHARD_0[0], balance=10)
+        open_account(client, SHARD_1[0])
+
+        response = client.post('/api/transfer', json={"from_account": SHARD_0[0], "to_account": SHARD_1[0], "amount": 40})
+
+        assert response.status_code == 400
+        assert balance(client, SHARD_1[0]) == 0.0
+
+    def test_failed_credit_is_refunded_without_counting_as_a_deposit(self, client, shards):
+        open_account(client, SHARD_0[0], balance=100)
+        open_account(client, SHARD_1[0])
+        shards[1].fail_on = "/credit"
+
+        response = client.post('/api/transfer', json={
+            "from_account": SHARD_0[0], "to_account": SHARD_1[0], "amount": 40, "express": True,
+        })
+
+        assert response.status_code == 502
+        assert response.get_json()["refunded"] == 41.0
+        assert (balance(client, SHARD_0[0]), balance(client, SHARD_1[0])) == (100.0, 0.0)
+        assert shards[0].registry.find_account_by_pesel(SHARD_0[0]).history.deposit_run == 0
+
+    def test_credit_applied_with_a_lost_reply_is_not_refunded(self, client, shards):
+        open_account(client, SHARD_0[0], balance=100)
+        open_account(client, SHARD_1[0])
+        shards[1].lose_reply_on = "/credit"
+
+        response = client.post('/api/transfer', json={"from_account": SHARD_0[0], "to_account": SHARD_1[0], "amount": 40})
+
+        assert response.status_code == 200
+        assert (balance(client, SHARD_0[0]), balance(client, SHARD_1[0])) == (60.0, 40.0)
+        assert ("POST", f"/api/accounts/{SHARD_0[0]}/refund") not in shards[0].requests
+
+    def test_debit_with_a_lost_reply_is_refunded(self, client, shards):
+        open_account(client, SHARD_0[0], balance=100)
+        open_account(client, SHARD_1[0])
+        shards[0].lose_reply_on = "/debit"
+
+        response = client.post('/api/transfer', json={"from_account": SHARD_0[0], "to_account": SHARD_1[0], "amount": 40})
+
+        assert response.status_code == 502
+        assert (balance(client, SHARD_0[0]), balance(client, SHARD_1[0])) == (100.0, 0.0)
+
+    def test_unanswered_cancel_leaves_the_transfer_unresolved(self, client, shards):
+        open_account(client, SHARD_0[0], balance=100)
+        open_account(client, SHARD_1[0])
+        shards[1].fail_on = "/credit"
+        request = shards[1].request
+
+        def unreachable_cancel(method, path, json=None, params=None):
+            if path.endswith("/credit/cancel"):
+                raise ShardUnavailableError("connection refused")
+            return request(method, path, json, params)
+
+        shards[1].request = unreachable_cancel
+
+        response = client.post('/api/transfer', json={"from_account": SHARD_0[0], "to_account": SHARD_1[0], "amount": 40})
+
+        assert response.status_code == 502
+        assert response.get_json()["debited"] == 40
+        assert "transfer_id" in response.get_json()
+        assert balance(client, SHARD_0[0]) == 60.0
+
+    def test_failed_refund_is_reported(self, client, shards):
+        open_account(client, SHARD_0[0], balance=100)
+        open_account(client, SHARD_1[0])
+        shards[1].fail_on = "/credit"
+        shards[0].fail_on = "/refund"
+
+        response = client.post('/api/transfer', json={"from_account": SHARD_0[0], "to_account": SHARD_1[0], "amount": 40})
+
+        assert response.status_code == 500
+        assert "transfer_id" in response.get_json()
+
+    def test_missing_fields_return_400(self, client):
+        assert client.post('/api/transfer', json={"from_account": SHARD_0[0]}).status_code == 400
+
+
+class TestShardedBatchTransfers:
+    def test_single_shard_batch_is_forwarded(self, client, shards):
+        open_account(client, SHARD_1[0], balance=100)
+        open_account(client, SHARD_1[1])
+
+        response = client.post('/api/transfers/batch', json={"transfers": [
+            {"from_account": SHARD_1[0], "to_account": SHARD_1[1], "amount": 10},
+        ]})
+
+        assert response.get_json()["applied"] == 1
+        assert ("POST", "/api/transfers/batch") in shards[1].requests
+
+    def test_atomic_cross_shard_batch_returns_400(self, client):
+        response = client.post('/api/transfers/batch', json={"transfers": [
+            {"from_account": SHARD_0[0], "to_account": SHARD_1[0], "amount": 10},
+        ]})
+
+        assert response.status_code == 400
+
+    def test_cross_shard_batch_is_applied_per_item(self, client):
+        open_account(client, SHARD_0[0], balance=100)
+        open_account(client, SHARD_1[0])
+
+        response = client.post('/api/transfers/batch', json={"atomic": False, "transfers": [
+            {"from_account": SHARD_0[0], "to_account": SHARD_1[0], "amount": 10},
+            {"from_account": SHARD_0[0], "to_account": SHARD_1[0], "amount": 1000},
+            "not a transfer",
+        ]})
+
+        data = response.get_json()
+        assert (data["applied"], data["failed"]) == (1, 2)
+        assert [result["status"] for result in data["results"]] == ["ok", "failed", "failed"]
+        assert balance(client, SHARD_1[0]) == 10.0
+
+    def test_batch_without_transfers_returns_400(self, client):
+        assert client.post('/api/transfers/batch', json={}).status_code == 400
+
+
+class TestHttpShard:
+    def test_request_returns_status_and_body(self, mocker):
+        response = MagicMock(status_code=201)
+        response.json.return_value = {"message": "Account created"}
+        send = mocker.patch('app.router.requests.Session.request', return_value=response)
+
+        status, body = HttpShard("http://127.0.0.1:5001/").request("POST", "/api/accounts", json={"pesel": "1"})
+
+        assert (status, body) == (201, {"message": "Account created"})
+        assert send.call_args.args == ("POST", "http://127.0.0.1:5001/api/accounts")
+
+    def test_connection_errors_become_shard_unavailable(self, mocker):
+        import requests
+        mocker.patch('app.router.requests.Session.request', side_effect=requests.ConnectionError("refused"))
+
+        with pytest.raises(ShardUnavailableError):
+            HttpShard("http://127.0.0.1:5001").request("GET", "/api/accounts/count")
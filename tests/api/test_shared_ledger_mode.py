@@ -0,0 +1,82 @@
+import json
+import uuid
+import pytest
+import app.api as api
+from app.api import app, registry, mongo_repo
+from src.personal_account import PersonalAccount
+from src.shared_ledger import SharedLedger, SharedLedgerLocks
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+@pytest.fixture
+def ledger(mocker):
+    ledger = SharedLedger(f"bank-test-{uuid.uuid4().hex[:12]}", capacity=64, stripes=8)
+    mocker.patch.object(api.app.extensions["bank_app"], "shared_ledger", ledger)
+    mocker.patch.object(registry, "locks", SharedLedgerLocks(ledger))
+    yield ledger
+    ledger.unlink()
+    ledger.close()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+class TestSharedLedgerMode:
+    def test_reads_see_updates_from_other_workers(self, client, ledger):
+        client.post('/api/accounts', json={"name": "Test", "surname": "User", "pesel": "89092909825"})
+        client.post('/api/accounts/89092909825/transfer', json={"amount": 100, "type": "incoming"})
+
+        # Another worker credits the account through its own attachment
+        ledger.add("pesel:89092909825", 50.0)
+
+        assert client.get('/api/accounts/89092909825').get_json()["balance"] == 150.0
+
+    def test_listings_and_searches_show_the_shared_balance(self, client, ledger):
+        for pesel in ("89092909825", "85051298765"):
+            client.post('/api/accounts', json={"name": "Test", "surname": "User", "pesel": pesel})
+        # Another worker credits the first account; this worker's copy still says 0
+        ledger.add("pesel:89092909825", 50.0)
+
+        listed = {acc["pesel"]: acc["balance"] for acc in client.get('/api/accounts').get_json()}
+        paged = client.get('/api/accounts?limit=10').get_json()["accounts"]
+        streamed = [json.loads(line) for line in client.get('/api/accounts?stream=ndjson').get_data().splitlines()]
+        found = client.get('/api/accounts/search?min_balance=40').get_json()
+
+        assert listed == {"89092909825": 50.0, "85051298765": 0.0}
+        assert [acc["balance"] for acc in paged] == [0.0, 50.0]
+        assert [acc["balance"] for acc in streamed] == [0.0, 50.0]
+        assert [acc["pesel"] for acc in found] == ["89092909825"]
+        assert client.get('/api/accounts/search?max_balance=10').get_json()[0]["pesel"] == "85051298765"
+
+    def test_transfers_check_the_shared_balance(self, client, ledger):
+        for pesel in ("89092909825", "85051298765"):
+            client.post('/api/accounts', json={"name": "Test", "surname": "User", "pesel": pesel})
+        client.post('/api/accounts/89092909825/transfer', json={"amount": 100, "type": "incoming"})
+        ledger.add("pesel:89092909825", -80.0)
+
+        response = client.post('/api/transfer', json={
+            "from_account": "89092909825", "to_account": "85051298765", "amount": 50,
+        })
+
+        assert response.status_code == 400
+        assert ledger.get(ledger.slot("pesel:89092909825"))[0] == 20.0
+
+    def test_load_publishes_stored_balances(self, client, ledger, mocker):
+        stored = PersonalAccount("Alice", "Wonder", "92031512345")
+        stored.balance = 300.0
+        ledger.add("pesel:92031512345", 5.0)
+        mocker.patch.object(mongo_repo, "iter_all", return_value=iter([stored]))
+
+        assert client.post('/api/accounts/load').status_code == 200
+
+        assert ledger.get(ledger.slot("pesel:92031512345"))[0] == 300.0
@@ -0,0 +1,62 @@
+import pytest
+import app.api as api
+from app.api import app
+from src.storage_backed_registry import StorageBackedRegistry
+from src.personal_account import PersonalAccount
+from tests.unit.test_storage_backed_registry import InMemoryRepository
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def repository():
+    return InMemoryRepository([PersonalAccount("Alice", "Wonder", "92031512345")])
+
+
+@pytest.fixture
+def registry(repository, mocker):
+    registry = StorageBackedRegistry(repository, capacity=1)
+    mocker.patch.object(api.app.extensions["bank_app"], "registry", registry)
+    return registry
+
+
+class TestStorageBackedMode:
+    def test_transfer_between_cold_accounts(self, client, registry, repository):
+        client.post('/api/accounts', json={"name": "Bob", "surname": "Builder", "pesel": "85051298765"})
+        client.post('/api/transfer', json={"from_account": "external", "to_account": "92031512345", "amount": 100})
+
+        response = client.post('/api/transfer', json={
+            "from_account": "92031512345", "to_account": "85051298765", "amount": 40
+        })
+
+        assert response.status_code == 200
+        registry.flush()
+        assert repository.documents[("pesel", "92031512345")]["balance"] == 60
+        assert repository.documents[("pesel", "85051298765")]["balance"] == 40
+
+    def test_duplicate_pesel_in_storage_is_rejected(self, client, registry):
+        response = client.post('/api/accounts', json={"name": "Alice", "surname": "Wonder", "pesel": "92031512345"})
+
+        assert response.status_code == 409
+
+    def test_load_only_resets_hot_set(self, client, registry, repository):
+        registry.find_account_by_pesel("92031512345").incoming_transfer(5.0)
+
+        response = client.post('/api/accounts/load')
+
+        assert response.status_code == 200
+        assert registry.accounts == []
+        assert repository.documents[("pesel", "92031512345")]["balance"] == 5.0
+
+    def test_persistence_reports_hot_set(self, client, registry):
+        client.get('/api/accounts/92031512345')
+
+        stats = client.get('/api/accounts/persistence').get_json()
+
+        assert stats["hot_set"]["misses"] == 1
+        assert stats["hot_set"]["capacity"] == 1
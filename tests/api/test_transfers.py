@@ -1,12 +1,14 @@
 import pytest
+from app import api
 from app.api import app, registry
+from src.transfers import TransferLegs
 
 
 @pytest.fixture(autouse=True)
 def clear_registry():
-    registry.accounts.clear()
+    registry.clear()
     yield
-    registry.accounts.clear()
+    registry.clear()
 
 
 @pytest.fixture
@@ -181,3 +183,112 @@ class TestTransfers:
 
         account = client.get(f"{base_url}/{pesel}").get_json()
         assert account["balance"] == amount
+
+
+class TestDebit:
+    @pytest.mark.parametrize("express, debited", [(False, 300.0), (True, 301.0)])
+    def test_debit_success(self, client, base_url, account_with_balance, express, debited):
+        pesel = account_with_balance
+
+        response = client.post(f"{base_url}/{pesel}/debit", json={"amount": 300.0, "express": express})
+
+        assert response.status_code == 200
+        assert response.get_json()["debited"] == debited
+        assert client.get(f"{base_url}/{pesel}").get_json()["balance"] == 1000.0 - debited
+
+    def test_debit_for_nonexistent_account_returns_404(self, client, base_url):
+        response = client.post(f"{base_url}/99999999999/debit", json={"amount": 100.0})
+
+        assert response.status_code == 404
+
+    @pytest.mark.parametrize("amount", ["100", True, None, 1000.0, 0])
+    def test_invalid_debit_returns_400(self, client, base_url, account_with_balance, amount):
+        pesel = account_with_balance
+
+        response = client.post(f"{base_url}/{pesel}/debit", json={"amount": amount})
+
+        assert response.status_code == 400
+        assert client.get(f"{base_url}/{pesel}").get_json()["balance"] == 1000.0
+
+
+class TestTransferLegs:
+    @pytest.fixture(autouse=True)
+    def legs(self, mocker):
+        mocker.patch.object(api.app.extensions["bank_app"], "transfer_legs", TransferLegs())
+
+    def test_debit_with_transfer_id_is_taken_once(self, client, base_url, account_with_balance):
+        pesel = account_with_balance
+        for _ in range(2):
+            response = client.post(f"{base_url}/{pesel}/debit", json={"amount": 300.0, "transfer_id": "t1"})
+            assert (response.status_code, response.get_json()["debited"]) == (200, 300.0)
+
+        assert client.get(f"{base_url}/{pesel}").get_json()["balance"] == 700.0
+
+    def test_credit_is_applied_once_and_then_cannot_be_cancelled(self, client, base_url, account_with_balance):
+        pesel = account_with_balance
+        for _ in range(2):
+            response = client.post(f"{base_url}/{pesel}/credit", json={"amount": 50, "transfer_id": "t1"})
+            assert response.status_code == 200
+
+        assert client.post(f"{base_url}/{pesel}/credit/cancel", json={"transfer_id": "t1"}).status_code == 409
+        assert client.get(f"{base_url}/{pesel}").get_json()["balance"] == 1050.0
+
+    def test_cancelled_credit_is_refused(self, client, base_url, account_with_balance):
+        pesel = account_with_balance
+
+        assert client.post(f"{base_url}/{pesel}/credit/cancel", json={"transfer_id": "t1"}).status_code == 200
+        response = client.post(f"{base_url}/{pesel}/credit", json={"amount": 50, "transfer_id": "t1"})
+
+        assert response.status_code == 409
+        assert client.get(f"{base_url}/{pesel}").get_json()["balance"] == 1000.0
+
+    def test_refund_gives_back_the_debit_once(self, client, base_url, account_with_balance):
+        pesel = account_with_balance
+        client.post(f"{base_url}/{pesel}/debit", json={"amount": 300.0, "express": True, "transfer_id": "t1"})
+
+        for _ in range(2):
+            response = client.post(f"{base_url}/{pesel}/refund", json={"transfer_id": "t1"})
+            assert response.get_json()["refunded"] == 301.0
+
+        assert client.get(f"{base_url}/{pesel}").get_json()["balance"] == 1000.0
+        response = client.post(f"{base_url}/{pesel}/debit", json={"amount": 300.0, "transfer_id": "t1"})
+        assert response.status_code == 200
+
+    def test_debit_after_its_refund_is_refused(self, client, base_url, account_with_balance):
+        pesel = account_with_balance
+        client.post(f"{base_url}/{pesel}/refund", json={"transfer_id": "t1"})
+
+        response = client.post(f"{base_url}/{pesel}/debit", json={"amount": 300.0, "transfer_id": "t1"})
+
+        assert response.status_code == 409
+        assert client.get(f"{base_url}/{pesel}").get_json()["balance"] == 1000.0
+
+    @pytest.mark.parametrize("leg, body", [
+        ("credit", {"amount": 50}),
+        ("credit", {"amount": "50", "transfer_id": "t1"}),
+        ("credit", {"amount": -5, "transfer_id": "t1"}),
+        ("credit/cancel", {}),
+        ("refund", {}),
+    ])
+    def test_invalid_leg_returns_400(self, client, base_url, account_with_balance, leg, body):
+        assert client.post(f"{base_url}/{account_with_balance}/{leg}", json=body).status_code == 400
+
+    @pytest.mark.parametrize("leg", ["credit", "credit/cancel", "refund"])
+    def test_leg_for_nonexistent_account_returns_404(self, client, base_url, leg):
+        response = client.post(f"{base_url}/99999999999/{leg}", json={"amount": 5, "transfer_id": "t1"})
+
+        assert response.status_code == 404
+
+
+class TestWriteBehindBackpressure:
+    def test_mutations_are_rejected_before_touching_accounts(self, client, base_url, account_with_balance, mocker):
+        pesel = account_with_balance
+        writer = mocker.Mock()
+        writer.wait_for_capacity.return_value = False
+        mocker.patch.object(api.app.extensions["bank_app"], "write_behind", writer)
+
+        response = client.post(f"{base_url}/{pesel}/transfer", json={"amount": 100, "type": "outgoing"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert client.get(f"{base_url}/{pesel}").get_json()["balance"] == 1000.0
@@ -0,0 +1,12 @@
+import pytest
+from src.company_account import CompanyAccount
+
+
+@pytest.fixture(autouse=True)
+def reset_mf_state():
+    """MF validation cache and circuit breaker are shared per class; keep tests independent."""
+    CompanyAccount.nip_cache.clear()
+    CompanyAccount.mf_client.breaker.reset()
+    yield
+    CompanyAccount.nip_cache.clear()
+    CompanyAccount.mf_client.breaker.reset()
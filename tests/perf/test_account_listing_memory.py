@@ -0,0 +1,46 @@
+"""Peak memory of GET /api/accounts: one JSON document vs streamed chunks."""
+import gc
+import tracemalloc
+import pytest
+from app.api import app, registry
+from src.personal_account import PersonalAccount
+
+
+ACCOUNTS = 50000
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def populated_registry():
+    registry.clear()
+    registry.add_accounts(PersonalAccount("TestUser", "Listing", f"{i:011d}") for i in range(ACCOUNTS))
+    yield
+    registry.clear()
+
+
+def _peak_bytes(client, url):
+    gc.collect()
+    tracemalloc.start()
+    response = client.get(url, buffered=False)
+    received = sum(len(chunk) for chunk in response.response)
+    response.close()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, received
+
+
+class TestAccountListingMemory:
+    def test_streaming_keeps_peak_memory_flat(self, client):
+        full_peak, full_size = _peak_bytes(client, '/api/accounts')
+        stream_peak, stream_size = _peak_bytes(client, '/api/accounts?stream=ndjson')
+
+        print(f"\nFull listing of {ACCOUNTS} accounts: {full_size / 1e6:.1f}MB body, "
+              f"{full_peak / 1e6:.1f}MB peak allocation")
+        print(f"NDJSON stream: {stream_size / 1e6:.1f}MB body, {stream_peak / 1e6:.1f}MB peak allocation")
+        assert stream_peak < full_peak
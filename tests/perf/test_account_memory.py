@@ -0,0 +1,52 @@
+"""Memory benchmark for the account representation."""
+import gc
+import tracemalloc
+from types import SimpleNamespace
+from src.personal_account import PersonalAccount
+
+
+ACCOUNTS = 10000
+
+
+def _bytes_per_account(factory):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    accounts = [factory(i) for i in range(ACCOUNTS)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(accounts) == ACCOUNTS
+    return (after - before) / ACCOUNTS
+
+
+def _dict_backed_account(i):
+    """Same fields as PersonalAccount, stored in a per-object __dict__ (the previous layout)."""
+    return SimpleNamespace(
+        balance=0.0,
+        history=[],
+        first_name="TestUser",
+        last_name="Memory",
+        pesel=f"{i:011d}",
+        promo_kod=None,
+    )
+
+
+def _slotted_account(i):
+    return PersonalAccount("TestUser", "Memory", f"{i:011d}")
+
+
+class TestAccountMemory:
+    """Memory benchmarks for accounts held in the registry."""
+
+    def test_slotted_accounts_use_less_memory_than_dict_backed(self):
+        """Compare bytes per account for the __slots__ layout against a __dict__ layout."""
+        dict_backed = _bytes_per_account(_dict_backed_account)
+        slotted = _bytes_per_account(_slotted_account)
+
+        print(f"\nbytes/account: __dict__={dict_backed:.0f} __slots__={slotted:.0f}")
+        assert slotted < dict_backed
+
+    def test_accounts_have_no_instance_dict(self):
+        account = PersonalAccount("TestUser", "Memory", "12345678901")
+
+        assert not hasattr(account, "__dict__")
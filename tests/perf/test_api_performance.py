@@ -15,7 +15,7 @@ def client():
 @pytest.fixture(autouse=True)
 def clear_registry():
     """Clear registry before each test."""
-    registry.accounts.clear()
+    registry.clear()
 
 
 class TestAPIPerformance:
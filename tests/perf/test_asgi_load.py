@@ -0,0 +1,126 @@
+"""
+Company onboarding under load: Flask on a thread pool vs the ASGI app.
+
+Each creation waits on the MF API, served here by a local fake with a
+fixed delay. A threaded Flask server has one thread per request in
+flight; the ASGI app keeps every waiting request as a coroutine.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.api import app, registry
+from app.asgi import BankASGI
+from src.company_account import CompanyAccount
+from src.mf_client import AsyncMFClient, MFClient
+from src.structured_logging import OFF, configure_logging, configure_from_env
+from tests.api.test_asgi_app import call
+
+# Set BANK_APP_BENCH_LARGE=1 for 10000 requests
+REQUESTS = 10_000 if os.getenv('BANK_APP_BENCH_LARGE') == '1' else 1_000
+MF_DELAY = 0.05
+# Typical thread count of a threaded WSGI deployment
+FLASK_THREADS = 32
+MF_CONNECTIONS = 500
+
+
+class FakeMF:
+    """MF whitelist stub on its own event loop thread, answering after MF_DELAY."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self._respond, "127.0.0.1", 0, backlog=4096)
+        )
+        self.url = f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        ready.set()
+        self.loop.run_forever()
+
+    async def _respond(self, reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        await asyncio.sleep(MF_DELAY)
+        body = b'{"result": {"subject": {"statusVat": "Czynny"}}}'
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n"
+                     b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+        await writer.drain()
+        writer.close()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+@pytest.fixture
+def fake_mf(mocker):
+    mf = FakeMF()
+    mocker.patch.object(CompanyAccount, "MF_API_URL", mf.url)
+    mocker.patch.object(CompanyAccount, "mf_client", MFClient(pool_size=FLASK_THREADS, max_retries=0))
+    mocker.patch.object(CompanyAccount, "async_mf_client", AsyncMFClient(pool_size=MF_CONNECTIONS, max_retries=0))
+    # Keep request logs out of the measurement
+    configure_logging(OFF)
+    yield mf
+    mf.close()
+    configure_from_env()
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    registry.clear()
+    CompanyAccount.nip_cache.clear()
+    yield
+    registry.clear()
+    CompanyAccount.nip_cache.clear()
+
+
+def _companies(offset):
+    return [{"name": "Bench", "nip": f"{offset + i:010d}"} for i in range(REQUESTS)]
+
+
+class TestASGILoad:
+    def test_flask_threads_vs_asgi(self, fake_mf):
+        app.config['TESTING'] = True
+
+        def create(company):
+            with app.test_client() as client:
+                return client.post('/api/accounts', json=company).status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=FLASK_THREADS) as pool:
+            flask_statuses = list(pool.map(create, _companies(0)))
+        flask_elapsed = time.perf_counter() - start
+
+        asgi_app = BankASGI()
+        in_flight = peak = 0
+
+        async def create_async(company):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                return (await call(asgi_app, "POST", "/api/accounts", company))[0]
+            finally:
+                in_flight -= 1
+
+        async def load():
+            return await asyncio.gather(*(create_async(company) for company in _companies(REQUESTS)))
+
+        start = time.perf_counter()
+        asgi_statuses = asyncio.run(load())
+        asgi_elapsed = time.perf_counter() - start
+
+        assert flask_statuses == [201] * REQUESTS
+        assert asgi_statuses == [201] * REQUESTS
+        assert registry.get_accounts_count() == 2 * REQUESTS
+        print(f"\n{REQUESTS} company accounts, MF latency {MF_DELAY * 1000:.0f}ms:")
+        print(f"  Flask, {FLASK_THREADS} threads: {REQUESTS / flask_elapsed:.0f} req/s")
+        print(f"  ASGI, one thread:   {REQUESTS / asgi_elapsed:.0f} req/s, {peak} requests in flight")
+        assert asgi_elapsed < flask_elapsed
@@ -0,0 +1,53 @@
+"""Throughput of batch transfers vs one POST /api/transfer per transfer."""
+import time
+import pytest
+from app.api import app, registry
+from src.personal_account import PersonalAccount
+
+
+ACCOUNTS = 100
+TRANSFERS = 2000
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def funded_accounts():
+    registry.clear()
+    for i in range(ACCOUNTS):
+        account = PersonalAccount("Bench", "User", f"{i:011d}")
+        account.balance = 1_000_000.0
+        registry.add_account(account)
+    yield
+    registry.clear()
+
+
+def _transfers():
+    return [
+        {"from_account": f"{i % ACCOUNTS:011d}", "to_account": f"{(i + 1) % ACCOUNTS:011d}", "amount": 1}
+        for i in range(TRANSFERS)
+    ]
+
+
+class TestBatchTransferThroughput:
+    def test_batch_vs_single_requests(self, client):
+        transfers = _transfers()
+
+        start = time.perf_counter()
+        for transfer in transfers:
+            assert client.post('/api/transfer', json=transfer).status_code == 200
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        response = client.post('/api/transfers/batch', json={"transfers": transfers})
+        batch = time.perf_counter() - start
+
+        assert response.get_json()["applied"] == TRANSFERS
+        print(f"\n{TRANSFERS} transfers one per request: {TRANSFERS / single:.0f} transfers/s")
+        print(f"{TRANSFERS} transfers in one batch:    {TRANSFERS / batch:.0f} transfers/s")
+        assert batch < single
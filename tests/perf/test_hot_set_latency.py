@@ -0,0 +1,38 @@
+"""Lookup latency of the storage-backed registry's hot set vs the in-memory registry."""
+import time
+from src.accounts_registry import AccountsRegistry
+from src.personal_account import PersonalAccount
+from src.storage_backed_registry import StorageBackedRegistry
+from tests.unit.test_storage_backed_registry import InMemoryRepository
+
+
+ACCOUNTS = 20000
+HOT_SET = 1000
+LOOKUPS = 100000
+
+
+def _lookup_seconds(registry, pesels):
+    start = time.perf_counter()
+    for i in range(LOOKUPS):
+        registry.find_account_by_pesel(pesels[i % len(pesels)])
+    return (time.perf_counter() - start) / LOOKUPS
+
+
+class TestHotSetLatency:
+    def test_hot_lookups_run_at_in_memory_speed(self):
+        accounts = [PersonalAccount("Bench", "User", f"{i:011d}") for i in range(ACCOUNTS)]
+        hot_pesels = [account.pesel for account in accounts[:HOT_SET]]
+        in_memory = AccountsRegistry()
+        in_memory.add_accounts(accounts)
+        backed = StorageBackedRegistry(InMemoryRepository(accounts), capacity=HOT_SET)
+
+        memory_latency = _lookup_seconds(in_memory, hot_pesels)
+        cold_latency = _lookup_seconds(backed, hot_pesels[:1] + [a.pesel for a in accounts[HOT_SET:]])
+        _lookup_seconds(backed, hot_pesels)
+        hot_latency = _lookup_seconds(backed, hot_pesels)
+
+        print(f"\nin-memory registry: {memory_latency * 1e6:.2f}us per lookup")
+        print(f"hot set hit:        {hot_latency * 1e6:.2f}us per lookup")
+        print(f"fault-in + evict:   {cold_latency * 1e6:.2f}us per lookup (in-process fake storage)")
+        assert backed.stats()["size"] == HOT_SET
+        assert hot_latency < cold_latency
@@ -0,0 +1,34 @@
+"""Import-time benchmark for the API module (`python -X importtime`)."""
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+# Only needed once an account is persisted or a NIP checked online
+DEFERRED_MODULES = ("pymongo", "bson", "requests", "multiprocessing")
+
+
+def _import_profile(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            profile[name.strip()] = int(cumulative)
+    return profile
+
+
+class TestImportTime:
+    def test_api_import_defers_storage_and_http_clients(self):
+        profile = _import_profile("app.api")
+
+        assert not [module for module in DEFERRED_MODULES if module in profile]
+        slowest = sorted(profile.items(), key=lambda item: item[1], reverse=True)[1:6]
+        print(f"\napp.api imported in {profile['app.api'] / 1000:.1f}ms")
+        for name, micros in slowest:
+            print(f"  {name}: {micros / 1000:.1f}ms")
@@ -0,0 +1,53 @@
+"""Recovery benchmark for the local transaction journal."""
+import json
+import os
+import time
+from src.accounts_registry import AccountsRegistry
+from src.journal import Journal, JOURNAL_FILE
+from src.personal_account import PersonalAccount
+
+
+# Set BANK_APP_BENCH_LARGE=1 to replay the full 10M-record journal
+ENTRIES = 10_000_000 if os.getenv('BANK_APP_BENCH_LARGE') == '1' else 200_000
+ACCOUNTS = 10_000
+
+
+def _write_journal(path, entries):
+    with open(path, "wb") as log:
+        for seq in range(1, ACCOUNTS + 1):
+            account = PersonalAccount("Bench", "User", f"{seq:011d}")
+            log.write(json.dumps({"seq": seq, "op": "create", "account": account.to_dict()}).encode() + b"\n")
+        for seq in range(ACCOUNTS + 1, entries + 1):
+            pesel = f"{seq % ACCOUNTS + 1:011d}"
+            log.write(json.dumps({
+                "seq": seq, "op": "transfer", "key": ["pesel", pesel], "kind": "incoming", "amount": 1
+            }).encode() + b"\n")
+
+
+class TestJournalRecovery:
+    def test_recovery_time(self, tmp_path):
+        _write_journal(tmp_path / JOURNAL_FILE, ENTRIES)
+        registry = AccountsRegistry()
+
+        start = time.perf_counter()
+        journal = Journal(str(tmp_path))
+        replayed = journal.recover(registry)
+        elapsed = time.perf_counter() - start
+        journal.close()
+
+        assert replayed == ENTRIES
+        assert registry.get_accounts_count() == ACCOUNTS
+        print(f"\nReplayed {replayed} journal records in {elapsed:.2f}s ({replayed / elapsed:.0f} records/s)")
+
+        start = time.perf_counter()
+        journal = Journal(str(tmp_path))
+        journal.write_snapshot(registry)
+        journal.close()
+        restored = AccountsRegistry()
+        journal = Journal(str(tmp_path))
+        journal.recover(restored)
+        snapshot_elapsed = time.perf_counter() - start
+        journal.close()
+
+        assert restored.get_accounts_count() == ACCOUNTS
+        print(f"Snapshot + restore of {ACCOUNTS} accounts in {snapshot_elapsed:.2f}s")
@@ -0,0 +1,50 @@
+"""Requests/sec with request logging off, on, and sampled."""
+import os
+import time
+import pytest
+from app.api import app, registry
+from src.structured_logging import OFF, configure_logging, configure_from_env
+
+REQUESTS = 5000
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    registry.clear()
+    yield
+    registry.clear()
+    configure_from_env()
+
+
+def _requests_per_second(client):
+    client.post('/api/accounts', json={"name": "Bench", "surname": "User", "pesel": "89092909825"})
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        client.post('/api/accounts/89092909825/transfer', json={"amount": 1, "type": "incoming"})
+    return REQUESTS / (time.perf_counter() - start)
+
+
+class TestLoggingOverhead:
+    def test_requests_per_second_with_logging_on_and_off(self, client):
+        results = {}
+        with open(os.devnull, "w") as devnull:
+            for label, level, sample_rates in (
+                ("off", OFF, None),
+                ("on", "INFO", None),
+                ("sampled 1%", "INFO", {"default": 0.01}),
+            ):
+                configure_logging(level, sample_rates=sample_rates, stream=devnull)
+                registry.clear()
+                results[label] = _requests_per_second(client)
+            configure_logging(OFF)
+
+        print(f"\n{REQUESTS} transfer requests:")
+        for label, rate in results.items():
+            print(f"  logging {label:<10}: {rate:.0f} req/s")
@@ -0,0 +1,82 @@
+"""Cost of per-route request metrics, per request and per recorded observation."""
+import time
+import pytest
+from app import api
+from app.api import app, registry
+from src.metrics import Metrics
+from src.structured_logging import OFF, configure_logging, configure_from_env
+
+REQUESTS = 2000
+ROUNDS = 3
+OBSERVATIONS = 200_000
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def quiet(mocker):
+    mocker.patch.object(api.app.extensions["bank_app"], "metrics", Metrics())
+    configure_logging(OFF)
+    registry.clear()
+    yield
+    registry.clear()
+    configure_from_env()
+
+
+def _seconds_per_request(client):
+    client.post('/api/accounts', json={"name": "Bench", "surname": "User", "pesel": "89092909825"})
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        client.post('/api/accounts/89092909825/transfer', json={"amount": 1, "type": "incoming"})
+    return (time.perf_counter() - start) / REQUESTS
+
+
+def _seconds_per_hook_pair(response):
+    """start_timer and record_request as Flask runs them around a transfer view."""
+    with app.test_request_context('/api/accounts/89092909825/transfer', method='POST'):
+        start = time.perf_counter()
+        for _ in range(OBSERVATIONS):
+            api.start_timer()
+            api.record_request(response)
+        return (time.perf_counter() - start) / OBSERVATIONS
+
+
+class TestMetricsOverhead:
+    def test_observation_costs_a_few_microseconds(self):
+        metrics = Metrics()
+        start = time.perf_counter()
+        for ns in range(OBSERVATIONS):
+            metrics.observe_request("POST", "/api/accounts/<pesel>/transfer", 200, ns * 997)
+        per_call = (time.perf_counter() - start) / OBSERVATIONS
+
+        print(f"\nobserve_request: {per_call * 1e6:.2f} µs")
+        assert per_call < 10e-6
+
+    def test_request_hooks_on_and_off(self):
+        response = app.response_class(status=200)
+        hooks = {}
+        for label, enabled in (("off", False), ("on", True)):
+            api.metrics.enabled = enabled
+            hooks[label] = _seconds_per_hook_pair(response)
+
+        print(f"\nrequest hooks, metrics off: {hooks['off'] * 1e6:.2f} µs, on: {hooks['on'] * 1e6:.2f} µs")
+        assert hooks["on"] < 20e-6
+
+    def test_requests_with_metrics_on_and_off(self, client):
+        # Interleaved rounds, best of each: run-to-run noise is larger than the metrics
+        results = {"off": [], "on": []}
+        for _ in range(ROUNDS):
+            for label, enabled in (("off", False), ("on", True)):
+                api.metrics.enabled = enabled
+                registry.clear()
+                results[label].append(_seconds_per_request(client))
+
+        print(f"\n{REQUESTS} transfer requests, best of {ROUNDS}:")
+        for label, runs in results.items():
+            print(f"  metrics {label:<3}: {1 / min(runs):.0f} req/s, {min(runs) * 1e6:.1f} µs/request")
+        assert 'route="/api/accounts/<pesel>/transfer",status="200"} ' in api.metrics.render()
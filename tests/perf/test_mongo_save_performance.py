@@ -0,0 +1,43 @@
+"""Benchmark for bulk saving accounts to a local MongoDB."""
+import os
+import time
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from src.mongo_accounts_repository import MongoAccountsRepository
+from src.personal_account import PersonalAccount
+
+
+MONGO_URL = os.getenv('BANK_APP_MONGO_URL', 'mongodb://localhost:27017/')
+BENCH_DB = "bank_app_benchmark"
+# 1M accounts takes a while; opt in with BANK_APP_BENCH_LARGE=1
+SIZES = [10_000, 100_000] + ([1_000_000] if os.getenv('BANK_APP_BENCH_LARGE') else [])
+
+
+@pytest.fixture(scope="module")
+def repo():
+    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"MongoDB is not reachable at {MONGO_URL}")
+    repo = MongoAccountsRepository(MONGO_URL, db_name=BENCH_DB)
+    yield repo
+    client.drop_database(BENCH_DB)
+    client.close()
+    repo.close()
+
+
+class TestMongoSavePerformance:
+    """Throughput of save_all for growing registries."""
+
+    @pytest.mark.parametrize("count", SIZES)
+    def test_save_all_throughput(self, repo, count):
+        accounts = [PersonalAccount("Bench", "Mark", f"{i:011d}") for i in range(count)]
+
+        start = time.perf_counter()
+        repo.save_all(accounts)
+        elapsed = time.perf_counter() - start
+
+        print(f"\nsave_all({count}): {elapsed:.2f}s, {count / elapsed:,.0f} accounts/s")
+        assert repo._collection.estimated_document_count() == count
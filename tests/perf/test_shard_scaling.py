@@ -0,0 +1,85 @@
+"""Throughput of the sharded deployment (app.sharded) as the shard count grows."""
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from app.router import HttpShard
+from app.sharded import start_shards, wait_until_ready
+from src.sharding import shard_for
+
+ROOT = Path(__file__).resolve().parents[2]
+# Set BANK_APP_BENCH_LARGE=1 for more shards and requests
+LARGE = os.getenv('BANK_APP_BENCH_LARGE') == '1'
+SHARD_COUNTS = (1, 2, 4, 8) if LARGE else (1, 2)
+TRANSFERS = 20_000 if LARGE else 2_000
+ACCOUNTS = 200
+CLIENTS = 16
+
+
+def _free_port_range(count):
+    while True:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            first = probe.getsockname()[1]
+        if first + count < 65536 and all(_port_is_free(first + i) for i in range(count)):
+            return first
+
+
+def _port_is_free(port):
+    with socket.socket() as probe:
+        try:
+            probe.bind(("127.0.0.1", port))
+            return True
+        except OSError:
+            return False
+
+
+def _run(shard_count):
+    port = _free_port_range(shard_count)
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        processes = start_shards(shard_count, port)
+    finally:
+        os.chdir(cwd)
+    try:
+        urls = [f"http://127.0.0.1:{port + i}" for i in range(shard_count)]
+        wait_until_ready(urls)
+        # Clients route by key themselves, as the router would, so the
+        # numbers measure the shards rather than one router process
+        shards = [HttpShard(url) for url in urls]
+        pesels = [f"{i:011d}" for i in range(ACCOUNTS)]
+        for pesel in pesels:
+            shards[shard_for(pesel, shard_count)].request(
+                "POST", "/api/accounts", json={"name": "Bench", "surname": "User", "pesel": pesel}
+            )
+
+        def credit(i):
+            pesel = pesels[i % ACCOUNTS]
+            return shards[shard_for(pesel, shard_count)].request(
+                "POST", f"/api/accounts/{pesel}/transfer", json={"amount": 1, "type": "incoming"}
+            )[0]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+            statuses = list(pool.map(credit, range(TRANSFERS)))
+        elapsed = time.perf_counter() - start
+
+        assert statuses == [200] * TRANSFERS
+        assert sum(shard.request("GET", "/api/accounts/count")[1]["count"] for shard in shards) == ACCOUNTS
+        return TRANSFERS / elapsed
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+class TestShardScaling:
+    def test_throughput_by_shard_count(self):
+        results = {count: _run(count) for count in SHARD_COUNTS}
+
+        print(f"\n{TRANSFERS} transfers from {CLIENTS} clients on {os.cpu_count()} CPUs:")
+        for count, rate in results.items():
+            print(f"  {count} shard(s): {rate:.0f} transfers/s ({rate / results[1]:.2f}x)")
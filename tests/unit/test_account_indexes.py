@@ -0,0 +1,170 @@
+import pytest
+from src.personal_account import PersonalAccount
+from src.company_account import CompanyAccount
+from src.accounts_registry import AccountsRegistry
+from src.account_indexes import AccountIndex, HashIndex, SortedIndex, default_indexes
+
+
+class TestAccountIndexes:
+    @pytest.fixture
+    def registry(self):
+        return AccountsRegistry(indexes=default_indexes())
+
+    @pytest.fixture
+    def accounts(self):
+        return [
+            PersonalAccount("John", "Kowalski", "12345678901"),
+            PersonalAccount("Jane", "Kowalczyk", "98765432109"),
+            PersonalAccount("Bob", "Nowak", "55555555555"),
+        ]
+
+    @pytest.fixture
+    def company(self, mocker):
+        mock_response = mocker.MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
+        return CompanyAccount("TechCorp", "1234567890")
+
+    def test_type_index(self, registry, accounts, company):
+        for account in accounts + [company]:
+            registry.add_account(account)
+
+        assert registry.get_index("type").lookup("personal") == accounts
+        assert registry.get_index("type").lookup("company") == [company]
+        assert registry.get_index("type").lookup("unknown") == []
+
+    def test_surname_prefix(self, registry, accounts, company):
+        for account in accounts + [company]:
+            registry.add_account(account)
+
+        surname = registry.get_index("surname")
+        assert surname.prefix("Kowal") == [accounts[1], accounts[0]]
+        assert surname.prefix("Now") == [accounts[2]]
+        assert surname.prefix("X") == []
+        assert len(surname) == 3
+
+    def test_balance_range_follows_transfers(self, registry, accounts):
+        for account in accounts:
+            registry.add_account(account)
+
+        accounts[0].incoming_transfer(100.0)
+        accounts[1].incoming_transfer(50.0)
+        accounts[1].express_outgoing(50.0)
+
+        balance = registry.get_index("balance")
+        assert balance.range(high=-0.01) == [accounts[1]]
+        assert balance.range(0.0, 0.0) == [accounts[2]]
+        assert balance.range(low=50.0) == [accounts[0]]
+        assert balance.range() == [accounts[1], accounts[2], accounts[0]]
+
+    def test_surname_change_is_reindexed(self, registry, accounts):
+        registry.add_account(accounts[2])
+
+        accounts[2].last_name = "Kowalewski"
+
+        assert registry.get_index("surname").prefix("Now") == []
+        assert registry.get_index("surname").prefix("Kowal") == [accounts[2]]
+
+    def test_removed_account_leaves_indexes(self, registry, accounts):
+        registry.add_account(accounts[0])
+        registry.remove_account(accounts[0])
+
+        accounts[0].incoming_transfer(10.0)
+
+        assert registry.get_index("type").lookup("personal") == []
+        assert registry.get_index("balance").range() == []
+
+    def test_clear_empties_indexes(self, registry, accounts):
+        for account in accounts:
+            registry.add_account(account)
+
+        registry.clear()
+        accounts[0].last_name = "Zielinski"
+
+        assert registry.get_index("surname").prefix("") == []
+        assert registry.get_index("type").lookup("personal") == []
+
+    def test_add_index_builds_from_existing_accounts(self, accounts):
+        registry = AccountsRegistry()
+        for account in accounts:
+            registry.add_account(account)
+
+        registry.add_index("first_name", HashIndex(lambda account: account.first_name))
+
+        assert registry.get_index("first_name").lookup("Bob") == [accounts[2]]
+
+    def test_unrelated_field_change_does_not_touch_index(self, mocker, accounts):
+        index = SortedIndex(lambda account: account.last_name, fields=("last_name",))
+        registry = AccountsRegistry(indexes={"surname": index})
+        registry.add_account(accounts[0])
+        update = mocker.spy(index, "update")
+
+        accounts[0].incoming_transfer(10.0)
+
+        update.assert_not_called()
+
+    def test_key_index_pages_by_pesel_and_nip(self, registry, accounts, company):
+        for account in accounts + [company]:
+            registry.add_account(account)
+        index = registry.get_index("key")
+
+        first, position = index.page(2)
+        second, end = index.page(2, after=position)
+
+        assert first == [company, accounts[0]]
+        assert second == [accounts[2], accounts[1]]
+        assert end is None
+        assert index.page(2, offset=1)[0] == [accounts[0], accounts[2]]
+        assert index.page(2, offset=10) == ([], None)
+        assert position == accounts[0].pesel
+
+    def test_page_resumes_after_removed_position(self, registry, accounts):
+        for account in accounts:
+            registry.add_account(account)
+        index = registry.get_index("key")
+        page, position = index.page(1)
+
+        registry.remove_account(page[0])
+
+        assert index.page(5, after=position)[0] == [accounts[2], accounts[1]]
+
+    def test_non_string_surname_is_indexed_as_text(self, registry, accounts):
+        registry.add_account(accounts[0])
+        registry.add_account(accounts[1])
+
+        accounts[0].last_name = 42
+
+        assert registry.get_index("surname").prefix("42") == [accounts[0]]
+        assert registry.get_index("surname").prefix("Kowal") == [accounts[1]]
+
+    def test_failing_key_leaves_registry_unchanged(self, accounts):
+        def broken(account):
+            raise TypeError("no key")
+
+        registry = AccountsRegistry(indexes={
+            "surname": SortedIndex(lambda account: account.last_name),
+            "broken": HashIndex(broken),
+        })
+
+        with pytest.raises(TypeError):
+            registry.add_account(accounts[0])
+
+        assert registry.get_all_accounts() == []
+        assert not registry.pesel_exists(accounts[0].pesel)
+        assert len(registry.get_index("surname")) == 0
+
+    def test_unorderable_key_leaves_index_unchanged(self, accounts):
+        index = SortedIndex(lambda account: account.last_name)
+        index.add(accounts[0])
+        accounts[1].last_name = 7
+
+        with pytest.raises(TypeError):
+            index.add(accounts[1])
+
+        assert len(index) == 1
+        assert index.prefix("Kowalski") == [accounts[0]]
+
+    def test_index_base_class_is_abstract(self):
+        with pytest.raises(TypeError):
+            AccountIndex(lambda account: account.pesel)
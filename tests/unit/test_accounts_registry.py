@@ -1,5 +1,6 @@
 import pytest
 from src.personal_account import PersonalAccount
+from src.company_account import CompanyAccount
 from src.accounts_registry import AccountsRegistry
 
 
@@ -72,6 +73,7 @@ class TestAccountsRegistry:
         
         registry.add_account(sample_accounts[1])
         assert registry.get_accounts_count() == 2
+        assert registry.in_memory_count() == 2
         
         registry.add_account(sample_accounts[2])
         assert registry.get_accounts_count() == 3
@@ -134,3 +136,166 @@ class TestPeselUniqueness:
         
         assert registry.pesel_exists(pesel) is True
         assert registry.pesel_exists("99999999999") is False
+
+    
+    def test_add_accounts_skips_registered_keys(self, registry):
+        """Test that add_accounts adds nothing over an existing or repeated key."""
+        existing = PersonalAccount("John", "Doe", "12345678901")
+        registry.add_account(existing)
+        again = PersonalAccount("Johnny", "Doe", "12345678901")
+        new = PersonalAccount("Jane", "Doe", "98765432109")
+        repeated = PersonalAccount("Janet", "Doe", "98765432109")
+        
+        skipped = registry.add_accounts([again, new, repeated])
+        
+        assert skipped == [again, repeated]
+        assert registry.get_all_accounts() == [existing, new]
+
+
+class TestRegistryIndexes:
+    @pytest.fixture
+    def registry(self):
+        return AccountsRegistry()
+
+    @pytest.fixture
+    def company(self, mocker):
+        mock_response = mocker.MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
+        return CompanyAccount("TechCorp", "1234567890")
+
+    def test_find_account_by_nip(self, registry, company):
+        registry.add_account(company)
+
+        assert registry.find_account_by_nip("1234567890") is company
+        assert registry.nip_exists("1234567890") is True
+        assert registry.find_account_by_nip("0000000000") is None
+        assert registry.find_account_by_pesel("1234567890") is None
+
+    def test_remove_account_updates_indexes(self, registry, company):
+        personal = PersonalAccount("John", "Doe", "12345678901")
+        registry.add_account(personal)
+        registry.add_account(company)
+
+        assert registry.remove_account(personal) is True
+        assert registry.remove_account(company) is True
+
+        assert registry.get_accounts_count() == 0
+        assert registry.pesel_exists("12345678901") is False
+        assert registry.nip_exists("1234567890") is False
+
+    def test_remove_unknown_account_returns_false(self, registry):
+        account = PersonalAccount("John", "Doe", "12345678901")
+
+        assert registry.remove_account(account) is False
+
+    def test_remove_keeps_insertion_order(self, registry):
+        accounts = [PersonalAccount("A", "A", f"{i:011d}") for i in range(4)]
+        for account in accounts:
+            registry.add_account(account)
+
+        registry.remove_account(accounts[1])
+
+        assert registry.get_all_accounts() == [accounts[0], accounts[2], accounts[3]]
+
+    def test_invalid_placeholder_is_not_indexed(self, registry):
+        account = PersonalAccount("John", "Doe", "123")
+        registry.add_account(account)
+
+        assert account.pesel == "Invalid"
+        assert registry.get_accounts_count() == 1
+        assert registry.find_account_by_pesel("Invalid") is None
+
+    def test_clear(self, registry, company):
+        registry.add_account(PersonalAccount("John", "Doe", "12345678901"))
+        registry.add_account(company)
+
+        registry.clear()
+
+        assert registry.accounts == []
+        assert registry.pesel_exists("12345678901") is False
+        assert registry.nip_exists("1234567890") is False
+
+
+class TestChangeTracking:
+    @pytest.fixture
+    def registry(self):
+        registry = AccountsRegistry()
+        registry.mark_saved()
+        return registry
+
+    def test_new_registry_needs_full_save(self):
+        assert AccountsRegistry().needs_full_save is True
+
+    def test_created_accounts_are_dirty(self, registry):
+        account = PersonalAccount("John", "Doe", "12345678901")
+        registry.add_account(account)
+
+        assert registry.collect_changes() == ([account], [])
+        assert registry.collect_changes() == ([], [])
+
+    def test_stored_accounts_are_not_changes(self, registry, mocker):
+        observer = mocker.Mock()
+        registry.add_observer(observer)
+        account = PersonalAccount("John", "Doe", "12345678901")
+
+        registry.add_account(account, stored=True)
+
+        assert registry.find_account_by_pesel("12345678901") is account
+        assert registry.collect_changes() == ([], [])
+        observer.account_changed.assert_not_called()
+        account.incoming_transfer(10.0)
+        assert registry.collect_changes() == ([account], [])
+        observer.account_changed.assert_called_once_with(account)
+
+    @pytest.mark.parametrize("change", [
+        lambda account: account.incoming_transfer(100.0),
+        lambda account: account.express_outgoing(10.0),
+        lambda account: setattr(account, "first_name", "Johnny"),
+        lambda account: setattr(account, "last_name", "Smith"),
+    ])
+    def test_modified_accounts_are_dirty(self, registry, change):
+        account = PersonalAccount("John", "Doe", "12345678901")
+        registry.add_account(account)
+        registry.mark_saved()
+
+        change(account)
+
+        assert registry.collect_changes() == ([account], [])
+
+    def test_removed_accounts_are_tracked_by_key(self, registry, mocker):
+        mock_response = mocker.MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
+        personal = PersonalAccount("John", "Doe", "12345678901")
+        company = CompanyAccount("TechCorp", "1234567890")
+        registry.add_accounts([personal, company])
+        personal.incoming_transfer(10.0)
+
+        registry.remove_account(personal)
+        registry.remove_account(company)
+
+        assert registry.collect_changes() == ([], [("pesel", "12345678901"), ("nip", "1234567890")])
+
+    def test_clear_requires_full_save(self, registry):
+        registry.add_account(PersonalAccount("John", "Doe", "12345678901"))
+
+        registry.clear()
+
+        assert registry.needs_full_save is True
+        assert registry.collect_changes() == ([], [])
+
+    def test_full_save_keeps_changes_made_while_saving(self):
+        registry = AccountsRegistry()
+        saved = PersonalAccount("John", "Doe", "12345678901")
+        registry.add_account(saved)
+
+        assert registry.collect_all() == [saved]
+        # Changed after being collected, before the save returns
+        saved.incoming_transfer(10.0)
+        registry.mark_saved()
+
+        assert registry.needs_full_save is False
+        assert registry.collect_changes() == ([saved], [])
@@ -0,0 +1,220 @@
+import random
+import sys
+import threading
+import pytest
+from src.account_locks import LockStripes
+from src.accounts_registry import AccountsRegistry
+from src.account_indexes import default_indexes
+from src.personal_account import PersonalAccount
+from src.transfers import (
+    transfer, debit, debit_once, credit_once, cancel_credit, refund_once, TransferLegs,
+    InsufficientFundsError, TransferCancelledError,
+)
+
+
+def funded(pesel, balance):
+    account = PersonalAccount("Test", "User", pesel)
+    account.balance = balance
+    return account
+
+
+class TestLockStripes:
+    def test_shared_stripe_is_taken_once(self):
+        locks = LockStripes(stripes=1)
+        first, second = funded("11111111111", 0.0), funded("22222222222", 0.0)
+
+        with locks.hold(first, second):
+            assert locks.stripe(first) == locks.stripe(second) == 0
+        assert len(locks) == 1
+
+        with locks.hold(first):
+            pass
+
+    def test_stripes_are_released_after_errors(self):
+        locks = LockStripes(stripes=4)
+        account = funded("11111111111", 0.0)
+
+        with pytest.raises(RuntimeError):
+            with locks.hold(account):
+                raise RuntimeError("boom")
+
+        assert locks._locks[locks.stripe(account)].acquire(blocking=False)
+
+    def test_balance_is_the_accounts_own(self):
+        assert LockStripes().balance(funded("11111111111", 12.5)) == 12.5
+
+    def test_opposite_lock_orders_do_not_deadlock(self):
+        locks = LockStripes(stripes=2)
+        first, second = funded("11111111111", 0.0), funded("22222222222", 0.0)
+        done = []
+
+        def hammer(a, b):
+            for _ in range(2000):
+                with locks.hold(a, b):
+                    pass
+            done.append(True)
+
+        threads = [threading.Thread(target=hammer, args=pair) for pair in ((first, second), (second, first))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        assert done == [True, True]
+
+
+class TestAtomicTransfer:
+    @pytest.fixture
+    def locks(self):
+        return LockStripes()
+
+    def test_standard_transfer(self, locks):
+        sender, recipient = funded("11111111111", 100.0), funded("22222222222", 0.0)
+
+        transfer(sender, recipient, 40.0, locks)
+
+        assert (sender.balance, recipient.balance) == (60.0, 40.0)
+
+    def test_express_transfer_pays_fee(self, locks):
+        sender, recipient = funded("11111111111", 100.0), funded("22222222222", 0.0)
+
+        transfer(sender, recipient, 99.0, locks, express=True)
+
+        assert (sender.balance, recipient.balance) == (0.0, 99.0)
+
+    @pytest.mark.parametrize("amount, express", [(100.0, False), (99.5, True)])
+    def test_insufficient_funds_change_nothing(self, locks, amount, express):
+        sender, recipient = funded("11111111111", 100.0), funded("22222222222", 0.0)
+
+        with pytest.raises(InsufficientFundsError):
+            transfer(sender, recipient, amount, locks, express=express)
+
+        assert (sender.balance, recipient.balance) == (100.0, 0.0)
+
+    def test_amount_must_be_positive(self, locks):
+        with pytest.raises(ValueError, match="greater than 0"):
+            transfer(funded("11111111111", 100.0), funded("22222222222", 0.0), 0, locks)
+
+
+class TestDebit:
+    @pytest.mark.parametrize("express, debited, balance", [(False, 40.0, 60.0), (True, 41.0, 59.0)])
+    def test_debit_returns_total_taken(self, express, debited, balance):
+        account = funded("11111111111", 100.0)
+
+        assert debit(account, 40.0, LockStripes(), express=express) == debited
+        assert account.balance == balance
+
+    def test_insufficient_funds_change_nothing(self):
+        account = funded("11111111111", 100.0)
+
+        with pytest.raises(InsufficientFundsError):
+            debit(account, 100.0, LockStripes())
+
+        assert account.balance == 100.0
+
+
+class TestTransferLegs:
+    @pytest.fixture
+    def legs(self):
+        return TransferLegs()
+
+    def test_debit_is_taken_once(self, legs):
+        account = funded("11111111111", 100.0)
+
+        assert debit_once(account, 40.0, LockStripes(), "t1", legs, express=True) == (41.0, True)
+        assert debit_once(account, 40.0, LockStripes(), "t1", legs, express=True) == (41.0, False)
+        assert account.balance == 59.0
+
+    def test_credit_is_applied_once(self, legs):
+        account = funded("11111111111", 0.0)
+
+        assert credit_once(account, 40.0, LockStripes(), "t1", legs)
+        assert not credit_once(account, 40.0, LockStripes(), "t1", legs)
+        assert account.balance == 40.0
+        assert not cancel_credit(account, LockStripes(), "t1", legs)
+
+    def test_cancelled_credit_is_never_applied(self, legs):
+        account = funded("11111111111", 0.0)
+
+        assert cancel_credit(account, LockStripes(), "t1", legs)
+        assert cancel_credit(account, LockStripes(), "t1", legs)
+        with pytest.raises(TransferCancelledError):
+            credit_once(account, 40.0, LockStripes(), "t1", legs)
+        assert account.balance == 0.0
+
+    def test_refund_gives_back_the_debit_once_and_is_no_deposit(self, legs):
+        account = funded("11111111111", 100.0)
+        account.incoming_transfer(10.0)
+        debit_once(account, 40.0, LockStripes(), "t1", legs, express=True)
+
+        assert refund_once(account, LockStripes(), "t1", legs) == (41.0, True)
+        assert refund_once(account, LockStripes(), "t1", legs) == (41.0, False)
+        assert account.balance == 110.0
+        assert account.history.deposit_run == 0
+        assert list(account.history) == ["10.0", "-40.0", "-1"]
+
+    def test_refund_before_the_debit_cancels_it(self, legs):
+        account = funded("11111111111", 100.0)
+
+        assert refund_once(account, LockStripes(), "t1", legs) == (0.0, True)
+        with pytest.raises(TransferCancelledError):
+            debit_once(account, 40.0, LockStripes(), "t1", legs)
+        assert account.balance == 100.0
+
+    def test_only_the_most_recent_legs_are_kept(self):
+        legs = TransferLegs(capacity=2)
+        for transfer_id in ("t1", "t2", "t3"):
+            legs.record(transfer_id, "debit", 1.0)
+
+        assert len(legs) == 2
+        assert legs.outcome("t1", "debit") is None
+        assert legs.outcome("t3", "debit") == 1.0
+
+
+class TestConcurrentTransfers:
+    ACCOUNTS = 20
+    THREADS = 8
+    TRANSFERS_PER_THREAD = 1500
+
+    def test_random_transfers_preserve_total_balance(self):
+        registry = AccountsRegistry(indexes=default_indexes())
+        for i in range(self.ACCOUNTS):
+            registry.add_account(funded(f"{i:011d}", 1000.0))
+        accounts = registry.get_all_accounts()
+        fees = []
+        errors = []
+
+        def hammer(seed):
+            rng = random.Random(seed)
+            paid = 0.0
+            try:
+                for _ in range(self.TRANSFERS_PER_THREAD):
+                    sender, recipient = rng.sample(accounts, 2)
+                    express = rng.random() < 0.2
+                    try:
+                        transfer(sender, recipient, float(rng.randint(1, 300)), registry.locks, express=express)
+                        paid += sender.EXPRESS_FEE if express else 0.0
+                    except InsufficientFundsError:
+                        pass
+            except Exception as e:
+                errors.append(e)
+            fees.append(paid)
+
+        interval = sys.getswitchinterval()
+        # Switch threads often so unlocked read-modify-write races would show up
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=hammer, args=(seed,)) for seed in range(self.THREADS)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        assert errors == []
+        total = sum(account.balance for account in accounts)
+        assert total == pytest.approx(self.ACCOUNTS * 1000.0 - sum(fees))
+        assert all(account.balance >= 0 for account in accounts)
+        balances = [account.balance for account in registry.get_index("balance").range()]
+        assert balances == sorted(account.balance for account in accounts)
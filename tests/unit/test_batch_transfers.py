@@ -0,0 +1,93 @@
+import pytest
+from src.accounts_registry import AccountsRegistry
+from src.batch_transfers import execute_transfers
+from src.personal_account import PersonalAccount
+
+
+@pytest.fixture
+def registry():
+    registry = AccountsRegistry()
+    for pesel, balance in (("11111111111", 100.0), ("22222222222", 50.0), ("33333333333", 0.0)):
+        account = PersonalAccount("Test", "User", pesel)
+        account.balance = balance
+        registry.add_account(account)
+    return registry
+
+
+def balances(registry):
+    return [account.balance for account in registry.get_all_accounts()]
+
+
+def transfer(from_account, to_account, amount, **extra):
+    return {"from_account": from_account, "to_account": to_account, "amount": amount, **extra}
+
+
+class TestExecuteTransfers:
+    def test_applies_valid_batch(self, registry):
+        report = execute_transfers([
+            transfer("11111111111", "22222222222", 30),
+            transfer("22222222222", "33333333333", 10, express=True),
+            transfer("external", "33333333333", 5),
+        ], registry)
+
+        assert [result["status"] for result in report["results"]] == ["ok", "ok", "ok"]
+        assert (report["applied"], report["failed"]) == (3, 0)
+        assert balances(registry) == [70.0, 69.0, 15.0]
+        assert registry.find_account_by_pesel("22222222222").history == ["30", "-10", "-1"]
+
+    def test_later_transfers_may_spend_earlier_credits(self, registry):
+        report = execute_transfers([
+            transfer("11111111111", "33333333333", 60),
+            transfer("33333333333", "22222222222", 59),
+        ], registry)
+
+        assert report["failed"] == 0
+        assert balances(registry) == [40.0, 109.0, 1.0]
+
+    def test_running_balance_rejects_overspending(self, registry):
+        report = execute_transfers([
+            transfer("22222222222", "11111111111", 40),
+            transfer("22222222222", "11111111111", 10),
+            transfer("22222222222", "11111111111", 9, express=True),
+            transfer("22222222222", "11111111111", 1, express=True),
+        ], registry, atomic=False)
+
+        assert [result["status"] for result in report["results"]] == ["ok", "failed", "ok", "failed"]
+        assert report["results"][1]["error"] == "Insufficient funds"
+        assert balances(registry) == [149.0, 0.0, 0.0]
+
+    def test_atomic_batch_with_an_error_applies_nothing(self, registry):
+        report = execute_transfers([
+            transfer("11111111111", "22222222222", 10),
+            transfer("11111111111", "99999999999", 10),
+        ], registry)
+
+        assert report["results"] == [
+            {"status": "not_applied"},
+            {"status": "failed", "error": "One or both accounts not found"},
+        ]
+        assert report["applied"] == 0
+        assert balances(registry) == [100.0, 50.0, 0.0]
+
+    @pytest.mark.parametrize("item, error", [
+        ("not a transfer", "Transfer must be an object"),
+        ({"from_account": "11111111111", "amount": 5}, "Missing required fields: from_account, to_account, amount"),
+        (transfer(["11111111111"], "22222222222", 5), "Accounts must be given as PESEL strings"),
+        (transfer("11111111111", "22222222222", "5"), "Amount must be a number"),
+        (transfer("11111111111", "22222222222", True), "Amount must be a number"),
+        (transfer("11111111111", "22222222222", -5), "Amount must be greater than 0"),
+        (transfer("external", "99999999999", 5), "Account not found"),
+        (transfer("11111111111", "22222222222", 100), "Insufficient funds"),
+    ])
+    def test_invalid_transfers(self, registry, item, error):
+        report = execute_transfers([item], registry, atomic=False)
+
+        assert report["results"] == [{"status": "failed", "error": error}]
+        assert balances(registry) == [100.0, 50.0, 0.0]
+
+    def test_each_pesel_is_looked_up_once(self, registry, mocker):
+        find = mocker.spy(registry, "find_account_by_pesel")
+
+        execute_transfers([transfer("11111111111", "22222222222", 1)] * 10, registry)
+
+        assert find.call_count == 2
@@ -15,7 +15,7 @@ class TestCompanyAccount:
             mock_response.json.return_value = {
                 'result': {'subject': {'statusVat': 'Czynny'}}
             }
-            mocker.patch('src.company_account.requests.get', return_value=mock_response)
+            mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         account = CompanyAccount(company_name, nip)
         assert account.company_name == company_name
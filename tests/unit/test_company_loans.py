@@ -24,7 +24,7 @@ class TestCompanyLoans:
         mock_response.status_code = 200
         mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
         
-        with patch('src.company_account.requests.get', return_value=mock_response):
+        with patch('src.mf_client.requests.Session.get', return_value=mock_response):
             account = CompanyAccount("TechCorp", "1234567890")
             account.balance = balance
             
@@ -40,7 +40,7 @@ class TestCompanyLoans:
         mock_response.status_code = 200
         mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
         
-        with patch('src.company_account.requests.get', return_value=mock_response):
+        with patch('src.mf_client.requests.Session.get', return_value=mock_response):
             account = CompanyAccount("TechCorp", "1234567890")
             account.balance = 3000.0
             
@@ -59,7 +59,7 @@ class TestCompanyLoans:
         mock_response.status_code = 200
         mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
         
-        with patch('src.company_account.requests.get', return_value=mock_response):
+        with patch('src.mf_client.requests.Session.get', return_value=mock_response):
             account = CompanyAccount("TechCorp", "1234567890")
             account.balance = 2000.0
             
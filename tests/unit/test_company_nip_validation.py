@@ -5,7 +5,7 @@ from src.company_account import CompanyAccount
 class TestCompanyAccountNIPValidation:
     
     def test_invalid_nip_length_does_not_call_mf_api(self, mocker):
-        mock_get = mocker.patch('src.company_account.requests.get')
+        mock_get = mocker.patch('src.mf_client.requests.Session.get')
         
         account = CompanyAccount("TestCorp", "123")
         
@@ -22,7 +22,7 @@ class TestCompanyAccountNIPValidation:
                 }
             }
         }
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         account = CompanyAccount("TestCorp", "8461627563")
         assert account.nip == "8461627563"
@@ -38,7 +38,7 @@ class TestCompanyAccountNIPValidation:
             }
         }
         
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         account = CompanyAccount("TestCorp", "8461627563")
         assert account.nip == "8461627563"
@@ -54,7 +54,7 @@ class TestCompanyAccountNIPValidation:
             }
         }
         
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         with pytest.raises(ValueError, match="Company not registered!!"):
             CompanyAccount("TestCorp", "8461627563")
@@ -64,7 +64,7 @@ class TestCompanyAccountNIPValidation:
         mock_response.status_code = 200
         mock_response.json.return_value = {'result': {}}
         
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         with pytest.raises(ValueError, match="Company not registered!!"):
             CompanyAccount("TestCorp", "8461627563")
@@ -73,13 +73,13 @@ class TestCompanyAccountNIPValidation:
         mock_response = mocker.MagicMock()
         mock_response.status_code = 404
         
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         with pytest.raises(ValueError, match="Company not registered!!"):
             CompanyAccount("TestCorp", "8461627563")
     
     def test_nip_validation_failure_network_error(self, mocker):
-        mocker.patch('src.company_account.requests.get', side_effect=ConnectionError("Network error"))
+        mocker.patch('src.mf_client.requests.Session.get', side_effect=ConnectionError("Network error"))
         
         with pytest.raises(ValueError, match="Company not registered!!"):
             CompanyAccount("TestCorp", "8461627563")
@@ -94,7 +94,7 @@ class TestCompanyAccountNIPValidation:
                 }
             }
         }
-        mock_get = mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mock_get = mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         account = CompanyAccount("TestCorp", "8461627563")
         
@@ -112,7 +112,7 @@ class TestCompanyAccountNIPValidation:
                 }
             }
         }
-        mock_get = mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mock_get = mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         CompanyAccount("TestCorp", "8461627563")
         
@@ -136,7 +136,7 @@ class TestCompanyAccountBasic:
             }
         }
         
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         account = CompanyAccount("TechCorp", "1234567890")
         assert account.company_name == "TechCorp"
@@ -159,7 +159,7 @@ class TestCompanyAccountBasic:
                 }
             }
         }
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         with pytest.raises(ValueError) as exc_info:
             CompanyAccount("FakeCorp", "9999999999")
@@ -167,7 +167,7 @@ class TestCompanyAccountBasic:
         assert "Company not registered!!" in str(exc_info.value)
     
     def test_constructor_raises_value_error_on_network_error(self, mocker):
-        mocker.patch('src.company_account.requests.get', side_effect=ConnectionError("Network unavailable"))
+        mocker.patch('src.mf_client.requests.Session.get', side_effect=ConnectionError("Network unavailable"))
         
         with pytest.raises(ValueError) as exc_info:
             CompanyAccount("TestCorp", "8461627563")
@@ -177,7 +177,7 @@ class TestCompanyAccountBasic:
     def test_constructor_raises_value_error_on_api_error(self, mocker):
         mock_response = mocker.MagicMock()
         mock_response.status_code = 500
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         with pytest.raises(ValueError) as exc_info:
             CompanyAccount("TestCorp", "8461627563")
@@ -0,0 +1,115 @@
+import threading
+import time
+import pytest
+from src.accounts_registry import AccountsRegistry
+from src.company_account import CompanyAccount
+from src.company_onboarding import validate_nips, onboard_companies
+
+
+class TestValidateNips:
+    def test_each_distinct_nip_validated_once(self, mocker):
+        validate = mocker.Mock(side_effect=lambda nip: nip.startswith("1"))
+
+        result = validate_nips(["1111111111", "2222222222", "1111111111"], validate)
+
+        assert result == {"1111111111": True, "2222222222": False}
+        assert validate.call_count == 2
+
+    def test_validations_run_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def validate(nip):
+            barrier.wait()
+            return True
+
+        result = validate_nips(["1111111111", "2222222222", "3333333333"], validate, max_workers=3)
+
+        assert all(result.values())
+
+    def test_empty_batch(self, mocker):
+        validate = mocker.Mock()
+
+        assert validate_nips([], validate) == {}
+        validate.assert_not_called()
+
+    def test_defaults_to_mf_validation(self, mocker):
+        mock_response = mocker.MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
+
+        assert validate_nips(["1234567890"]) == {"1234567890": True}
+
+
+class TestOnboardCompanies:
+    @pytest.fixture
+    def registry(self):
+        return AccountsRegistry()
+
+    def test_reports_per_company_outcomes(self, registry, mocker):
+        existing = CompanyAccount.from_dict({"company_name": "Old", "nip": "5555555555", "balance": 0.0, "history": []})
+        registry.add_account(existing)
+        validate = mocker.Mock(side_effect=lambda nip: nip != "2222222222")
+
+        report = onboard_companies([
+            {"name": "TechCorp", "nip": "1111111111"},
+            {"name": "FakeCorp", "nip": "2222222222"},
+            {"name": "Short", "nip": "123"},
+            {"name": "Old again", "nip": "5555555555"},
+            {"name": "TechCorp copy", "nip": "1111111111"},
+            {"name": "No nip"},
+            {"nip": "3333333333"},
+            {"name": None, "nip": "4444444444"},
+        ], registry, validate=validate)
+
+        assert [result["status"] for result in report["results"]] == [
+            "created", "rejected", "invalid", "exists", "duplicate", "invalid", "invalid", "invalid",
+        ]
+        assert report["results"][6] == {"nip": "3333333333", "status": "invalid",
+                                        "error": "Company name must be a string"}
+        assert report["created"] == 1
+        assert report["elapsed"] >= 0
+        assert validate.call_count == 2
+
+        created = registry.find_account_by_nip("1111111111")
+        assert created.company_name == "TechCorp"
+        assert created.balance == 0.0
+        assert registry.get_accounts_count() == 2
+
+    def test_batch_wall_time_reflects_concurrency(self, registry):
+        def slow_validate(nip):
+            time.sleep(0.05)
+            return True
+
+        companies = [{"name": f"Corp {i}", "nip": f"{i:010d}"} for i in range(8)]
+        report = onboard_companies(companies, registry, validate=slow_validate, max_workers=8)
+
+        assert report["created"] == 8
+        assert report["elapsed"] < 0.05 * 8
+
+    def test_nip_created_during_validation_is_reported_as_existing(self, registry):
+        def validate(nip):
+            # A concurrent request registers the NIP while it is being validated
+            registry.add_account(CompanyAccount.from_dict(
+                {"company_name": "Racer", "nip": "1111111111", "balance": 0.0, "history": []}))
+            return True
+
+        report = onboard_companies([{"name": "TechCorp", "nip": "1111111111"}], registry, validate=validate)
+
+        assert report["results"] == [
+            {"nip": "1111111111", "status": "exists", "error": "Account with this NIP already exists"},
+        ]
+        assert report["created"] == 0
+        assert registry.find_account_by_nip("1111111111").company_name == "Racer"
+        assert registry.get_accounts_count() == 1
+
+    def test_known_results_are_not_validated_again(self, registry, mocker):
+        validate = mocker.Mock(return_value=True)
+
+        report = onboard_companies([
+            {"name": "Down", "nip": "1111111111"},
+            {"name": "TechCorp", "nip": "2222222222"},
+        ], registry, validate=validate, validated={"1111111111": False})
+
+        assert [result["status"] for result in report["results"]] == ["rejected", "created"]
+        validate.assert_called_once_with("2222222222")
@@ -1,6 +1,7 @@
 import pytest
 from datetime import datetime
 from unittest.mock import patch, MagicMock
+from src.account import Account
 from src.personal_account import PersonalAccount
 from src.company_account import CompanyAccount
 
@@ -42,6 +43,16 @@ class TestPersonalAccountEmailHistory:
         
         assert result == True
     
+    def test_send_time_is_reported_to_metrics_hook(self, mocker):
+        mock_smtp = mocker.patch('src.personal_account.SMTPClient')
+        mock_smtp.return_value.send.return_value = False
+        hook = mocker.patch.object(Account, "email_metrics_hook")
+        
+        PersonalAccount("Bob", "Jones", "11122233344").send_history_via_email("fail@test.com")
+        
+        elapsed, sent = hook.call_args[0]
+        assert elapsed >= 0 and sent is False
+    
     def test_send_history_returns_false_on_failure(self, mocker):
         mock_smtp = mocker.patch('src.personal_account.SMTPClient')
         mock_instance = mock_smtp.return_value
@@ -74,7 +85,7 @@ class TestCompanyAccountEmailHistory:
         mock_response = mocker.MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         mock_smtp = mocker.patch('src.company_account.SMTPClient')
         mock_instance = mock_smtp.return_value
@@ -102,7 +113,7 @@ class TestCompanyAccountEmailHistory:
         mock_response = mocker.MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         mock_smtp = mocker.patch('src.company_account.SMTPClient')
         mock_instance = mock_smtp.return_value
@@ -119,7 +130,7 @@ class TestCompanyAccountEmailHistory:
         mock_response = mocker.MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         mock_smtp = mocker.patch('src.company_account.SMTPClient')
         mock_instance = mock_smtp.return_value
@@ -136,7 +147,7 @@ class TestCompanyAccountEmailHistory:
         mock_response = mocker.MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         mock_smtp = mocker.patch('src.company_account.SMTPClient')
         mock_instance = mock_smtp.return_value
@@ -154,7 +165,7 @@ class TestCompanyAccountEmailHistory:
         mock_response = mocker.MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
-        mocker.patch('src.company_account.requests.get', return_value=mock_response)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
         
         mock_smtp = mocker.patch('src.company_account.SMTPClient')
         mock_instance = mock_smtp.return_value
@@ -30,7 +30,7 @@ class TestTransfers:
             mock_response = MagicMock()
             mock_response.status_code = 200
             mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
-            with patch('src.company_account.requests.get', return_value=mock_response):
+            with patch('src.mf_client.requests.Session.get', return_value=mock_response):
                 account = CompanyAccount("firmex", "1234567890")
         
         account.balance = initial_balance
@@ -45,7 +45,7 @@ class TestTransfers:
             mock_response = MagicMock()
             mock_response.status_code = 200
             mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
-            with patch('src.company_account.requests.get', return_value=mock_response):
+            with patch('src.mf_client.requests.Session.get', return_value=mock_response):
                 account = CompanyAccount("firmex", "1234567890")
         
         account.balance = 100.0
@@ -0,0 +1,280 @@
+import json
+import os
+import threading
+import pytest
+from src.accounts_registry import AccountsRegistry
+from src.company_account import CompanyAccount
+from src.personal_account import PersonalAccount
+from src.journal import Journal, apply_record, _last_journal_seq
+
+
+def company_dict(nip="8461627563"):
+    return {"type": "company", "company_name": "TechCorp", "nip": nip, "balance": 0.0, "history": []}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = Journal(str(tmp_path), commit_interval=0.001)
+    yield journal
+    journal.close()
+
+
+def reopen(tmp_path):
+    registry = AccountsRegistry()
+    journal = Journal(str(tmp_path), commit_interval=0.001)
+    replayed = journal.recover(registry)
+    return journal, registry, replayed
+
+
+class TestJournal:
+    def test_append_assigns_sequence_and_becomes_durable(self, journal):
+        first = journal.append({"op": "delete", "key": ["pesel", "12345678901"]})
+        second = journal.append({"op": "delete", "key": ["pesel", "98765432109"]})
+
+        assert (first, second) == (1, 2)
+        assert journal.wait_durable(second, timeout=5)
+        with open(journal.journal_path, "rb") as log:
+            assert [json.loads(line)["seq"] for line in log] == [1, 2]
+
+    def test_appends_do_not_wait_for_fsync(self, journal, mocker):
+        fsync_started = threading.Event()
+        release = threading.Event()
+
+        def slow_fsync(fd):
+            fsync_started.set()
+            release.wait(5)
+        mocker.patch("src.journal.os.fsync", side_effect=slow_fsync)
+        first = journal.append({"op": "delete", "key": ["pesel", "12345678901"]})
+        assert fsync_started.wait(5)
+
+        second = journal.append({"op": "delete", "key": ["pesel", "98765432109"]})
+        assert not journal.wait_durable(first, timeout=0.01)
+        release.set()
+
+        assert second == 2
+        assert journal.wait_durable(second, timeout=5)
+
+    def test_snapshot_in_background_runs_one_at_a_time(self, journal, mocker):
+        release = threading.Event()
+        registry = mocker.Mock(storage_backed=False)
+        type(registry).accounts = mocker.PropertyMock(side_effect=lambda: release.wait(5) and [])
+
+        assert journal.snapshot_in_background(registry)
+        assert not journal.snapshot_in_background(registry)
+        release.set()
+        journal._snapshot_thread.join(5)
+
+        assert journal.snapshot_in_background(registry)
+
+    def test_failed_snapshot_leaves_journal_usable(self, journal, mocker):
+        registry = mocker.Mock(storage_backed=False)
+        type(registry).accounts = mocker.PropertyMock(side_effect=RuntimeError("registry unavailable"))
+
+        with pytest.raises(RuntimeError):
+            journal.write_snapshot(registry)
+
+        assert journal.wait_durable(journal.append({"op": "delete", "key": ["pesel", "12345678901"]}), timeout=5)
+
+    def test_recover_replays_all_operations(self, journal, tmp_path):
+        account = PersonalAccount("John", "Doe", "12345678901")
+        journal.append({"op": "create", "account": account.to_dict()})
+        journal.append({"op": "create", "account": company_dict()})
+        journal.append({"op": "create", "account": PersonalAccount("Jane", "Roe", "98765432109").to_dict()})
+        journal.append({"op": "transfer", "key": ["pesel", "12345678901"], "kind": "incoming", "amount": 500})
+        journal.append({"op": "transfer", "key": ["pesel", "12345678901"], "kind": "outgoing", "amount": 100})
+        journal.append({"op": "transfer", "key": ["pesel", "12345678901"], "kind": "express", "amount": 50})
+        journal.append({"op": "transfer", "key": ["nip", "8461627563"], "kind": "incoming", "amount": 20})
+        journal.append({"op": "patch", "key": ["pesel", "12345678901"], "first_name": "Johnny", "last_name": "Dee"})
+        journal.append({"op": "delete", "key": ["pesel", "98765432109"]})
+        journal.close()
+
+        recovered, registry, replayed = reopen(tmp_path)
+        recovered.close()
+
+        assert replayed == 9
+        assert registry.get_accounts_count() == 2
+        person = registry.find_account_by_pesel("12345678901")
+        assert (person.first_name, person.last_name, person.balance) == ("Johnny", "Dee", 349.0)
+        assert person.history == ["500", "-100", "-50", "-1"]
+        company = registry.find_account_by_nip("8461627563")
+        assert isinstance(company, CompanyAccount)
+        assert company.balance == 20
+
+    def test_patch_may_change_only_some_fields(self):
+        registry = AccountsRegistry()
+        registry.add_account(PersonalAccount("John", "Doe", "12345678901"))
+
+        apply_record(registry, {"op": "patch", "key": ["pesel", "12345678901"]})
+
+        account = registry.find_account_by_pesel("12345678901")
+        assert (account.first_name, account.last_name) == ("John", "Doe")
+
+    def test_refund_is_replayed_without_counting_as_a_deposit(self):
+        registry = AccountsRegistry()
+        registry.add_account(PersonalAccount("John", "Doe", "12345678901"))
+
+        apply_record(registry, {"op": "transfer", "key": ["pesel", "12345678901"], "kind": "refund", "amount": 41.0})
+
+        account = registry.find_account_by_pesel("12345678901")
+        assert (account.balance, len(account.history)) == (41.0, 0)
+
+    def test_snapshot_truncates_journal_and_recovery_skips_covered_records(self, journal, tmp_path):
+        registry = AccountsRegistry()
+        account = PersonalAccount("John", "Doe", "12345678901")
+        registry.add_account(account)
+        journal.append({"op": "create", "account": account.to_dict()})
+        account.incoming_transfer(100)
+        seq = journal.append({"op": "transfer", "key": ["pesel", "12345678901"], "kind": "incoming", "amount": 100})
+
+        assert journal.wait_durable(seq, timeout=5)
+
+        assert journal.write_snapshot(registry) == seq
+        assert open(journal.journal_path, "rb").read() == b""
+        assert not os.path.exists(journal.previous_journal_path)
+        journal.append({"op": "transfer", "key": ["pesel", "12345678901"], "kind": "incoming", "amount": 5})
+        journal.close()
+
+        recovered, registry, replayed = reopen(tmp_path)
+        recovered.close()
+
+        assert replayed == 1
+        assert registry.find_account_by_pesel("12345678901").balance == 105
+
+    def test_snapshot_accounts_are_recovered_as_stored(self, journal, tmp_path, mocker):
+        registry = AccountsRegistry()
+        registry.add_account(PersonalAccount("John", "Doe", "12345678901"))
+        registry.add_account(PersonalAccount("Jane", "Roe", "98765432109"))
+        journal.write_snapshot(registry)
+        journal.append({"op": "transfer", "key": ["pesel", "12345678901"], "kind": "incoming", "amount": 5})
+        journal.close()
+        restored = AccountsRegistry()
+        observer = mocker.Mock()
+        restored.add_observer(observer)
+
+        recovered = Journal(str(tmp_path))
+        recovered.recover(restored)
+        recovered.close()
+
+        # Only the replayed tail is passed on, e.g. to write-behind
+        assert observer.account_changed.call_args_list == [mocker.call(restored.find_account_by_pesel("12345678901"))]
+
+    def test_storage_backed_snapshot_holds_the_hot_set(self, journal, tmp_path, mocker):
+        hot = PersonalAccount("John", "Doe", "12345678901")
+        registry = mocker.Mock(storage_backed=True, accounts=[hot])
+
+        journal.write_snapshot(registry)
+
+        registry.flush.assert_called_once_with()
+        registry.get_all_accounts.assert_not_called()
+        with open(journal.snapshot_path, "rb") as snapshot:
+            assert [json.loads(line).get("pesel") for line in snapshot][1:] == ["12345678901"]
+
+    def test_commits_continue_while_the_snapshot_is_written(self, journal, mocker):
+        registry = AccountsRegistry()
+        registry.add_account(PersonalAccount("John", "Doe", "12345678901"))
+        writing, release = threading.Event(), threading.Event()
+        replace = os.replace
+
+        def slow_replace(source, target):
+            if target == journal.snapshot_path:
+                writing.set()
+                release.wait(5)
+            replace(source, target)
+        mocker.patch("src.journal.os.replace", side_effect=slow_replace)
+        journal.snapshot_in_background(registry)
+        assert writing.wait(5)
+
+        seq = journal.append({"op": "delete", "key": ["pesel", "12345678901"]})
+
+        assert journal.wait_durable(seq, timeout=5)
+        release.set()
+        journal._snapshot_thread.join(5)
+
+    def test_unfinished_snapshots_lose_no_records(self, journal, tmp_path, mocker):
+        registry = AccountsRegistry()
+        account = PersonalAccount("John", "Doe", "12345678901")
+        registry.add_account(account)
+        journal.append({"op": "create", "account": account.to_dict()})
+        replace = os.replace
+
+        def failing_replace(source, target):
+            if target == journal.snapshot_path:
+                raise OSError("disk full")
+            replace(source, target)
+        failing = mocker.patch("src.journal.os.replace", side_effect=failing_replace)
+
+        for amount in (10, 20):
+            seq = journal.append({"op": "transfer", "key": ["pesel", "12345678901"], "kind": "incoming",
+                                  "amount": amount})
+            assert journal.wait_durable(seq, timeout=5)
+            with pytest.raises(OSError):
+                journal.write_snapshot(registry)
+        journal.append({"op": "transfer", "key": ["pesel", "12345678901"], "kind": "incoming", "amount": 5})
+        journal.close()
+        failing.stop()
+
+        recovered, registry, replayed = reopen(tmp_path)
+        recovered.close()
+
+        assert replayed == 4
+        assert registry.find_account_by_pesel("12345678901").balance == 35
+
+    def test_records_left_from_before_a_snapshot_are_not_replayed_twice(self, journal, tmp_path):
+        registry = AccountsRegistry()
+        account = PersonalAccount("John", "Doe", "12345678901")
+        registry.add_account(account)
+        journal.append({"op": "create", "account": account.to_dict()})
+        journal.close()
+        stale_journal = open(journal.journal_path, "rb").read()
+        journal = Journal(str(tmp_path))
+        journal.write_snapshot(registry)
+        journal.close()
+        # Simulate a crash between writing the snapshot and truncating the journal
+        with open(journal.journal_path, "wb") as log:
+            log.write(stale_journal)
+
+        recovered, registry, replayed = reopen(tmp_path)
+
+        assert replayed == 0
+        assert registry.get_accounts_count() == 1
+        assert recovered.append({"op": "delete", "key": ["pesel", "12345678901"]}) == 2
+        recovered.close()
+
+    def test_torn_tail_is_discarded_and_overwritten(self, journal, tmp_path):
+        journal.append({"op": "create", "account": company_dict()})
+        journal.close()
+        with open(journal.journal_path, "ab") as log:
+            log.write(b'{"seq":2,"op":"cre')
+
+        recovered, registry, replayed = reopen(tmp_path)
+        assert replayed == 1
+        assert recovered.append({"op": "delete", "key": ["nip", "8461627563"]}) == 2
+        recovered.close()
+
+        recovered, registry, replayed = reopen(tmp_path)
+        recovered.close()
+        assert replayed == 2
+        assert registry.get_accounts_count() == 0
+
+    def test_needs_snapshot_after_configured_number_of_records(self, tmp_path):
+        journal = Journal(str(tmp_path), snapshot_every=2)
+        journal.append({"op": "delete", "key": ["pesel", "1"]})
+        assert not journal.needs_snapshot
+        journal.append({"op": "delete", "key": ["pesel", "2"]})
+        assert journal.needs_snapshot
+        journal.close()
+
+
+class TestLastJournalSeq:
+    def test_missing_file(self, tmp_path):
+        assert _last_journal_seq(str(tmp_path / "missing.log")) == 0
+
+    def test_file_without_complete_records(self, tmp_path):
+        path = tmp_path / "journal.log"
+        path.write_bytes(b'{"seq":1,"op"')
+        assert _last_journal_seq(str(path)) == 0
+
+    def test_record_longer_than_read_chunk(self, tmp_path):
+        path = tmp_path / "journal.log"
+        path.write_bytes(b'{"seq":1}\n{"seq":7,"padding":"' + b"x" * 10000 + b'"}\n12\n')
+        assert _last_journal_seq(str(path)) == 7
@@ -0,0 +1,122 @@
+import random
+import pytest
+from src.personal_account import PersonalAccount
+from src.company_account import CompanyAccount
+
+
+def reference_last_three_are_deposits(history):
+    return len(history) >= 3 and all(float(x) > 0 for x in history[-3:])
+
+
+def reference_sum_of_last_five_exceeds_amount(history, amount):
+    return len(history) >= 5 and sum(float(x) for x in history[-5:]) > amount
+
+
+def reference_has_zus_transfer(history):
+    return "-1775.0" in history
+
+
+def apply_random_operations(account, rng, steps):
+    for _ in range(steps):
+        operation = rng.choice(["incoming", "outgoing", "express", "zus", "integer zus", "legacy"])
+        amount = rng.choice([rng.randint(1, 500), round(rng.uniform(0.01, 500.0), 2)])
+        if operation == "incoming":
+            account.incoming_transfer(amount)
+        elif operation == "outgoing":
+            account.outgoing_transfer(amount)
+        elif operation == "express":
+            account.express_outgoing(amount)
+        elif operation == "zus":
+            account.balance += 1775.0
+            account.outgoing_transfer(1775.0)
+        elif operation == "integer zus":
+            account.balance += 1775
+            account.outgoing_transfer(1775)
+        else:
+            account.history.append(rng.choice(["100", "-50", "0.5", "-1775.0", "-1775"]))
+
+
+class TestLoanAggregatesMatchReferenceRules:
+    """Randomized check that the O(1) aggregates agree with the original history scans."""
+
+    @pytest.mark.parametrize("seed", range(50))
+    def test_personal_account(self, seed):
+        rng = random.Random(seed)
+        account = PersonalAccount("Alice", "Johnson", "12345678901")
+        account.balance = 1000.0
+
+        for _ in range(20):
+            apply_random_operations(account, rng, rng.randint(0, 6))
+            history = list(account.history)
+            amount = rng.uniform(-100.0, 1500.0)
+
+            assert account._last_three_are_deposits() == reference_last_three_are_deposits(history)
+            assert account._sum_of_last_five_exceeds_amount(amount) == \
+                reference_sum_of_last_five_exceeds_amount(history, amount)
+
+    @pytest.mark.parametrize("seed", range(50))
+    def test_company_account(self, seed, mocker):
+        mock_response = mocker.MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
+        rng = random.Random(seed)
+        account = CompanyAccount("TechCorp", "1234567890")
+        account.balance = 1000.0
+
+        for _ in range(20):
+            apply_random_operations(account, rng, rng.randint(0, 6))
+
+            assert account._has_zus_transfer() == reference_has_zus_transfer(list(account.history))
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_aggregates_rebuilt_when_history_is_assigned(self, seed):
+        rng = random.Random(seed)
+        source = PersonalAccount("Alice", "Johnson", "12345678901")
+        source.balance = 1000.0
+        apply_random_operations(source, rng, 30)
+
+        account = PersonalAccount("Bob", "Smith", "98765432109")
+        account.history = list(source.history)
+
+        assert account._last_three_are_deposits() == source._last_three_are_deposits()
+        assert account._sum_of_last_five_exceeds_amount(100.0) == source._sum_of_last_five_exceeds_amount(100.0)
+
+
+class TestAggregateCounters:
+    def test_deposit_run_resets_on_outgoing(self):
+        account = PersonalAccount("Alice", "Johnson", "12345678901")
+        account.incoming_transfer(10.0)
+        account.incoming_transfer(10.0)
+        assert account.history.deposit_run == 2
+
+        account.outgoing_transfer(5.0)
+        assert account.history.deposit_run == 0
+
+    def test_tracked_count_and_clear(self, mocker):
+        mock_response = mocker.MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
+        account = CompanyAccount("TechCorp", "1234567890")
+        account.history = ["-1775.0", "100", "-1775.0"]
+
+        assert account.history.tracked_count == 2
+
+        account.history.clear()
+        assert account.history.tracked_count == 0
+        assert account.history.deposit_run == 0
+
+    def test_integer_zus_payment_does_not_count(self, mocker):
+        # As with the original `"-1775.0" in history` rule, "-1775" is not a ZUS payment
+        mock_response = mocker.MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
+        mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
+        account = CompanyAccount("TechCorp", "1234567890")
+        account.balance = 5000
+        account.outgoing_transfer(1775)
+
+        assert list(account.history) == ["-1775"]
+        assert account._has_zus_transfer() is False
+        assert account.take_loan(100.0) is False
@@ -0,0 +1,111 @@
+import threading
+import pytest
+from src.metrics import LatencyHistogram, Metrics
+
+
+class TestLatencyHistogram:
+    @pytest.mark.parametrize("ns", [1, 1500, 2047, 12_345, 999_999, 3_000_000_000, 60 * 10**9])
+    def test_value_falls_inside_its_bucket(self, ns):
+        index = LatencyHistogram.bucket(ns)
+
+        assert ns < LatencyHistogram.upper_bound(index)
+        assert index == 0 or ns >= LatencyHistogram.upper_bound(index - 1)
+
+    def test_buckets_are_within_a_quarter_of_the_value(self):
+        for index in range(1, LatencyHistogram.BUCKETS - 1):
+            lower, upper = LatencyHistogram.upper_bound(index - 1), LatencyHistogram.upper_bound(index)
+            assert (upper - lower) / lower <= 0.25
+
+    def test_out_of_range_values(self):
+        assert LatencyHistogram.bucket(0) == 0
+        assert LatencyHistogram.bucket(10**12) == LatencyHistogram.BUCKETS - 1
+        assert LatencyHistogram.upper_bound(LatencyHistogram.BUCKETS - 1) == float("inf")
+
+    def test_record_and_percentiles(self):
+        histogram = LatencyHistogram()
+        assert histogram.percentile(50) == 0.0
+        for ns in [10_000] * 90 + [1_000_000] * 10:
+            histogram.record(ns)
+
+        counts, count, sum_ns = histogram.snapshot()
+
+        assert (count, sum_ns, sum(counts)) == (100, 10_900_000, 100)
+        assert histogram.percentile(50) == LatencyHistogram.upper_bound(LatencyHistogram.bucket(10_000))
+        assert histogram.percentile(99) == LatencyHistogram.upper_bound(LatencyHistogram.bucket(1_000_000))
+        assert histogram.percentile(0) == histogram.percentile(50)
+
+    def test_concurrent_records_are_not_lost(self):
+        histogram = LatencyHistogram()
+
+        def record():
+            for ns in range(10_000):
+                histogram.record(ns)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert histogram.snapshot()[1] == 40_000
+
+
+class TestMetrics:
+    def test_requests_are_counted_by_status_and_timed_by_route(self):
+        metrics = Metrics()
+        metrics.observe_request("GET", "/api/accounts/<pesel>", 200, 50_000)
+        metrics.observe_request("GET", "/api/accounts/<pesel>", 404, 30_000)
+
+        text = metrics.render()
+
+        assert 'bank_app_requests_total{method="GET",route="/api/accounts/<pesel>",status="200"} 1' in text
+        assert 'bank_app_requests_total{method="GET",route="/api/accounts/<pesel>",status="404"} 1' in text
+        assert 'bank_app_request_duration_seconds_count{method="GET",route="/api/accounts/<pesel>"} 2' in text
+        assert 'bank_app_request_duration_seconds_sum{method="GET",route="/api/accounts/<pesel>"} 8e-05' in text
+        assert 'bank_app_request_duration_seconds_bucket{method="GET",route="/api/accounts/<pesel>",le="+Inf"} 2' in text
+        assert "# TYPE bank_app_request_duration_seconds histogram" in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = Metrics()
+        for ns in (2_000, 2_000_000):
+            metrics.observe_request("POST", "/api/transfer", 200, ns)
+
+        buckets = [int(line.rsplit(" ", 1)[1]) for line in metrics.render().splitlines()
+                   if line.startswith("bank_app_request_duration_seconds_bucket")]
+
+        assert len(buckets) == LatencyHistogram.BUCKETS
+        assert buckets == sorted(buckets)
+        assert (buckets[0], buckets[-1]) == (0, 2)
+
+    def test_external_calls_and_errors(self):
+        metrics = Metrics()
+        metrics.mf_call({"url": "u", "status": 200, "error": None, "attempt": 1, "elapsed": 0.2})
+        metrics.mf_call({"url": "u", "status": 503, "error": None, "attempt": 1, "elapsed": 0.1})
+        metrics.mf_call({"url": "u", "status": None, "error": "timeout", "attempt": 2, "elapsed": 3.0})
+        metrics.mongo_call("save_changes", 0.01)
+        metrics.email_sent(0.5, False)
+
+        text = metrics.render()
+
+        assert 'bank_app_external_call_duration_seconds_count{service="mf",operation="search_nip"} 3' in text
+        assert 'bank_app_external_call_errors_total{service="mf",operation="search_nip"} 2' in text
+        assert 'bank_app_external_call_errors_total{service="mongo",operation="save_changes"} 0' in text
+        assert 'bank_app_external_call_errors_total{service="smtp",operation="send"} 1' in text
+
+    def test_gauges_are_read_when_rendering(self):
+        metrics = Metrics(prefix="test")
+        size = [3]
+        metrics.gauge("registry_accounts", "Accounts held in memory.", lambda: size[0])
+        metrics.gauge("flush_seconds", "Last flush.", lambda: 0.5)
+        size[0] = 4
+
+        text = metrics.render()
+
+        assert "# TYPE test_registry_accounts gauge\ntest_registry_accounts 4\n" in text
+        assert "test_flush_seconds 0.5\n" in text
+
+    def test_label_values_are_escaped(self):
+        metrics = Metrics()
+        metrics.observe_call("mongo", 'we"ird\\op\n', 0.001)
+
+        assert 'operation="we\\"ird\\\\op\\n"' in metrics.render()
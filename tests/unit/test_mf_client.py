@@ -0,0 +1,307 @@
+import asyncio
+import threading
+import httpx
+import pytest
+from src.company_account import _LazyMFClient
+from src.mf_client import MFClient, AsyncMFClient, CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_response(mocker, status_code):
+    response = mocker.MagicMock()
+    response.status_code = status_code
+    return response
+
+
+class TestCircuitBreaker:
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def test_opens_after_threshold_failures(self, clock):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        assert breaker.allow_request() is True
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow_request() is False
+
+    def test_half_open_after_reset_timeout(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+
+        clock.now = 10
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request() is True
+
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_trial_reopens(self, clock):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now = 10
+        breaker.allow_request()
+
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow_request() is False
+
+    def test_half_open_lets_one_trial_through(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        breaker.record_success()
+        assert breaker.allow_request() is True
+
+    def test_trial_that_never_reports_is_replaced(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        breaker.allow_request()
+
+        clock.now = 19
+        assert breaker.allow_request() is False
+        clock.now = 20
+        assert breaker.allow_request() is True
+
+    def test_concurrent_callers_get_one_trial(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        barrier = threading.Barrier(8, timeout=5)
+        allowed = []
+
+        def call():
+            barrier.wait()
+            allowed.append(breaker.allow_request())
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(allowed) == [False] * 7 + [True]
+
+    def test_reset(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, clock=clock)
+        breaker.record_failure()
+        breaker.reset()
+
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestMFClient:
+    @pytest.fixture
+    def sleep(self, mocker):
+        return mocker.Mock()
+
+    @pytest.fixture
+    def events(self):
+        return []
+
+    @pytest.fixture
+    def client(self, sleep, events):
+        return MFClient(max_retries=2, backoff_factor=0.5, sleep=sleep, metrics_hook=events.append,
+                        breaker=CircuitBreaker(failure_threshold=2))
+
+    def test_get_uses_pooled_session_with_timeouts(self, mocker, client, events):
+        response = make_response(mocker, 200)
+        mock_get = mocker.patch('src.mf_client.requests.Session.get', return_value=response)
+
+        assert client.get("http://mf/api") is response
+        mock_get.assert_called_once_with("http://mf/api", timeout=(3.05, 10.0))
+        assert events[0]["status"] == 200
+        assert events[0]["attempt"] == 0
+
+    def test_client_errors_are_not_retried(self, mocker, client, sleep):
+        response = make_response(mocker, 404)
+        mock_get = mocker.patch('src.mf_client.requests.Session.get', return_value=response)
+
+        assert client.get("http://mf/api") is response
+        assert mock_get.call_count == 1
+        sleep.assert_not_called()
+
+    def test_server_errors_are_retried_with_backoff(self, mocker, client, sleep):
+        responses = [make_response(mocker, 503), make_response(mocker, 500), make_response(mocker, 200)]
+        mock_get = mocker.patch('src.mf_client.requests.Session.get', side_effect=responses)
+
+        assert client.get("http://mf/api") is responses[2]
+        assert mock_get.call_count == 3
+        assert [call.args[0] for call in sleep.call_args_list] == [0.5, 1.0]
+        assert client.breaker.state == CircuitBreaker.CLOSED
+
+    def test_returns_last_response_when_retries_exhausted(self, mocker, client):
+        response = make_response(mocker, 500)
+        mocker.patch('src.mf_client.requests.Session.get', return_value=response)
+
+        assert client.get("http://mf/api") is response
+
+    def test_raises_last_network_error(self, mocker, client, events):
+        mocker.patch('src.mf_client.requests.Session.get', side_effect=ConnectionError("down"))
+
+        with pytest.raises(ConnectionError):
+            client.get("http://mf/api")
+        assert len(events) == 3
+        assert events[-1]["error"] == "down"
+
+    def test_breaker_fails_fast_when_upstream_degraded(self, mocker, client, events):
+        mock_get = mocker.patch('src.mf_client.requests.Session.get', side_effect=ConnectionError("down"))
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                client.get("http://mf/api")
+
+        with pytest.raises(CircuitOpenError):
+            client.get("http://mf/api")
+        assert mock_get.call_count == 6
+        assert events[-1]["error"] == "circuit open"
+
+    def test_works_without_metrics_hook(self, mocker):
+        client = MFClient()
+        mocker.patch('src.mf_client.requests.Session.get', return_value=make_response(mocker, 200))
+
+        assert client.get("http://mf/api").status_code == 200
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv('BANK_APP_MF_POOL_SIZE', '4')
+        monkeypatch.setenv('BANK_APP_MF_READ_TIMEOUT', '2.5')
+        monkeypatch.setenv('BANK_APP_MF_BREAKER_THRESHOLD', '7')
+
+        client = MFClient.from_env()
+
+        assert client.stats() == {
+            "pool_size": 4,
+            "timeout": (3.05, 2.5),
+            "max_retries": 2,
+            "breaker_state": "closed",
+        }
+        assert client.breaker.failure_threshold == 7
+        assert client.session.get_adapter("https://wl-test.mf.gov.pl")._pool_maxsize == 4
+        client.close()
+
+    def test_lazy_client_gets_the_owners_metrics_hook(self):
+        def hook(event):
+            pass
+
+        class Owner:
+            mf_client = _LazyMFClient()
+            mf_metrics_hook = hook
+
+        client = Owner.mf_client
+
+        assert client.metrics_hook is hook
+        client.close()
+
+
+def serve(replies, handler=None):
+    """Run `handler(client)` against a local HTTP server answering with `replies` in turn."""
+    requests_seen = []
+
+    async def respond(reader, writer):
+        requests_seen.append(await reader.readuntil(b"\r\n\r\n"))
+        status, body = replies[min(len(requests_seen), len(replies)) - 1]
+        writer.write(f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n{body}".encode())
+        await writer.drain()
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_server(respond, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await handler(f"http://127.0.0.1:{port}")
+
+    return asyncio.run(main()), requests_seen
+
+
+async def no_sleep(seconds):
+    pass
+
+
+class TestAsyncMFClient:
+    def test_get_returns_response(self):
+        async def call(base):
+            return await AsyncMFClient().get(f"{base}/api/search/nip/1?date=2025-01-01")
+
+        response, seen = serve([(200, '{"result": {}}')], call)
+
+        assert (response.status_code, response.json()) == (200, {"result": {}})
+        assert seen[0].startswith(b"GET /api/search/nip/1?date=2025-01-01 HTTP/1.1\r\n")
+        assert b"accept: application/json" in seen[0].lower()
+
+    def test_retries_server_errors_and_reports_attempts(self):
+        events = []
+
+        async def call(base):
+            client = AsyncMFClient(max_retries=2, metrics_hook=events.append, sleep=no_sleep)
+            return await client.get(f"{base}/")
+
+        response, seen = serve([(503, "{}"), (200, "{}")], call)
+
+        assert response.status_code == 200
+        assert [event["status"] for event in events] == [503, 200]
+
+    def test_exhausted_retries_return_last_response(self):
+        async def call(base):
+            client = AsyncMFClient(max_retries=1, sleep=no_sleep)
+            return await client.get(base), client.breaker._failures
+
+        (response, failures), seen = serve([(503, "{}")], call)
+
+        assert response.status_code == 503
+        assert (len(seen), failures) == (2, 1)
+
+    def test_network_errors_open_the_circuit(self):
+        events = []
+        client = AsyncMFClient(max_retries=0, breaker=CircuitBreaker(failure_threshold=1),
+                               metrics_hook=events.append)
+
+        async def call():
+            with pytest.raises(httpx.ConnectError):
+                await client.get("http://127.0.0.1:1/api")
+            with pytest.raises(CircuitOpenError):
+                await client.get("http://127.0.0.1:1/api")
+            await client.close()
+
+        asyncio.run(call())
+
+        assert events[-1]["error"] == "circuit open"
+
+    def test_one_pooled_client_is_reused_until_closed(self):
+        async def call(base):
+            client = AsyncMFClient(pool_size=3, connect_timeout=1.0, read_timeout=2.0)
+            await client.get(base)
+            pooled = client._client
+            await client.get(base)
+            reused = client._client is pooled
+            await client.close()
+            return pooled, reused, client._client
+
+        (pooled, reused, after_close), seen = serve([(200, "{}")], call)
+
+        assert reused and after_close is None and len(seen) == 2
+        assert pooled.timeout == httpx.Timeout(2.0, connect=1.0, pool=None)
+        assert pooled.is_closed
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv('BANK_APP_MF_POOL_SIZE', '4')
+        monkeypatch.setenv('BANK_APP_MF_RETRIES', '5')
+
+        client = AsyncMFClient.from_env()
+
+        assert (client.pool_size, client.max_retries, client.timeout) == (4, 5, (3.05, 10.0))
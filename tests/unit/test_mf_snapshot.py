@@ -0,0 +1,92 @@
+import pytest
+from src.company_account import CompanyAccount
+from src.mf_snapshot import MFSnapshot, build_snapshot
+
+
+@pytest.fixture
+def whitelist_dump(tmp_path):
+    path = tmp_path / "whitelist.csv"
+    path.write_text(
+        "nip;name\n"
+        "8461627563;TechCorp\n"
+        "1234567890;BuildCorp\n"
+        "5555555555 TradeInc\n"
+        "8461627563;TechCorp duplicate\n"
+        "123;too short\n"
+        "\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+@pytest.fixture
+def snapshot(whitelist_dump, tmp_path):
+    path = tmp_path / "whitelist.bin"
+    build_snapshot(str(whitelist_dump), str(path))
+    snapshot = MFSnapshot(str(path))
+    yield snapshot
+    snapshot.close()
+
+
+class TestBuildSnapshot:
+    def test_writes_sorted_fixed_width_records(self, whitelist_dump, tmp_path):
+        path = tmp_path / "whitelist.bin"
+
+        count = build_snapshot(str(whitelist_dump), str(path))
+
+        assert count == 3
+        assert path.read_bytes() == b"123456789055555555558461627563"
+        assert not (tmp_path / "whitelist.bin.tmp").exists()
+
+
+class TestMFSnapshot:
+    @pytest.mark.parametrize("nip", ["1234567890", "5555555555", "8461627563"])
+    def test_contains_listed_nips(self, snapshot, nip):
+        assert nip in snapshot
+
+    @pytest.mark.parametrize("nip", ["0000000000", "3333333333", "9999999999", "123", "１２３４５６７８９０"])
+    def test_does_not_contain_other_nips(self, snapshot, nip):
+        assert nip not in snapshot
+
+    def test_len(self, snapshot):
+        assert len(snapshot) == 3
+
+    def test_empty_snapshot(self, tmp_path):
+        path = tmp_path / "empty.bin"
+        path.write_bytes(b"")
+
+        snapshot = MFSnapshot(str(path))
+
+        assert len(snapshot) == 0
+        assert "1234567890" not in snapshot
+        snapshot.close()
+
+    def test_rejects_corrupted_file(self, tmp_path):
+        path = tmp_path / "broken.bin"
+        path.write_bytes(b"12345")
+
+        with pytest.raises(ValueError):
+            MFSnapshot(str(path))
+
+
+class TestCompanyAccountWithSnapshot:
+    def test_snapshot_hit_skips_online_check(self, snapshot, monkeypatch, mocker):
+        monkeypatch.setattr(CompanyAccount, "mf_snapshot", snapshot)
+        mock_get = mocker.patch('src.mf_client.requests.Session.get')
+
+        account = CompanyAccount("TechCorp", "8461627563")
+
+        assert account.nip == "8461627563"
+        mock_get.assert_not_called()
+
+    def test_snapshot_miss_falls_back_to_online_check(self, snapshot, monkeypatch, mocker):
+        monkeypatch.setattr(CompanyAccount, "mf_snapshot", snapshot)
+        mock_response = mocker.MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
+        mock_get = mocker.patch('src.mf_client.requests.Session.get', return_value=mock_response)
+
+        account = CompanyAccount("NewCorp", "9999999999")
+
+        assert account.nip == "9999999999"
+        mock_get.assert_called_once()
@@ -1,9 +1,26 @@
 import pytest
+from unittest.mock import MagicMock
+from pymongo import InsertOne, UpdateOne, DeleteOne
 from src.mongo_accounts_repository import MongoAccountsRepository
+from src.accounts_registry import primary_key
 from src.personal_account import PersonalAccount
 from src.company_account import CompanyAccount
 
 
+class BulkResult:
+    """pymongo's BulkWriteResult when every operation was applied"""
+    
+    def __init__(self, operations, ordered=True):
+        self.inserted_count = sum(isinstance(operation, InsertOne) for operation in operations)
+        self.matched_count = len(operations) - self.inserted_count
+        self.upserted_count = 0
+
+
+def stored(document):
+    """`document` as save_all/save_changes store it"""
+    return {**document, "history_len": len(document["history"])}
+
+
 class TestMongoAccountsRepository:
     def setup_method(self):
         self.account1 = PersonalAccount("John", "Doe", "90010112345")
@@ -14,11 +31,12 @@ class TestMongoAccountsRepository:
         self.account2.balance = 2000.0
         self.account2.history = ["200", "300"]
     
-    def test_save_all_clears_collection_and_saves_accounts(self, mocker):
+    def test_save_all_bulk_writes_to_staging_and_renames(self, mocker):
         # Arrange
-        mock_collection = mocker.Mock()
         repo = MongoAccountsRepository()
-        repo._collection = mock_collection
+        repo._db = mocker.MagicMock()
+        staging = repo._db["accounts_staging"]
+        staging.bulk_write.side_effect = BulkResult
         
         accounts = [self.account1, self.account2]
         
@@ -26,15 +44,32 @@ class TestMongoAccountsRepository:
         repo.save_all(accounts)
         
         # Assert
-        mock_collection.delete_many.assert_called_once_with({})
-        assert mock_collection.update_one.call_count == 2
+        staging.drop.assert_called_once()
+        staging.bulk_write.assert_called_once()
+        operations = staging.bulk_write.call_args[0][0]
+        assert staging.bulk_write.call_args[1]["ordered"] is False
+        assert len(operations) == 2
+        
+        # Verify both accounts were saved as whole documents
+        assert operations[0] == InsertOne(stored(self.account1.to_dict()))
+        assert operations[1] == InsertOne(stored(self.account2.to_dict()))
+        staging.rename.assert_called_once_with("accounts", dropTarget=True)
+    
+    def test_save_all_splits_writes_into_batches(self, mocker):
+        # Arrange
+        repo = MongoAccountsRepository(batch_size=2)
+        repo._db = mocker.MagicMock()
+        staging = repo._db["accounts_staging"]
+        staging.bulk_write.side_effect = BulkResult
+        accounts = [PersonalAccount("John", "Doe", f"{i:011d}") for i in range(5)]
+        
+        # Act
+        repo.save_all(accounts)
         
-        # Verify first account was saved
-        first_call = mock_collection.update_one.call_args_list[0]
-        assert first_call[0][0] == {"pesel": "90010112345"}
-        assert first_call[0][1]["$set"]["first_name"] == "John"
-        assert first_call[0][1]["$set"]["balance"] == 1000.0
-        assert first_call[1]["upsert"] is True
+        # Assert
+        batch_sizes = [len(call[0][0]) for call in staging.bulk_write.call_args_list]
+        assert batch_sizes == [2, 2, 1]
+        staging.rename.assert_called_once()
     
     def test_load_all_returns_accounts_from_database(self, mocker):
         # Arrange
@@ -65,7 +100,10 @@ class TestMongoAccountsRepository:
         # Arrange
         mock_collection = mocker.Mock()
         repo = MongoAccountsRepository()
+        repo._db = mocker.MagicMock()
         repo._collection = mock_collection
+        staging = repo._db["accounts_staging"]
+        staging.bulk_write.side_effect = BulkResult
         
         # Create company account without NIP validation
         company = object.__new__(CompanyAccount)
@@ -82,8 +120,8 @@ class TestMongoAccountsRepository:
         repo.save_all([company])
         
         # Assert - Save
-        mock_collection.delete_many.assert_called_once()
-        assert mock_collection.update_one.call_count == 1
+        operations = staging.bulk_write.call_args[0][0]
+        assert operations == [InsertOne(stored(company.to_dict()))]
         
         # Act - Load
         loaded_accounts = repo.load_all()
@@ -114,66 +152,350 @@ class TestMongoAccountsRepository:
         # Arrange
         mock_collection = mocker.Mock()
         repo = MongoAccountsRepository()
+        repo._db = mocker.MagicMock()
         repo._collection = mock_collection
+        staging = repo._db["accounts_staging"]
         
         # Act
         repo.save_all([])
         
         # Assert
         mock_collection.delete_many.assert_called_once_with({})
-        assert mock_collection.update_one.call_count == 0
-    def test_save_all_with_personal_account_pesel_branch(self, mocker):
-        # Arrange - Ensures 'pesel' branch of hasattr() is covered
-        mock_collection = mocker.Mock()
+        staging.bulk_write.assert_not_called()
+        staging.rename.assert_not_called()
+
+
+class TestMongoIncrementalSave:
+    @pytest.fixture
+    def repo(self, mocker):
         repo = MongoAccountsRepository()
-        repo._collection = mock_collection
+        repo._db = mocker.MagicMock()
+        repo._db["accounts_staging"].bulk_write.side_effect = BulkResult
+        repo._collection = mocker.Mock()
+        repo._collection.bulk_write.side_effect = BulkResult
+        return repo
+
+    @pytest.fixture
+    def account(self):
+        account = PersonalAccount("John", "Doe", "90010112345")
+        account.incoming_transfer(100.0)
+        return account
+
+    def written_operations(self, repo):
+        return [op for call in repo._collection.bulk_write.call_args_list for op in call[0][0]]
+
+    def fields(self, account):
+        document = account.to_dict()
+        return {"history_len": len(document.pop("history")), **document}
+
+    def test_unsaved_account_is_written_whole(self, repo, account):
+        repo.save_changes([account], [])
+
+        assert self.written_operations(repo) == [
+            UpdateOne({"type": "personal", "pesel": "90010112345"}, {"$set": stored(account.to_dict())}, upsert=True)
+        ]
+
+    def test_saved_account_only_pushes_new_history(self, repo, account):
+        repo.save_all([account])
+        account.incoming_transfer(50.0)
+        account.outgoing_transfer(20.0)
+
+        repo.save_changes([account], [])
+
+        assert self.written_operations(repo) == [
+            UpdateOne(
+                {"type": "personal", "pesel": "90010112345", "history_len": 1},
+                {"$set": self.fields(account), "$push": {"history": {"$each": ["50.0", "-20.0"]}}},
+            )
+        ]
+
+    def test_name_change_without_history_change_sets_fields_only(self, repo, account):
+        repo.save_changes([account], [])
+        repo._collection.bulk_write.reset_mock()
+        account.first_name = "Johnny"
+
+        repo.save_changes([account], [])
+
+        assert self.written_operations(repo) == [
+            UpdateOne({"type": "personal", "pesel": "90010112345", "history_len": 1}, {"$set": self.fields(account)})
+        ]
+
+    def test_replaced_history_is_rewritten(self, repo, account):
+        repo.save_changes([account], [])
+        repo._collection.bulk_write.reset_mock()
+        account.history = []
+
+        repo.save_changes([account], [])
+
+        assert self.written_operations(repo) == [
+            UpdateOne({"type": "personal", "pesel": "90010112345"}, {"$set": stored(account.to_dict())}, upsert=True)
+        ]
+
+    def test_failed_save_is_retried_in_full(self, repo, account):
+        repo.save_all([account])
+        account.incoming_transfer(50.0)
+        repo._collection.bulk_write.side_effect = RuntimeError("mongo unavailable")
+        with pytest.raises(RuntimeError):
+            repo.save_changes([account], [])
+        repo._collection.bulk_write.side_effect = BulkResult
+        repo._collection.bulk_write.reset_mock()
+
+        repo.save_changes([account], [])
+
+        assert self.written_operations(repo) == [
+            UpdateOne(
+                {"type": "personal", "pesel": "90010112345", "history_len": 1},
+                {"$set": self.fields(account), "$push": {"history": {"$each": ["50.0"]}}},
+            )
+        ]
+
+    def test_append_on_another_stored_history_is_rewritten_whole(self, repo, account, mocker):
+        repo.save_all([account])
+        account.incoming_transfer(50.0)
+        other = PersonalAccount("Jane", "Doe", "85020298765")
+        repo.save_all([account, other])
+        other.incoming_transfer(5.0)
+        # A stale read: the repository now believes the first account has no history stored
+        repo._saved_history_lengths[("pesel", "90010112345")] = 0
+        account.incoming_transfer(1.0)
+        repo._collection.bulk_write.side_effect = [
+            mocker.Mock(inserted_count=0, matched_count=1, upserted_count=0), BulkResult([None]),
+        ]
+        repo._collection.find.return_value = [
+            {"type": "personal", "pesel": "90010112345", "history_len": 2},
+            {"type": "personal", "pesel": "85020298765", "history_len": 1},
+        ]
+
+        repo.save_changes([account, other], [])
+
+        assert repo._collection.find.call_args[0][0] == {"$or": [
+            {"type": "personal", "pesel": "90010112345"}, {"type": "personal", "pesel": "85020298765"},
+        ]}
+        assert repo._collection.bulk_write.call_args[0][0] == [
+            UpdateOne({"type": "personal", "pesel": "90010112345"}, {"$set": stored(account.to_dict())}, upsert=True)
+        ]
+        assert repo._saved_history_lengths[("pesel", "90010112345")] == 3
+
+    def test_forgotten_account_is_written_whole(self, repo, account):
+        repo.save_all([account])
+        account.incoming_transfer(50.0)
+
+        repo.forget(("pesel", "90010112345"))
+        repo.save_changes([account], [])
+
+        assert repo._collection.bulk_write.call_args[0][0] == [
+            UpdateOne({"type": "personal", "pesel": "90010112345"}, {"$set": stored(account.to_dict())}, upsert=True)
+        ]
+
+    def test_removed_accounts_are_deleted_before_updates(self, repo, account):
+        repo.save_changes([account], [("pesel", "90010112345"), ("nip", "1234567890")])
+
+        calls = repo._collection.bulk_write.call_args_list
+        assert calls[0][0][0] == [
+            DeleteOne({"type": "personal", "pesel": "90010112345"}),
+            DeleteOne({"type": "company", "nip": "1234567890"}),
+        ]
+        assert calls[1][0][0] == [
+            UpdateOne({"type": "personal", "pesel": "90010112345"}, {"$set": stored(account.to_dict())}, upsert=True)
+        ]
+
+    def test_no_changes_writes_nothing(self, repo):
+        repo.save_changes([], [])
+
+        repo._collection.bulk_write.assert_not_called()
+
+    def test_loaded_accounts_only_push_new_history(self, repo, account):
+        repo._collection.find.return_value = [account.to_dict()]
+        loaded = repo.load_all()[0]
+        loaded.incoming_transfer(5.0)
+
+        repo.save_changes([loaded], [])
+
+        update = self.written_operations(repo)[0]
+        assert update == UpdateOne(
+            {"type": "personal", "pesel": "90010112345", "history_len": 1},
+            {"$set": self.fields(loaded), "$push": {"history": {"$each": ["5.0"]}}},
+        )
+
+
+class TestMongoStreamingLoad:
+    @pytest.fixture
+    def repo(self, mocker):
+        repo = MongoAccountsRepository(batch_size=500)
+        repo._collection = mocker.Mock()
+        return repo
+
+    @pytest.fixture
+    def documents(self):
+        personal = PersonalAccount("John", "Doe", "90010112345")
+        personal.incoming_transfer(100.0)
+        company = CompanyAccount.from_dict({"company_name": "Test Corp", "nip": "1234567890",
+                                            "balance": 10.0, "history": ["10.0"]})
+        return [personal.to_dict(), company.to_dict(), {"type": "unknown"}]
+
+    def test_iter_all_streams_with_batch_size_and_projection(self, repo, documents):
+        repo._collection.find.return_value = iter(documents)
+
+        accounts = repo.iter_all(batch_size=50)
+
+        repo._collection.find.assert_not_called()
+        first = next(accounts)
+        assert first.pesel == "90010112345"
+        repo._collection.find.assert_called_once_with({}, MongoAccountsRepository.PROJECTION, batch_size=50)
+        assert [account.nip for account in accounts] == ["1234567890"]
+
+    def test_iter_all_defaults_to_repository_batch_size(self, repo, documents):
+        repo._collection.find.return_value = documents
+
+        list(repo.iter_all())
+
+        assert repo._collection.find.call_args[1]["batch_size"] == 500
+
+    def test_personal_from_dict_bypasses_constructor(self, mocker):
+        valid_promo = mocker.spy(PersonalAccount, "valid_promo")
+        data = {"type": "personal", "first_name": "John", "last_name": "Doe", "pesel": "04290000000",
+                "balance": 20.0, "history": ["-30.0"], "promo_kod": "PROM_KOD"}
+
+        account = PersonalAccount.from_dict(data)
+
+        valid_promo.assert_not_called()
+        assert account.to_dict() == data
+
+
+class TestLazyConnection:
+    def test_client_is_created_on_first_use(self, mocker):
+        mongo_client = mocker.patch("pymongo.MongoClient")
         
-        personal_account = PersonalAccount("Jan", "Kowalski", "80010112345")
-        personal_account.balance = 1500.0
+        repo = MongoAccountsRepository("mongodb://db.example:27017/", db_name="bank")
+        mongo_client.assert_not_called()
         
-        # Act
-        repo.save_all([personal_account])
+        collection = repo._collection
         
-        # Assert - Verify pesel branch is used in query
-        mock_collection.delete_many.assert_called_once_with({})
-        assert mock_collection.update_one.call_count == 1
+        mongo_client.assert_called_once_with("mongodb://db.example:27017/")
+        assert collection is mongo_client.return_value["bank"]["accounts"]
+        assert repo._collection is collection
+        mongo_client.assert_called_once()
+        collection.create_indexes.assert_called_once()
+
+
+class TestMongoIndexesAndQueries:
+    @pytest.fixture
+    def repo(self, mocker):
+        repo = MongoAccountsRepository()
+        repo._db = mocker.MagicMock()
+        repo._db["accounts_staging"].bulk_write.side_effect = BulkResult
+        repo._collection = mocker.MagicMock()
+        repo._collection.bulk_write.side_effect = BulkResult
+        return repo
+    
+    def test_unique_partial_indexes_on_primary_keys(self, repo):
+        repo.ensure_indexes()
         
-        # Verify the query uses 'pesel' (not 'nip')
-        call_args = mock_collection.update_one.call_args_list[0]
-        assert call_args[0][0] == {"pesel": "80010112345"}
-        assert call_args[0][1]["$set"]["type"] == "personal"
-        assert call_args[1]["upsert"] is True
+        indexes = [model.document for model in repo._collection.create_indexes.call_args[0][0]]
+        assert indexes == [
+            {"key": {"pesel": 1}, "name": "pesel_unique", "unique": True,
+             "partialFilterExpression": {"type": "personal", "pesel": {"$lt": "Invalid"}}},
+            {"key": {"nip": 1}, "name": "nip_unique", "unique": True,
+             "partialFilterExpression": {"type": "company", "nip": {"$lt": "Invalid"}}},
+        ]
     
-    def test_save_all_with_company_account_nip_branch(self, mocker):
-        # Arrange - Ensures 'nip' branch of hasattr() is covered
-        mock_collection = mocker.Mock()
-        repo = MongoAccountsRepository()
-        repo._collection = mock_collection
+    def test_save_all_indexes_staging_before_rename(self, repo):
+        staging = repo._db["accounts_staging"]
+        staging.attach_mock(staging.create_indexes, "create_indexes")
         
-        # Create company account without NIP validation
-        company = object.__new__(CompanyAccount)
-        CompanyAccount.__bases__[0].__init__(company)
-        company.company_name = "TechCorp"
-        company.nip = "9876543210"
-        company.balance = 5000.0
-        company.history = []
-        # Explicitly remove pesel attribute to ensure only nip is present
-        if hasattr(company, 'pesel'):
-            delattr(company, 'pesel')
+        repo.save_all([PersonalAccount("John", "Doe", "90010112345")])
         
-        # Verify our company object doesn't have pesel
-        assert not hasattr(company, 'pesel'), "Company should not have pesel attribute"
-        assert hasattr(company, 'nip'), "Company should have nip attribute"
+        calls = [name for name, _, _ in staging.mock_calls if name in ("create_indexes", "rename")]
+        assert calls == ["create_indexes", "rename"]
+    
+    def test_count_accounts(self, repo):
+        repo._collection.count_documents.return_value = 42
         
-        # Act
-        repo.save_all([company])
+        assert repo.count_accounts() == 42
+        repo._collection.count_documents.assert_called_once_with({})
+    
+    def test_calls_are_reported_to_metrics_hook(self, repo, mocker):
+        repo.metrics_hook = mocker.Mock()
+        repo._collection.find.return_value = []
+        repo._collection.find_one.return_value = None
         
-        # Assert - Verify nip branch is used in query
-        mock_collection.delete_many.assert_called_once_with({})
-        assert mock_collection.update_one.call_count == 1
+        repo.count_accounts()
+        repo.find_by_nip("5261040828")
+        repo.save_changes([], [])
+        list(repo.iter_all())
+        
+        operations = [call.args[0] for call in repo.metrics_hook.call_args_list]
+        assert operations == ["count_accounts", "find_one", "save_changes", "iter_all"]
+        assert all(call.args[1] >= 0 for call in repo.metrics_hook.call_args_list)
+    
+    def test_find_by_pesel_queries_the_indexed_key(self, repo):
+        account = PersonalAccount("John", "Doe", "90010112345")
+        repo._collection.find_one.return_value = account.to_dict()
+        
+        found = repo.find_by_pesel("90010112345")
+        
+        repo._collection.find_one.assert_called_once_with(
+            {"type": "personal", "pesel": "90010112345"}, MongoAccountsRepository.PROJECTION
+        )
+        assert found.to_dict() == account.to_dict()
+    
+    def test_find_by_nip_returns_none_when_missing(self, repo):
+        repo._collection.find_one.return_value = None
+        
+        assert repo.find_by_nip("1234567890") is None
+        repo._collection.find_one.assert_called_once_with(
+            {"type": "company", "nip": "1234567890"}, MongoAccountsRepository.PROJECTION
+        )
+    
+    def test_found_account_only_pushes_new_history(self, repo):
+        account = PersonalAccount("John", "Doe", "90010112345")
+        account.incoming_transfer(10.0)
+        repo._collection.find_one.return_value = account.to_dict()
+        found = repo.find_by_pesel("90010112345")
+        found.incoming_transfer(5.0)
+        
+        repo.save_changes([found], [])
+        
+        document = found.to_dict()
+        del document["history"]
+        assert repo._collection.bulk_write.call_args[0][0] == [UpdateOne(
+            {"type": "personal", "pesel": "90010112345", "history_len": 1},
+            {"$set": {**document, "history_len": 2}, "$push": {"history": {"$each": ["5.0"]}}},
+        )]
+    
+    def test_load_page_merges_personal_and_company_keys(self, repo):
+        stored = {
+            "pesel": [PersonalAccount("John", "Doe", pesel).to_dict() for pesel in ("90010112340", "92010112340")],
+            "nip": [CompanyAccount.from_dict({"company_name": "Firm", "nip": nip, "balance": 0.0, "history": []}).to_dict()
+                    for nip in ("8461627563", "9111111111")],
+        }
+        
+        def find(query, projection):
+            field = "pesel" if "pesel" in query else "nip"
+            cursor = MagicMock()
+            cursor.sort.return_value.limit.side_effect = lambda n: stored[field][:n]
+            return cursor
+        repo._collection.find.side_effect = find
+        
+        accounts, cursor = repo.load_page(limit=3)
+        
+        assert [primary_key(account)[1] for account in accounts] == ["8461627563", "90010112340", "9111111111"]
+        assert cursor == "9111111111"
+        assert repo._collection.find.call_args_list[0][0] == (
+            {"type": "personal", "pesel": {"$lt": "Invalid"}}, repo.PROJECTION
+        )
+        
+        accounts, cursor = repo.load_page(limit=4)
+        
+        assert len(accounts) == 4 and cursor is None
+    
+    def test_load_page_resumes_behind_the_cursor_key(self, repo):
+        repo._collection.find.return_value.sort.return_value.limit.return_value = []
+        
+        assert repo.load_page(limit=2, after="9111111111") == ([], None)
         
-        # Verify the query uses 'nip' (not 'pesel') - this covers the else branch
-        call_args = mock_collection.update_one.call_args_list[0]
-        assert call_args[0][0] == {"nip": "9876543210"}
-        assert call_args[0][1]["$set"]["type"] == "company"
-        assert call_args[1]["upsert"] is True
+        assert repo._collection.find.call_args[0][0] == {
+            "type": "company", "nip": {"$gt": "9111111111", "$lt": "Invalid"}
+        }
+        repo._collection.find.return_value.sort.assert_called_with("nip", 1)
+        repo._collection.find.return_value.sort.return_value.limit.assert_called_with(3)
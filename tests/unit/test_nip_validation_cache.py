@@ -0,0 +1,127 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from src.company_account import CompanyAccount
+from src.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def test_get_counts_hits_and_misses(self, clock):
+        cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+        cache.put("a", True)
+
+        assert cache.get("a") is True
+        assert cache.get("b") is None
+        assert cache.stats() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 10}
+
+    def test_entries_expire_after_ttl(self, clock):
+        cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+        cache.put("a", True)
+        cache.put("b", False, ttl=5)
+
+        clock.now = 10
+        assert cache.get("a") is True
+        assert cache.get("b", "missing") == "missing"
+
+        clock.now = 61
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self, clock):
+        cache = TTLCache(maxsize=2, ttl=60, clock=clock)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    @pytest.mark.parametrize("maxsize,ttl", [(0, 60), (10, 0)])
+    def test_disabled_cache_stores_nothing(self, clock, maxsize, ttl):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl, clock=clock)
+        cache.put("a", 1)
+
+        assert cache.get("a") is None
+
+    def test_clear_resets_counters(self, clock):
+        cache = TTLCache(clock=clock)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.clear()
+
+        assert cache.stats()["hits"] == 0
+        assert len(cache) == 0
+
+
+class StubMFHandler(BaseHTTPRequestHandler):
+    statuses = {"8461627563": "Czynny", "9999999999": "Zwolniony"}
+    requests_seen = []
+
+    def do_GET(self):
+        nip = self.path.split("/api/search/nip/")[1].split("?")[0]
+        self.requests_seen.append(nip)
+        if nip not in self.statuses:
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = json.dumps({"result": {"subject": {"statusVat": self.statuses[nip]}}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestNipValidationCacheWithStubServer:
+    @pytest.fixture
+    def mf_server(self, monkeypatch):
+        StubMFHandler.requests_seen = []
+        server = HTTPServer(("127.0.0.1", 0), StubMFHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        monkeypatch.setattr(CompanyAccount, "MF_API_URL", f"http://127.0.0.1:{server.server_port}")
+        yield StubMFHandler
+        server.shutdown()
+        server.server_close()
+
+    def test_active_nip_is_validated_once(self, mf_server):
+        CompanyAccount("TechCorp", "8461627563")
+        CompanyAccount("TechCorp 2", "8461627563")
+
+        assert mf_server.requests_seen == ["8461627563"]
+        assert CompanyAccount.nip_cache.hits == 1
+        assert CompanyAccount.nip_cache.misses == 1
+
+    def test_inactive_nip_is_negatively_cached(self, mf_server):
+        for _ in range(2):
+            with pytest.raises(ValueError, match="Company not registered!!"):
+                CompanyAccount("FakeCorp", "9999999999")
+
+        assert mf_server.requests_seen == ["9999999999"]
+
+    def test_api_errors_are_not_cached(self, mf_server):
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                CompanyAccount("ErrorCorp", "1111111111")
+
+        attempts_per_call = CompanyAccount.mf_client.max_retries + 1
+        assert mf_server.requests_seen == ["1111111111"] * (2 * attempts_per_call)
+        assert len(CompanyAccount.nip_cache) == 0
@@ -0,0 +1,14 @@
+from src.sharding import shard_for
+
+
+class TestShardFor:
+    def test_same_key_always_maps_to_same_shard(self):
+        assert shard_for("89092909825", 4) == shard_for("89092909825", 4) == 2
+
+    def test_keys_spread_across_shards(self):
+        shards = {shard_for(f"{i:011d}", 4) for i in range(100)}
+
+        assert shards == {0, 1, 2, 3}
+
+    def test_single_shard_owns_everything(self):
+        assert {shard_for(f"{i:011d}", 1) for i in range(10)} == {0}
@@ -0,0 +1,212 @@
+import multiprocessing
+import threading
+import uuid
+import pytest
+from src.accounts_registry import AccountsRegistry
+from src.account_indexes import default_indexes
+from src.company_account import CompanyAccount
+from src.personal_account import PersonalAccount
+from src.shared_ledger import SharedLedger, SharedLedgerLocks, LedgerFullError, ledger_key
+from src.transfers import transfer
+
+
+@pytest.fixture
+def ledger_name():
+    return f"bank-test-{uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture
+def ledger(ledger_name):
+    ledger = SharedLedger(ledger_name, capacity=64, stripes=8)
+    yield ledger
+    ledger.unlink()
+    ledger.close()
+
+
+def worker(ledger_name, pesels):
+    """A second process: a registry of its own over the same ledger."""
+    registry = AccountsRegistry(indexes=default_indexes())
+    registry.locks = SharedLedgerLocks(SharedLedger(ledger_name, capacity=64, stripes=8))
+    accounts = [PersonalAccount("Test", "User", pesel) for pesel in pesels]
+    registry.add_accounts(accounts)
+    return registry, accounts
+
+
+def _add_many(ledger_name, key, times):
+    ledger = SharedLedger(ledger_name, capacity=64, stripes=8)
+    for _ in range(times):
+        ledger.add(key, 1.0)
+    ledger.close()
+
+
+class TestSharedLedger:
+    def test_slots_are_found_by_key(self, ledger):
+        slot = ledger.slot("pesel:89092909825", create=True)
+
+        assert ledger.slot("pesel:89092909825") == slot
+        assert ledger.slot("pesel:85051298765") is None
+        assert ledger.get(slot) is None
+        assert len(ledger) == 1
+
+    def test_set_and_get(self, ledger):
+        slot = ledger.slot("nip:5261040828", create=True)
+
+        ledger.set(slot, 250.5, 3, 1)
+
+        assert ledger.get(slot) == (250.5, 3, 1)
+
+    def test_add_is_visible_to_other_attachments(self, ledger, ledger_name):
+        other = SharedLedger(ledger_name, capacity=64, stripes=8)
+
+        ledger.add("pesel:89092909825", 100.0)
+
+        assert other.add("pesel:89092909825", -40.0) == 60.0
+        assert ledger.get(ledger.slot("pesel:89092909825")) == (60.0, 0, 0)
+        other.close()
+
+    def test_colliding_keys_probe_to_the_next_slot(self, ledger):
+        slots = {ledger.slot(f"pesel:{i:011d}", create=True) for i in range(64)}
+
+        assert slots == set(range(64))
+        assert ledger.slot("pesel:99999999999") is None
+        with pytest.raises(LedgerFullError):
+            ledger.slot("pesel:99999999999", create=True)
+
+    def test_long_keys_are_rejected(self, ledger):
+        with pytest.raises(ValueError, match="too long"):
+            ledger.slot("pesel:" + "1" * 30)
+
+    def test_attaching_with_a_larger_capacity_fails(self, ledger, ledger_name):
+        with pytest.raises(ValueError, match="smaller than"):
+            SharedLedger(ledger_name, capacity=1_000_000)
+
+    def test_concurrent_processes_do_not_lose_updates(self, ledger, ledger_name):
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=_add_many, args=(ledger_name, "pesel:89092909825", 500)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+
+        assert [process.exitcode for process in processes] == [0] * 4
+        assert ledger.get(ledger.slot("pesel:89092909825"))[0] == 2000.0
+
+
+class TestSharedLedgerLocks:
+    def test_ledger_key(self):
+        assert ledger_key(PersonalAccount("Test", "User", "89092909825")) == "pesel:89092909825"
+        assert ledger_key(PersonalAccount("Test", "User", "123")) is None
+
+    def test_workers_see_each_others_transfers(self, ledger_name):
+        first, (sender, recipient) = worker(ledger_name, ["89092909825", "85051298765"])
+        second, (sender_copy, recipient_copy) = worker(ledger_name, ["89092909825", "85051298765"])
+        with first.locks.hold(sender):
+            sender.incoming_transfer(100.0)
+
+        transfer(sender_copy, recipient_copy, 30.0, second.locks)
+        with first.locks.hold(sender, recipient):
+            pass
+
+        assert (sender.balance, recipient.balance) == (70.0, 30.0)
+        assert first.get_index("balance").range(50.0) == [sender]
+        first.locks.ledger.unlink()
+
+    def test_loan_aggregates_are_shared(self, ledger_name):
+        first, (account,) = worker(ledger_name, ["89092909825"])
+        second, (copy,) = worker(ledger_name, ["89092909825"])
+        with first.locks.hold(account):
+            for _ in range(3):
+                account.incoming_transfer(10.0)
+
+        with second.locks.hold(copy):
+            assert copy.history.deposit_run == 3
+            assert copy.submit_for_loan(500.0)
+
+        first.locks.ledger.unlink()
+
+    def test_first_worker_publishes_its_balance(self, ledger):
+        locks = SharedLedgerLocks(ledger)
+        account = PersonalAccount("Test", "User", "89092909825")
+        account.balance = 500.0
+        placeholder = CompanyAccount.__new__(CompanyAccount)
+        placeholder.nip = "Invalid"
+
+        with locks.hold(account, placeholder):
+            assert account.balance == 500.0
+
+        assert ledger.get(ledger.slot("pesel:89092909825"))[0] == 500.0
+        assert len(locks) == 8
+        assert locks.stripe(placeholder) == ledger.stripe("Invalid")
+
+    def test_balance_is_read_from_the_ledger(self, ledger):
+        locks = SharedLedgerLocks(ledger)
+        account = PersonalAccount("Test", "User", "89092909825")
+        account.balance = 10.0
+        placeholder = PersonalAccount("Test", "User", "123")
+        placeholder.balance = 7.0
+
+        assert locks.balance(account) == 10.0
+        ledger.add("pesel:89092909825", 40.0)
+
+        assert locks.balance(account) == 40.0
+        assert account.balance == 10.0
+        assert locks.balance(placeholder) == 7.0
+
+    def test_publish_overwrites_the_ledger(self, ledger):
+        locks = SharedLedgerLocks(ledger)
+        ledger.add("pesel:89092909825", 900.0)
+        loaded = PersonalAccount("Test", "User", "89092909825")
+        loaded.balance = 120.0
+
+        locks.publish([loaded, PersonalAccount("Test", "User", "123")])
+
+        assert ledger.get(ledger.slot("pesel:89092909825")) == (120.0, 0, 0)
+
+    def test_removed_accounts_leave_their_slot_unset(self, ledger):
+        registry = AccountsRegistry()
+        registry.locks = SharedLedgerLocks(ledger)
+        registry.add_observer(registry.locks)
+        account = PersonalAccount("Test", "User", "89092909825")
+        registry.add_account(account)
+        with registry.locks.hold(account):
+            account.incoming_transfer(100.0)
+
+        registry.remove_account(account)
+        registry.remove_account(PersonalAccount("Test", "User", "85051298765"))
+        registry.add_account(PersonalAccount("Test", "User", "123"))
+        registry.remove_account(registry.get_all_accounts()[0])
+
+        assert ledger.get(ledger.slot("pesel:89092909825")) is None
+        recreated = PersonalAccount("Test", "User", "89092909825")
+        recreated.balance = 30.0
+        with registry.locks.hold(recreated):
+            assert recreated.balance == 30.0
+
+    def test_removal_during_a_transfer_does_not_deadlock(self, ledger):
+        registry = AccountsRegistry()
+        registry.locks = SharedLedgerLocks(ledger)
+        registry.add_observer(registry.locks)
+        account = PersonalAccount("Test", "User", "89092909825")
+        registry.add_account(account)
+        holding = threading.Event()
+
+        def transfer():
+            with registry.locks.hold(account):
+                holding.set()
+                # The balance listener waits for registry.lock, held by remove()
+                account.incoming_transfer(10.0)
+
+        def remove():
+            with registry.lock:
+                transferring.start()
+                holding.wait()
+                registry.remove_account(account)
+
+        transferring = threading.Thread(target=transfer, daemon=True)
+        removing = threading.Thread(target=remove, daemon=True)
+        removing.start()
+        removing.join(timeout=5)
+        transferring.join(timeout=5)
+
+        assert not removing.is_alive() and not transferring.is_alive()
+        assert registry.get_accounts_count() == 0
@@ -0,0 +1,281 @@
+import gc
+import threading
+import pytest
+from src.account_indexes import default_indexes
+from src.accounts_registry import primary_key
+from src.company_account import CompanyAccount
+from src.personal_account import PersonalAccount
+from src.storage_backed_registry import StorageBackedRegistry
+
+
+class InMemoryRepository:
+    """Stores account documents by primary key, like the MongoDB collection."""
+
+    def __init__(self, accounts=()):
+        self.documents = {primary_key(account): account.to_dict() for account in accounts}
+        self.saves = []
+        self.forgotten = []
+
+    def save_changes(self, changed, removed):
+        self.saves.append(([primary_key(account) for account in changed], list(removed)))
+        for key in removed:
+            self.documents.pop(key, None)
+        for account in changed:
+            self.documents[primary_key(account)] = account.to_dict()
+
+    def forget(self, key):
+        self.forgotten.append(key)
+
+    def find_by_pesel(self, pesel):
+        document = self.documents.get(("pesel", pesel))
+        return None if document is None else PersonalAccount.from_dict(document)
+
+    def find_by_nip(self, nip):
+        document = self.documents.get(("nip", nip))
+        return None if document is None else CompanyAccount.from_dict(document)
+
+    def load_all(self):
+        return [self.find_by_pesel(value) if field == "pesel" else self.find_by_nip(value)
+                for field, value in self.documents]
+
+    def count_accounts(self):
+        return len(self.documents)
+
+
+def personal(pesel, balance=0.0):
+    account = PersonalAccount("John", "Doe", pesel)
+    account.balance = balance
+    return account
+
+
+@pytest.fixture
+def repository():
+    company = CompanyAccount.from_dict({"company_name": "TechCorp", "nip": "8461627563", "balance": 5.0,
+                                        "history": []})
+    return InMemoryRepository([personal(f"{i:011d}", balance=i) for i in range(5)] + [company])
+
+
+@pytest.fixture
+def registry(repository):
+    return StorageBackedRegistry(repository, capacity=2, indexes=default_indexes())
+
+
+def racing_load(repository, mocker, meanwhile):
+    """Make the first find_by_pesel run `meanwhile`, as another request would during the load."""
+    find_by_pesel = repository.find_by_pesel
+    calls = []
+
+    def load(pesel):
+        if not calls:
+            meanwhile()
+        calls.append(pesel)
+        return find_by_pesel(pesel)
+    return mocker.patch.object(repository, "find_by_pesel", side_effect=load)
+
+
+class TestStorageBackedRegistry:
+    def test_lookup_faults_in_from_storage_once(self, registry):
+        account = registry.find_account_by_pesel("00000000001")
+
+        assert account.balance == 1
+        assert registry.find_account_by_pesel("00000000001") is account
+        assert registry.find_account_by_nip("8461627563").balance == 5.0
+        assert registry.stats() == {"hits": 1, "misses": 2, "evictions": 0, "size": 2, "capacity": 2}
+
+    def test_misses_load_without_the_registry_lock(self, registry, repository, mocker):
+        find_by_pesel = repository.find_by_pesel
+        free = []
+
+        def probe():
+            acquired = registry.lock.acquire(timeout=0.5)
+            free.append(acquired)
+            if acquired:
+                registry.lock.release()
+
+        def load(pesel):
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+            return find_by_pesel(pesel)
+        mocker.patch.object(repository, "find_by_pesel", side_effect=load)
+
+        assert registry.find_account_by_pesel("00000000001").balance == 1
+        assert free == [True]
+
+    def test_key_created_during_a_miss_wins_over_the_stored_copy(self, registry, repository, mocker):
+        created = personal("00000000001", balance=50.0)
+        racing_load(repository, mocker, lambda: registry.add_account(created))
+
+        assert registry.find_account_by_pesel("00000000001") is created
+
+    def test_key_removed_during_a_miss_is_not_faulted_in(self, registry, repository, mocker):
+        created = personal("00000000001", balance=50.0)
+        racing_load(repository, mocker, lambda: registry.add_account(created) or registry.remove_account(created))
+
+        assert registry.find_account_by_pesel("00000000001") is None
+
+    def test_clear_during_a_miss_loads_again(self, registry, repository, mocker):
+        load = racing_load(repository, mocker, registry.clear)
+
+        assert registry.find_account_by_pesel("00000000001").balance == 1
+        assert load.call_count == 2
+
+    def test_failed_load_leaves_nothing_behind(self, registry, repository, mocker):
+        mocker.patch.object(repository, "find_by_pesel", side_effect=RuntimeError("mongo unavailable"))
+
+        with pytest.raises(RuntimeError):
+            registry.find_account_by_pesel("00000000001")
+
+        assert registry._loading == {}
+
+    def test_missing_and_placeholder_keys(self, registry):
+        assert registry.find_account_by_pesel("99999999999") is None
+        assert registry.find_account_by_pesel("Invalid") is None
+        assert not registry.nip_exists("1234567890")
+        assert registry.pesel_exists("00000000003")
+
+    def test_least_recently_used_account_is_evicted(self, registry):
+        first = registry.find_account_by_pesel("00000000001")
+        registry.find_account_by_pesel("00000000002")
+        registry.find_account_by_pesel("00000000001")
+
+        registry.find_account_by_pesel("00000000003")
+
+        assert set(registry.accounts) == {first, registry.find_account_by_pesel("00000000003")}
+        assert registry.stats()["evictions"] == 1
+
+    def test_clean_evictions_are_not_written(self, registry, repository):
+        for i in range(5):
+            registry.find_account_by_pesel(f"{i:011d}")
+
+        assert repository.saves == []
+
+    def test_dirty_account_is_written_back_on_eviction(self, registry, repository):
+        registry.find_account_by_pesel("00000000001").incoming_transfer(100.0)
+        registry.find_account_by_pesel("00000000002")
+
+        registry.find_account_by_pesel("00000000003")
+
+        assert repository.saves == [([("pesel", "00000000001")], [])]
+        assert repository.documents[("pesel", "00000000001")]["balance"] == 101.0
+        assert registry.find_account_by_pesel("00000000001").balance == 101.0
+
+    def test_evicted_account_changed_later_is_written_through(self, registry, repository):
+        account = registry.find_account_by_pesel("00000000001")
+        registry.find_account_by_pesel("00000000002")
+        registry.find_account_by_pesel("00000000003")
+
+        account.incoming_transfer(10.0)
+
+        assert repository.documents[("pesel", "00000000001")]["balance"] == 11.0
+        assert repository.documents[("pesel", "00000000001")]["history"] == ["10.0"]
+
+    def test_evicted_account_still_held_is_the_one_looked_up(self, registry, repository):
+        held = registry.find_account_by_pesel("00000000001")
+        registry.find_account_by_pesel("00000000002")
+        registry.find_account_by_pesel("00000000003")
+
+        assert registry.find_account_by_pesel("00000000001") is held
+        assert held in registry.get_all_accounts()
+        held.incoming_transfer(10.0)
+        assert held in registry.collect_changes()[0]
+
+    def test_evicted_account_no_longer_held_is_loaded_again(self, registry, repository):
+        registry.find_account_by_pesel("00000000001").incoming_transfer(10.0)
+        registry.find_account_by_pesel("00000000002")
+        registry.find_account_by_pesel("00000000003")
+        gc.collect()
+
+        assert registry.find_account_by_pesel("00000000001").balance == 11.0
+        assert registry.stats()["misses"] == 4
+
+    def test_evicted_accounts_are_forgotten_by_the_repository(self, registry, repository):
+        registry.find_account_by_pesel("00000000001")
+        registry.find_account_by_pesel("00000000002")
+
+        registry.find_account_by_pesel("00000000003")
+
+        assert repository.forgotten == [("pesel", "00000000001")]
+
+    def test_new_accounts_are_saved_on_eviction(self, registry, repository):
+        registry.add_account(personal("90010112345"))
+        registry.add_account(personal("90010112346"))
+        registry.add_account(personal("90010112347"))
+
+        assert ("pesel", "90010112345") in repository.documents
+        assert registry.find_account_by_pesel("90010112345") is not None
+
+    def test_removed_account_is_not_faulted_back_in(self, registry, repository):
+        registry.remove_account(registry.find_account_by_pesel("00000000001"))
+
+        assert registry.find_account_by_pesel("00000000001") is None
+        registry.find_account_by_pesel("00000000002").incoming_transfer(1.0)
+        registry.find_account_by_pesel("00000000003")
+        registry.find_account_by_pesel("00000000004")
+
+        # The write-back carried the removal along
+        assert ("pesel", "00000000001") not in repository.documents
+
+    def test_flush_saves_pending_changes(self, registry, repository):
+        registry.find_account_by_pesel("00000000001").incoming_transfer(1.0)
+        registry.remove_account(registry.find_account_by_pesel("00000000002"))
+
+        registry.flush()
+        registry.flush()
+
+        assert repository.saves == [([("pesel", "00000000001")], [("pesel", "00000000002")])]
+
+    def test_removal_stays_pending_until_flushed(self, registry, repository, mocker):
+        registry.remove_account(registry.find_account_by_pesel("00000000001"))
+        save_changes = repository.save_changes
+        looked_up = []
+
+        def save_while_looking_up(changed, removed):
+            # A lookup while the delete is on its way must not fault the account back in
+            looked_up.append(registry.find_account_by_pesel("00000000001"))
+            save_changes(changed, removed)
+        mocker.patch.object(repository, "save_changes", side_effect=save_while_looking_up)
+
+        registry.flush()
+
+        assert looked_up == [None]
+        assert registry.find_account_by_pesel("00000000001") is None
+
+    def test_failed_flush_keeps_changes_pending(self, registry, repository, mocker):
+        account = registry.find_account_by_pesel("00000000001")
+        account.incoming_transfer(1.0)
+        registry.remove_account(registry.find_account_by_pesel("00000000002"))
+        mocker.patch.object(repository, "save_changes", side_effect=RuntimeError("mongo unavailable"))
+
+        with pytest.raises(RuntimeError):
+            registry.flush()
+
+        assert registry.collect_changes() == ([account], [("pesel", "00000000002")])
+
+    def test_count_and_listing_read_storage(self, registry, repository):
+        hot = registry.find_account_by_pesel("00000000001")
+        hot.incoming_transfer(1.0)
+        registry.add_account(personal("90010112345"))
+
+        accounts = registry.get_all_accounts()
+
+        assert registry.get_accounts_count() == 7
+        assert len(accounts) == 7
+        assert hot in accounts
+        assert repository.documents[("pesel", "00000000001")]["balance"] == 2.0
+
+    def test_clear_keeps_incremental_saves(self, registry):
+        registry.find_account_by_pesel("00000000001")
+
+        registry.clear()
+
+        assert registry.accounts == []
+        assert registry.needs_full_save is False
+
+    def test_secondary_indexes_cover_hot_set(self, registry):
+        registry.find_account_by_pesel("00000000001")
+        registry.find_account_by_pesel("00000000002")
+        registry.find_account_by_pesel("00000000003")
+
+        balances = [account.balance for account in registry.get_index("balance").range(None, None)]
+        assert balances == [2, 3]
@@ -0,0 +1,156 @@
+import io
+import json
+import logging
+import sys
+import pytest
+from src import structured_logging
+from src.structured_logging import (
+    JsonFormatter, DeferredQueueHandler, RouteLog, configure_logging, configure_from_env, route_log, stop_logging,
+)
+
+
+@pytest.fixture
+def stream():
+    stream = io.StringIO()
+    yield stream
+    configure_from_env()
+
+
+def lines(stream):
+    stop_logging()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class Unprintable:
+    """Fails the test if a message argument is ever formatted."""
+
+    def __str__(self):
+        raise AssertionError("formatted a record that was not emitted")
+
+
+class TestJsonFormatter:
+    def test_record_with_fields(self):
+        record = logging.LogRecord("bank_app.api.transfer", logging.INFO, __file__, 1, "Transfer %s", ("ok",), None)
+        record.fields = {"route": "transfer", "pesel": "89092909825"}
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["message"] == "Transfer ok"
+        assert (entry["level"], entry["route"], entry["pesel"]) == ("INFO", "transfer", "89092909825")
+
+    def test_exceptions_are_included(self):
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            record = logging.LogRecord("bank_app", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+
+        assert "RuntimeError: boom" in json.loads(JsonFormatter().format(record))["exc"]
+
+
+class TestDeferredQueueHandler:
+    def test_records_are_queued_unformatted(self):
+        queued = []
+        handler = DeferredQueueHandler(type("Queue", (), {"put_nowait": staticmethod(queued.append)})())
+        record = logging.LogRecord("bank_app", logging.INFO, __file__, 1, "value %s", (Unprintable(),), None)
+
+        handler.emit(record)
+
+        assert queued == [record]
+        assert record.msg == "value %s"
+
+
+class TestRouteLogging:
+    def test_records_reach_the_stream_as_json(self, stream):
+        configure_logging("INFO", stream=stream)
+
+        route_log("test_route").info("Created %s", "account", kind="personal")
+        route_log("test_route").debug("hidden")
+
+        assert [(entry["message"], entry["kind"], entry["route"]) for entry in lines(stream)] == [
+            ("Created account", "personal", "test_route")
+        ]
+
+    def test_records_name_the_calling_function(self, stream):
+        configure_logging("INFO", stream=stream)
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        log = route_log("caller")
+        log.logger.addHandler(handler)
+        try:
+            log.info("from %s", "here")
+        finally:
+            log.logger.removeHandler(handler)
+
+        assert [(record.funcName, record.getMessage()) for record in records] == [
+            ("test_records_name_the_calling_function", "from here")
+        ]
+
+    def test_callable_fields_are_only_called_for_kept_records(self, stream, mocker):
+        configure_logging("INFO", stream=stream)
+        hidden = mocker.Mock()
+
+        route_log("lazy").info("shown", args=lambda: {"limit": "5"})
+        route_log("lazy").debug("hidden", args=hidden)
+
+        assert [entry["args"] for entry in lines(stream)] == [{"limit": "5"}]
+        hidden.assert_not_called()
+
+    def test_route_levels(self, stream):
+        configure_logging("WARNING", route_levels={"noisy": "DEBUG"}, stream=stream)
+
+        route_log("noisy").debug("shown")
+        route_log("quiet").info("hidden", value=Unprintable())
+        route_log("quiet").warning("shown too")
+
+        assert [entry["message"] for entry in lines(stream)] == ["shown", "shown too"]
+
+    def test_reconfiguring_resets_route_levels(self, stream):
+        configure_logging("INFO", route_levels={"noisy": "ERROR"}, stream=stream)
+        configure_logging("INFO", stream=stream)
+
+        route_log("noisy").info("shown")
+
+        assert [entry["message"] for entry in lines(stream)] == ["shown"]
+
+    def test_sampling_keeps_a_fraction_but_never_drops_warnings(self, stream, mocker):
+        configure_logging("INFO", sample_rates={"default": 0.25}, stream=stream)
+        mocker.patch("src.structured_logging.random.random", side_effect=[0.1, 0.9, 0.3, 0.2])
+
+        for i in range(4):
+            route_log("sampled").info("request %s", i)
+        route_log("sampled").warning("slow")
+
+        assert [entry["message"] for entry in lines(stream)] == ["request 0", "request 3", "slow"]
+
+    def test_sample_rate_changes_apply_to_existing_routes(self, stream):
+        log = route_log("rated")
+        configure_logging("INFO", sample_rates={"rated": 0.0}, stream=stream)
+
+        log.info("dropped", value=Unprintable())
+
+        assert log.sample_rate == 0.0
+        assert lines(stream) == []
+
+    def test_off_silences_everything(self, stream):
+        assert configure_logging("OFF", route_levels={"noisy": "DEBUG"}, stream=stream) is None
+
+        route_log("noisy").warning("hidden", value=Unprintable())
+
+        assert lines(stream) == []
+
+    def test_configure_from_env(self, stream, monkeypatch):
+        monkeypatch.setenv("BANK_APP_LOG_LEVEL", "warning")
+        monkeypatch.setenv("BANK_APP_LOG_ROUTE_LEVELS", "env_route=debug")
+        monkeypatch.setenv("BANK_APP_LOG_SAMPLE", "default=0.5, env_route = 1")
+
+        assert configure_from_env() is not None
+
+        assert route_log("env_route").logger.getEffectiveLevel() == logging.DEBUG
+        assert route_log("other_route").sample_rate == 0.5
+        assert structured_logging._sample_rates == {"default": 0.5, "env_route": 1.0}
+
+
+def test_route_log_is_cached():
+    assert route_log("cached") is route_log("cached")
+    assert isinstance(route_log("cached"), RouteLog)
@@ -0,0 +1,86 @@
+import pytest
+from src.transaction_history import TransactionHistory
+from src.personal_account import PersonalAccount
+
+
+class TestTransactionHistory:
+    def test_records_are_formatted_like_legacy_strings(self):
+        history = TransactionHistory()
+        history.record(100.0)
+        history.record(-50.0)
+        history.record(-1)
+        history.record(500)
+
+        assert list(history) == ["100.0", "-50.0", "-1", "500"]
+        assert history == ["100.0", "-50.0", "-1", "500"]
+        assert repr(history) == "['100.0', '-50.0', '-1', '500']"
+
+    @pytest.mark.parametrize("entries", [
+        ["100", "-50", "200"],
+        ["-1775.0", "0.1", "-1"],
+        [],
+    ])
+    def test_legacy_strings_round_trip(self, entries):
+        history = TransactionHistory(entries)
+
+        assert list(history) == entries
+        assert len(history) == len(entries)
+
+    def test_append_accepts_numbers_and_strings(self):
+        history = TransactionHistory()
+        history.append("-1775.0")
+        history.append(20.5)
+
+        assert history == ["-1775.0", "20.5"]
+
+    def test_indexing_and_slicing(self):
+        history = TransactionHistory(["1", "2.0", "-3"])
+
+        assert history[0] == "1"
+        assert history[-1] == "-3"
+        assert history[-2:] == ["2.0", "-3"]
+
+    def test_contains(self):
+        history = TransactionHistory(["-1775.0", "-1"])
+
+        assert "-1775.0" in history
+        assert "-1775" not in history
+        assert history.contains_amount(-1775.0)
+        assert not history.contains_amount(1775.0)
+
+    def test_amounts_returns_numeric_tail(self):
+        history = TransactionHistory(["100", "-50.5", "20"])
+
+        assert list(history.amounts(2)) == [-50.5, 20.0]
+        assert list(history.amounts(5)) == [100.0, -50.5, 20.0]
+
+    def test_equality_between_histories(self):
+        assert TransactionHistory(["1", "-2.0"]) == TransactionHistory(["1", "-2.0"])
+        assert TransactionHistory(["1"]) != TransactionHistory(["1.0"])
+        assert TransactionHistory(["1"]) != ["2"]
+
+    def test_clear(self):
+        history = TransactionHistory(["1", "2"])
+        history.clear()
+
+        assert history == []
+        assert len(history) == 0
+
+    def test_account_history_setter_converts_lists(self):
+        account = PersonalAccount("John", "Doe", "12345678901")
+        account.history = ["100", "-50"]
+
+        assert isinstance(account.history, TransactionHistory)
+        assert account.history == ["100", "-50"]
+
+        history = TransactionHistory(["1"])
+        account.history = history
+        assert account.history is history
+
+    def test_to_dict_history_is_plain_list(self):
+        account = PersonalAccount("John", "Doe", "12345678901")
+        account.incoming_transfer(100.0)
+        account.express_outgoing(10.0)
+
+        assert account.to_dict()["history"] == ["100.0", "-10.0", "-1"]
+        assert type(account.to_dict()["history"]) is list
@@ -17,7 +17,7 @@ class TestTransfers:
         mock_response.status_code = 200
         mock_response.json.return_value = {'result': {'subject': {'statusVat': 'Czynny'}}}
         
-        with patch('src.company_account.requests.get', return_value=mock_response):
+        with patch('src.mf_client.requests.Session.get', return_value=mock_response):
             account = CompanyAccount("metalex", "1234567890")
             account.balance = 100.0
             return account
@@ -0,0 +1,175 @@
+import threading
+import pytest
+from src.accounts_registry import AccountsRegistry
+from src.personal_account import PersonalAccount
+from src.transfers import transfer
+from src.write_behind import WriteBehindWriter
+
+
+class RecordingRepository:
+    def __init__(self, fail_times=0):
+        self.calls = []
+        self.fail_times = fail_times
+        self.flushed = threading.Event()
+
+    def save_changes(self, changed, removed):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("mongo unavailable")
+        self.calls.append((list(changed), list(removed)))
+        self.flushed.set()
+
+
+class TestWriteBehindWriter:
+    @pytest.fixture
+    def repository(self):
+        return RecordingRepository()
+
+    @pytest.fixture
+    def registry(self):
+        return AccountsRegistry()
+
+    def test_mutations_are_coalesced_per_account(self, repository, registry):
+        writer = WriteBehindWriter(repository, flush_interval=60)
+        registry.add_observer(writer)
+        account = PersonalAccount("John", "Doe", "12345678901")
+
+        registry.add_account(account)
+        for _ in range(10):
+            account.incoming_transfer(10.0)
+        assert writer.stats()["queue_depth"] == 1
+
+        writer.close()
+
+        assert repository.calls == [([account], [])]
+        assert writer.stats()["flushes"] == 1
+        assert writer.stats()["queue_depth"] == 0
+
+    def test_flushes_on_timer(self, repository, registry):
+        writer = WriteBehindWriter(repository, flush_interval=0.01)
+        registry.add_observer(writer)
+
+        registry.add_account(PersonalAccount("John", "Doe", "12345678901"))
+
+        assert repository.flushed.wait(5)
+        writer.close()
+
+    def test_flushes_when_batch_is_full(self, repository, registry):
+        writer = WriteBehindWriter(repository, flush_interval=60, max_batch=2)
+        registry.add_observer(writer)
+
+        registry.add_account(PersonalAccount("John", "Doe", "12345678901"))
+        registry.add_account(PersonalAccount("Jane", "Doe", "98765432109"))
+
+        assert repository.flushed.wait(5)
+        assert len(repository.calls[0][0]) == 2
+        writer.close()
+
+    def test_removal_supersedes_pending_change(self, repository, registry):
+        writer = WriteBehindWriter(repository, flush_interval=60)
+        registry.add_observer(writer)
+        account = PersonalAccount("John", "Doe", "12345678901")
+        registry.add_account(account)
+
+        registry.remove_account(account)
+        writer.close()
+
+        assert repository.calls == [([], [("pesel", "12345678901")])]
+
+    def test_full_queue_never_blocks_a_mutation(self, repository):
+        writer = WriteBehindWriter(repository, flush_interval=60, max_pending=1, submit_timeout=0.01)
+        first = PersonalAccount("John", "Doe", "12345678901")
+        writer.account_changed(first)
+
+        writer.account_changed(PersonalAccount("Jane", "Doe", "98765432109"))
+        writer.account_removed(first)
+
+        assert writer.queue_depth == 2
+        assert not writer.wait_for_capacity()
+        writer.close()
+
+    def test_wait_for_capacity_returns_once_flushed(self, repository):
+        writer = WriteBehindWriter(repository, flush_interval=60, max_batch=1, max_pending=1, submit_timeout=0.01)
+
+        writer.account_changed(PersonalAccount("John", "Doe", "12345678901"))
+
+        assert writer.wait_for_capacity(timeout=5)
+        writer.close()
+
+    def test_stalled_repository_does_not_break_transfers(self):
+        stalled = threading.Event()
+
+        class StalledRepository(RecordingRepository):
+            def save_changes(self, changed, removed):
+                stalled.wait(5)
+
+        registry = AccountsRegistry()
+        writer = WriteBehindWriter(StalledRepository(), flush_interval=60, max_batch=1, max_pending=1,
+                                   submit_timeout=0.01)
+        registry.add_observer(writer)
+        sender, recipient = PersonalAccount("John", "Doe", "12345678901"), PersonalAccount("Jane", "Doe", "98765432109")
+        registry.add_accounts([sender, recipient])
+        sender.incoming_transfer(100.0)
+
+        transfer(sender, recipient, 30.0, registry.locks)
+
+        assert (sender.balance, recipient.balance) == (70.0, 30.0)
+        assert list(sender.history)[-1] == "-30.0"
+        stalled.set()
+        writer.close()
+
+    def test_failed_flush_is_retried(self, registry):
+        repository = RecordingRepository(fail_times=1)
+        writer = WriteBehindWriter(repository, flush_interval=0.01)
+        registry.add_observer(writer)
+        account = PersonalAccount("John", "Doe", "12345678901")
+
+        registry.add_account(account)
+
+        assert repository.flushed.wait(5)
+        assert repository.calls[0] == ([account], [])
+        assert writer.stats()["errors"] == 1
+        writer.close()
+
+    def test_requeue_keeps_removals_made_during_flush(self):
+        writer = WriteBehindWriter(RecordingRepository(), flush_interval=60)
+        account = PersonalAccount("John", "Doe", "12345678901")
+        writer.close()
+        writer.repository = RecordingRepository(fail_times=1)
+        writer._removed[("pesel", "12345678901")] = None
+
+        writer._flush([account], [("nip", "1234567890")], requeue=True)
+
+        assert list(writer._changed) == []
+        assert list(writer._removed) == [("pesel", "12345678901"), ("nip", "1234567890")]
+
+    def test_failed_final_flush_is_dropped(self):
+        repository = RecordingRepository(fail_times=1)
+        writer = WriteBehindWriter(repository, flush_interval=60)
+        writer.account_changed(PersonalAccount("John", "Doe", "12345678901"))
+
+        writer.close()
+
+        assert writer.stats()["errors"] == 1
+        assert writer.stats()["queue_depth"] == 0
+
+    def test_closed_writer_counts_dropped_mutations(self, repository):
+        writer = WriteBehindWriter(repository)
+        writer.close()
+
+        writer.account_changed(PersonalAccount("John", "Doe", "12345678901"))
+        writer.account_removed(PersonalAccount("John", "Doe", "12345678901"))
+
+        assert writer.stats()["dropped"] == 2
+        assert writer.stats()["queue_depth"] == 0
+        assert not writer.wait_for_capacity()
+
+    def test_remove_observer(self, repository, registry):
+        writer = WriteBehindWriter(repository, flush_interval=60)
+        registry.add_observer(writer)
+        registry.remove_observer(writer)
+
+        registry.add_account(PersonalAccount("John", "Doe", "12345678901"))
+        writer.close()
+
+        assert repository.calls == []